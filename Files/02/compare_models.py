@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import argparse
+import openai
+from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared helpers in Files/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from streaming import percentile, streaming_enabled
+from usage import tracker
+from chat_client import get_chat_client
+from image_cache import image_cache
+from conversation import MultimodalConversation
+
+# The two prompts of model1.py and model2.py
+FIRST_PROMPT = "Create Python code for image, and use plt to save the new picture under imgs/ and name it gpt-4o.jpg."
+FOLLOW_UP_PROMPT = "Add a legend to the plot replacing the labels"
+
+
+# Function to prepare a local image for the request: downscaled to the detail level in IMAGE_DETAIL
+# (or to IMAGE_MAX_TOKENS), encoded as a data URL and cached, so an unchanged image is encoded once.
+# Returns the EncodedImage, whose image_url() is the image part of the message.
+def prepare_image(image_path):
+    max_tokens = os.getenv("IMAGE_MAX_TOKENS")
+    return image_cache.prepare(
+        image_path,
+        detail=os.getenv("IMAGE_DETAIL", "auto"),
+        max_tokens=int(max_tokens) if max_tokens else None,
+        image_format=os.getenv("IMAGE_FORMAT") or None,
+    )
+
+
+# Function to run the conversation of model1.py and model2.py against the deployment named in an environment
+# variable of .env: the image with the first prompt, then the follow-up prompt. Returns both responses.
+def run_lab_conversation(deployment_variable, image_path="./imgs/demo.png"):
+    load_dotenv()
+    model_deployment = os.getenv(deployment_variable)
+
+    # Prepare the local image using the prepare_image function, and show its size and estimated tokens
+    image = prepare_image(image_path)
+    print(image.report())
+
+    # Set up the chat client; set OPENAI_BASE_URL in .env to call another OpenAI-compatible
+    # endpoint instead of the project's deployment, such as the local mock server in Files/mock
+    chat_client = get_chat_client(os.getenv("PROJECT_ENDPOINT"))
+
+    # Start the conversation; IMAGE_HISTORY in .env sets what later turns send in place of the image
+    # (reference, summarize, drop, or keep to send it again)
+    conversation = MultimodalConversation(chat_client, model_deployment, image_policy=os.getenv("IMAGE_HISTORY", "reference"))
+
+    # Generate a chat completion request with the prompt and the image
+    content = conversation.send(FIRST_PROMPT, images=[image], max_tokens=2000)
+    tracker.record(model_deployment, "generate_code", conversation.last_usage)
+
+    print("\nAI's response:")
+    print(content)
+
+    # Submit the new prompt; the conversation adds it after the response, with the image replaced
+    result = conversation.send(FOLLOW_UP_PROMPT, max_tokens=2000)
+    tracker.record(model_deployment, "add_legend", conversation.last_usage)
+
+    # Payload size and tokens of each request
+    print()
+    print(conversation.report())
+    return content, result
+
+
+# Function to run the two-turn conversation of model1.py against one deployment, measuring each turn
+def run_conversation(chat_client, deployment, image_url, turns, max_tokens, stream, repetition, image_policy="reference"):
+    conversation = MultimodalConversation(chat_client, deployment, image_policy=image_policy, stream=stream)
+    samples = []
+    for turn, prompt in enumerate([FIRST_PROMPT, FOLLOW_UP_PROMPT][:turns]):
+        try:
+            conversation.send(prompt, images=[image_url] if turn == 0 else (), max_tokens=max_tokens)
+        except openai.OpenAIError as e:
+            samples.append({"deployment": deployment, "repetition": repetition, "turn": turn + 1, "error": str(e)})
+            break
+        tracker.record(deployment, f"turn_{turn + 1}", conversation.last_usage)
+        stats = conversation.turns[-1]
+        samples.append({
+            "latency": stats.time,
+            "ttft": stats.ttft,
+            "prompt_tokens": stats.prompt_tokens,
+            "completion_tokens": stats.completion_tokens,
+            "cached_tokens": stats.cached_tokens,
+            "tokens_per_sec": stats.completion_tokens / stats.time if stats.time > 0 else 0.0,
+            "payload_bytes": stats.payload_bytes,
+            "deployment": deployment,
+            "repetition": repetition,
+            "turn": turn + 1,
+        })
+    return samples
+
+
+def summarize(samples, deployments):
+    summary = {}
+    for deployment in deployments:
+        ok = [s for s in samples if s["deployment"] == deployment and "error" not in s]
+        latencies = [s["latency"] * 1000 for s in ok]
+        ttfts = [s["ttft"] * 1000 for s in ok if s["ttft"] is not None]
+        rates = [s["tokens_per_sec"] for s in ok]
+        summary[deployment] = {
+            "turns": len(ok),
+            "errors": sum(1 for s in samples if s["deployment"] == deployment and "error" in s),
+            "latency_p50_ms": percentile(latencies, 50),
+            "latency_p95_ms": percentile(latencies, 95),
+            "latency_p99_ms": percentile(latencies, 99),
+            "ttft_p50_ms": percentile(ttfts, 50),
+            "ttft_p95_ms": percentile(ttfts, 95),
+            "tokens_per_sec_p50": percentile(rates, 50),
+            "prompt_tokens_mean": sum(s["prompt_tokens"] for s in ok) / len(ok) if ok else 0,
+            "completion_tokens_mean": sum(s["completion_tokens"] for s in ok) / len(ok) if ok else 0,
+            "payload_bytes_mean": sum(s["payload_bytes"] for s in ok) / len(ok) if ok else 0,
+        }
+    return summary
+
+
+# Function to print the summary with one column per deployment
+def print_table(summary):
+    deployments = list(summary)
+    if not deployments:
+        print("\nNo deployments to compare; set MODEL_DEPLOYMENT1/MODEL_DEPLOYMENT2 in .env or pass --deployments.")
+        return
+    width = max(14, *(len(d) + 2 for d in deployments))
+    print(f"\n{'':<24}" + "".join(f"{d:>{width}}" for d in deployments))
+    for metric in next(iter(summary.values())):
+        values = [summary[d][metric] for d in deployments]
+        print(f"{metric:<24}" + "".join(f"{v:>{width}.1f}" if isinstance(v, float) else f"{v:>{width}}" for v in values))
+
+
+def compare(deployments, repetitions, concurrency, turns, max_tokens, image_path, stream, detail="auto", image_tokens=None,
+            image_policy="reference"):
+    chat_client = get_chat_client(os.getenv("PROJECT_ENDPOINT"))
+    image = image_cache.prepare(image_path, detail=detail, max_tokens=image_tokens)
+    print(image.report())
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Interleave the deployments so they share the same conditions
+        futures = [pool.submit(run_conversation, chat_client, deployment, image.image_url(), turns, max_tokens, stream, repetition,
+                               image_policy)
+                   for repetition in range(repetitions) for deployment in deployments]
+        samples = [sample for future in futures for sample in future.result()]
+    elapsed = time.perf_counter() - start
+    print(f"{repetitions} conversation(s) x {turns} turn(s) per deployment, concurrency {concurrency}, "
+          f"{'streamed' if stream else 'not streamed'}, {elapsed:.1f}s")
+    return samples, summarize(samples, deployments)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    default_deployments = [d for d in (os.getenv("MODEL_DEPLOYMENT1"), os.getenv("MODEL_DEPLOYMENT2")) if d]
+    parser = argparse.ArgumentParser(description="Send the model1.py/model2.py conversation to several deployments at once.")
+    parser.add_argument("--deployments", nargs="+", default=default_deployments)
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--turns", type=int, choices=[1, 2], default=2)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--image", default="./imgs/demo.png")
+    parser.add_argument("--detail", choices=["auto", "low", "high"], default=os.getenv("IMAGE_DETAIL", "auto"))
+    parser.add_argument("--image-history", choices=["keep", "drop", "reference", "summarize"],
+                        default=os.getenv("IMAGE_HISTORY", "reference"), help="what follow-up turns send in place of the image")
+    parser.add_argument("--image-tokens", type=int, help="downscale the image to fit this many image tokens")
+    parser.add_argument("--stream", action="store_true", help="stream the responses to measure TTFT (as STREAM_RESPONSES=true)")
+    parser.add_argument("--no-stream", action="store_true", help="wait for complete responses (no TTFT)")
+    parser.add_argument("--output", help="write every measured turn and the summary to this JSON file")
+    args = parser.parse_args()
+
+    samples, summary = compare(args.deployments, args.repetitions, args.concurrency, args.turns, args.max_tokens,
+                               args.image, (args.stream or streaming_enabled()) and not args.no_stream, args.detail, args.image_tokens,
+                               args.image_history)
+    print_table(summary)
+    print()
+    print(tracker.summary())
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "samples": samples, "usage": tracker.totals()}, f, indent=2)
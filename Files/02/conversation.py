@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, List, Optional
+
+# Shared helpers in Files/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from streaming import stream_chat
+from usage import usage_counts
+
+IMAGE_POLICIES = ("keep", "drop", "reference", "summarize")
+
+SUMMARY_PROMPT = ("Describe this image in detail so that it can be worked with later without seeing it: "
+                  "its type, every label, value, axis, legend and color, and any text it contains.")
+
+
+@dataclass
+class TurnStats:
+    turn: str
+    payload_bytes: int
+    image_parts: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    time: float
+    # Time to first token of streamed requests
+    ttft: Optional[float] = None
+
+
+class MultimodalConversation:
+    """A chat with images that sends each image in full only in the turn it is added.
+
+    In later turns the image parts of earlier messages are replaced according to
+    `image_policy`:
+
+    - "keep" sends the images again in every turn, as model1.py used to do
+    - "drop" leaves them out
+    - "reference" replaces each with a short text reference to the earlier image
+    - "summarize" replaces each with a description of the image, written by the
+      model once per image (or by `summarizer`, which takes the image_url dict)
+
+    A replacement never changes once made, so from the second follow-up on every
+    request starts with the previous request's messages and provider-side prompt
+    caching can reuse them. Each request's payload size, image parts and token
+    usage are recorded in `turns`.
+
+        conversation = MultimodalConversation(chat_client, model_deployment, image_policy="reference")
+        content = conversation.send(prompt, images=[image.image_url()], max_tokens=2000)
+        content = conversation.send("Add a legend to the plot replacing the labels", max_tokens=2000)
+        print(conversation.report())
+    """
+
+    def __init__(self, chat_client, model: str, image_policy: str = "reference", system: Optional[str] = None,
+                 summarizer: Optional[Callable[[dict], str]] = None, stream: bool = False):
+        if image_policy not in IMAGE_POLICIES:
+            raise ValueError(f"image_policy must be one of {', '.join(IMAGE_POLICIES)}, not {image_policy!r}")
+        self.chat_client = chat_client
+        self.model = model
+        self.image_policy = image_policy
+        self.summarizer = summarizer or self.summarize_image
+        self.stream = stream
+        self.history = [{"role": "system", "content": system}] if system else []
+        # The turn each message was added in, and the replacement text of each image once made
+        self.message_turns = [0] * len(self.history)
+        self.replacements = {}
+        self.images = 0
+        self.turn = 0
+        self.turns: List[TurnStats] = []
+        self.last_usage = None
+
+    # Add a user message with optional images (image_url dicts, or objects with an image_url() method)
+    def add_user(self, text: str, images=()):
+        content = [{"type": "text", "text": text}]
+        for image in images:
+            self.images += 1
+            content.append({"type": "image_url", "image_url": image.image_url() if hasattr(image, "image_url") else image,
+                            "image_number": self.images})
+        self.turn += 1
+        self.history.append({"role": "user", "content": content if images else text})
+        self.message_turns.append(self.turn)
+
+    def add_assistant(self, content: str):
+        self.history.append({"role": "assistant", "content": content})
+        self.message_turns.append(self.turn)
+
+    # The messages to send for the current turn
+    def messages(self) -> list:
+        rendered = []
+        for message, turn in zip(self.history, self.message_turns):
+            if not isinstance(message["content"], list):
+                rendered.append(message)
+                continue
+            parts = []
+            for part in message["content"]:
+                if part["type"] != "image_url":
+                    parts.append(part)
+                elif turn == self.turn or self.image_policy == "keep":
+                    parts.append({"type": "image_url", "image_url": part["image_url"]})
+                elif self.image_policy != "drop":
+                    parts.append({"type": "text", "text": self.replacement(part, turn)})
+            rendered.append({"role": message["role"], "content": parts})
+        return rendered
+
+    # Text that stands in for an earlier image, made once per image
+    def replacement(self, part, turn):
+        number = part["image_number"]
+        if number not in self.replacements:
+            if self.image_policy == "summarize":
+                self.replacements[number] = f"[Image {number}, sent in turn {turn}, described: {self.summarizer(part['image_url'])}]"
+            else:
+                self.replacements[number] = f"[Image {number} was sent in turn {turn} and is not repeated]"
+        return self.replacements[number]
+
+    # Function to have the model describe an image once, for the "summarize" policy
+    def summarize_image(self, image_url: dict) -> str:
+        messages = [{"role": "user", "content": [{"type": "text", "text": SUMMARY_PROMPT},
+                                                 {"type": "image_url", "image_url": image_url}]}]
+        content, _ = self._complete("summary", messages, max_tokens=300)
+        return content
+
+    def _complete(self, label, messages, **kwargs):
+        payload_bytes = len(json.dumps(messages).encode("utf-8"))
+        image_parts = sum(1 for m in messages if isinstance(m["content"], list)
+                          for part in m["content"] if part["type"] == "image_url")
+        start = time.perf_counter()
+        if self.stream:
+            content, metrics = stream_chat(self.chat_client, echo=False, model=self.model, messages=messages, **kwargs)
+            usage, ttft = metrics.usage, metrics.time_to_first_token
+        else:
+            response = self.chat_client.chat.completions.create(model=self.model, messages=messages, **kwargs)
+            content, usage, ttft = response.choices[0].message.content, response.usage, None
+        prompt_tokens, completion_tokens, cached_tokens = usage_counts(usage)
+        self.turns.append(TurnStats(label, payload_bytes, image_parts, prompt_tokens, completion_tokens,
+                                    cached_tokens, time.perf_counter() - start, ttft))
+        self.last_usage = usage
+        return content, usage
+
+    # Send a user message and add the reply to the conversation; takes the other arguments of chat.completions.create
+    def send(self, text: str, images=(), **kwargs) -> str:
+        self.add_user(text, images)
+        content, _ = self._complete(str(self.turn), self.messages(), **kwargs)
+        self.add_assistant(content)
+        return content
+
+    def report(self) -> str:
+        lines = [f"{'turn':<8} {'payload bytes':>14} {'images':>7} {'prompt':>8} {'cached':>8} {'completion':>10} {'time s':>7}"]
+        for t in self.turns:
+            lines.append(f"{t.turn:<8} {t.payload_bytes:>14,} {t.image_parts:>7} {t.prompt_tokens:>8} "
+                         f"{t.cached_tokens:>8} {t.completion_tokens:>10} {t.time:>7.2f}")
+        return "\n".join(lines)
+
+    def stats(self) -> list:
+        return [asdict(t) for t in self.turns]
@@ -0,0 +1,180 @@
+import io
+import os
+import sys
+import math
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from mimetypes import guess_type
+from typing import Optional
+
+# Shared helpers in Files/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from image_tokens import TILE_SIZE, estimate_image_tokens, high_detail_size, read_image_size
+
+# Pillow comes with matplotlib; without it images are sent unchanged
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Bytes read and encoded at a time; a multiple of 3 so the base64 pieces join without padding
+ENCODE_CHUNK_BYTES = 3 * 64 * 1024
+
+
+# Function to find the largest size, keeping the aspect ratio, whose high-detail token cost fits a budget
+def size_for_token_budget(width, height, max_tokens):
+    width, height = high_detail_size(width, height)
+    # The cost only changes where a side crosses a tile boundary, so try those scales from the largest down
+    scales = {1.0} | {k * TILE_SIZE / side for side in (width, height) for k in range(1, math.ceil(side / TILE_SIZE))}
+    for scale in sorted(scales, reverse=True):
+        size = max(1, int(width * scale)), max(1, int(height * scale))
+        if estimate_image_tokens(*size) <= max_tokens:
+            return size
+    return size
+
+
+# Function to base64-encode a stream piece by piece, so no second full-size copy of the bytes is made
+def iter_base64(stream, chunk_size=ENCODE_CHUNK_BYTES):
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield base64.b64encode(chunk).decode("ascii")
+
+
+@dataclass
+class EncodedImage:
+    data_url: str
+    detail: str
+    width: int
+    height: int
+    bytes: int
+    tokens: int
+    original_width: int
+    original_height: int
+    original_bytes: int
+    original_tokens: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.bytes
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.tokens
+
+    # The image_url part of a chat message
+    def image_url(self) -> dict:
+        return {"url": self.data_url, "detail": self.detail}
+
+    def report(self) -> str:
+        return (f"Image {self.original_width}x{self.original_height} -> {self.width}x{self.height} ({self.detail} detail): "
+                f"~{self.tokens} tokens (saved {self.tokens_saved}), {self.bytes:,} bytes (saved {self.bytes_saved:,})")
+
+
+class ImageCache:
+    """Prepares local images for chat requests and caches the resulting data URLs.
+
+    An image is downscaled to what the service would use at the requested detail
+    level ("low" fits 512x512; "high" and "auto" fit 2048x2048 with the shortest
+    side at most 768) or to the largest size within `max_tokens`, optionally
+    re-encoded as JPEG, and base64-encoded in pieces. Results are cached by the
+    image's content hash and the settings, so an unchanged image is encoded once.
+    The original image costs are estimated at high detail, as sent by model1.py.
+
+        image = image_cache.prepare("./imgs/demo.png", detail="low")
+        content = [{"type": "text", "text": prompt}, {"type": "image_url", "image_url": image.image_url()}]
+        print(image.report())
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        # Content hash per (path, modification time, size), at most max_entries of them
+        self.hashes = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Content hash of a file, remembered for as long as its size and modification time are unchanged
+    def content_hash(self, path):
+        stat = os.stat(path)
+        version = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            if version in self.hashes:
+                self.hashes.move_to_end(version)
+                return self.hashes[version]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(ENCODE_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        with self.lock:
+            self.hashes[version] = digest.hexdigest()
+            while len(self.hashes) > self.max_entries:
+                self.hashes.popitem(last=False)
+        return digest.hexdigest()
+
+    def prepare(self, path, detail: str = "auto", max_tokens: Optional[int] = None,
+                image_format: Optional[str] = None, quality: int = 85) -> EncodedImage:
+        key = (self.content_hash(path), detail, max_tokens, image_format, quality)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        image = encode_image(path, detail, max_tokens, image_format, quality)
+        with self.lock:
+            self.entries[key] = image
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return image
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+# Function to downscale and encode an image as a data URL (see ImageCache)
+def encode_image(path, detail="auto", max_tokens=None, image_format=None, quality=85) -> EncodedImage:
+    original_bytes = os.path.getsize(path)
+    mime_type = guess_type(path)[0] or "application/octet-stream"
+    with open(path, "rb") as f:
+        size = read_image_size(f.read(65536))
+    if Image is not None:
+        with Image.open(path) as source:
+            size = source.size
+            if detail == "low":
+                target = (min(size[0], TILE_SIZE), min(size[1], TILE_SIZE))
+                scale = min(target[0] / size[0], target[1] / size[1])
+                target = (max(1, int(size[0] * scale)), max(1, int(size[1] * scale)))
+            elif max_tokens is not None:
+                target = size_for_token_budget(*size, max_tokens)
+            else:
+                target = high_detail_size(*size)
+            if target != size or image_format:
+                image = source.convert("RGB") if image_format == "jpeg" and source.mode not in ("RGB", "L") else source
+                if target != size:
+                    image = image.resize(target, Image.LANCZOS)
+                output_format = (image_format or source.format or "png").upper()
+                buffer = io.BytesIO()
+                image.save(buffer, format=output_format, quality=quality, optimize=True)
+                # Keep the original file if re-encoding did not make it smaller
+                if buffer.tell() < original_bytes or target != size:
+                    buffer.seek(0)
+                    data_url = f"data:image/{output_format.lower()};base64," + "".join(iter_base64(buffer))
+                    return EncodedImage(data_url, detail, target[0], target[1], buffer.getbuffer().nbytes,
+                                        estimate_image_tokens(*target, detail), size[0], size[1], original_bytes,
+                                        estimate_image_tokens(*size, "high"))
+
+    with open(path, "rb") as f:
+        data_url = f"data:{mime_type};base64," + "".join(iter_base64(f))
+    width, height = size or (1024, 1024)
+    return EncodedImage(data_url, detail, width, height, original_bytes, estimate_image_tokens(width, height, detail),
+                        width, height, original_bytes, estimate_image_tokens(width, height, "high"))
+
+
+# Shared cache used by the model scripts
+image_cache = ImageCache()
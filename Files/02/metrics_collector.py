@@ -0,0 +1,251 @@
+import os
+import time
+import sqlite3
+import threading
+import requests
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+MANAGEMENT_URL = "https://management.azure.com"
+MANAGEMENT_SCOPE = "https://management.azure.com/.default"
+
+# Time grains supported by Azure Monitor, in seconds
+INTERVALS = {"PT1M": 60, "PT5M": 300, "PT15M": 900, "PT30M": 1800, "PT1H": 3600,
+             "PT6H": 21600, "PT12H": 43200, "P1D": 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    resource_id TEXT, metric TEXT, interval TEXT, aggregation TEXT, deployment TEXT,
+    timestamp INTEGER, value REAL,
+    PRIMARY KEY (resource_id, metric, interval, aggregation, deployment, timestamp)
+);
+CREATE TABLE IF NOT EXISTS fetched (
+    resource_id TEXT, metric TEXT, interval TEXT, aggregation TEXT, start INTEGER, end INTEGER
+);
+"""
+
+
+# Function to pick the finest time grain that keeps a time range within max_points points
+def choose_interval(start, end, max_points=1440):
+    seconds = (end - start).total_seconds()
+    for name, size in INTERVALS.items():
+        if seconds / size <= max_points:
+            return name
+    return "P1D"
+
+
+# Function to subtract fetched (start, end) ranges from a range, returning the ranges still missing
+def missing_ranges(start, end, fetched):
+    missing, cursor = [], start
+    for fetched_start, fetched_end in sorted(fetched):
+        if fetched_end <= cursor:
+            continue
+        if fetched_start >= end:
+            break
+        if fetched_start > cursor:
+            missing.append((cursor, fetched_start))
+        cursor = max(cursor, fetched_end)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+# Function to merge overlapping or touching ranges
+def merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def to_epoch(value: datetime) -> int:
+    return int((value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp())
+
+
+def iso_time(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class BearerToken:
+    """A management API token that is requested once and reused until shortly before it expires."""
+
+    def __init__(self, credential=None, scope=MANAGEMENT_SCOPE, refresh_margin=300):
+        self.credential = credential
+        self.scope = scope
+        self.refresh_margin = refresh_margin
+        self.token = None
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def get(self) -> str:
+        with self.lock:
+            if self.token is None or self.token.expires_on - self.refresh_margin <= time.time():
+                if self.credential is None:
+                    from azure.identity import DefaultAzureCredential
+                    self.credential = DefaultAzureCredential()
+                self.token = self.credential.get_token(self.scope)
+                self.requests += 1
+            return self.token.token
+
+
+class MetricsCollector:
+    """Fetches Azure Monitor metrics of model deployments into a local SQLite cache.
+
+    The points of each resource, metric, time grain and aggregation are stored
+    per deployment (split by the ModelDeploymentName dimension), together with the
+    time ranges already fetched, so each call only requests the missing ranges.
+    The most recent `settle` period is fetched again on the next call, because
+    Azure Monitor may still be adding to it. Missing ranges are split into
+    requests of at most `max_points` points, which run concurrently over one
+    pooled session and follow the response's next links. The bearer token is
+    reused until it is about to expire.
+
+        collector = MetricsCollector("metrics_cache.db")
+        series = collector.series(resource_id, "TokenTransaction", ["gpt-4o", "gpt-4o-mini"], start_time, end_time)
+
+    Set `base_url` (METRICS_ENDPOINT) to a local stand-in such as Files/mock to
+    run without Azure; a fixed `token` then replaces the credential.
+    """
+
+    def __init__(self, cache_path="metrics_cache.db", base_url=None, credential=None, token=None,
+                 api_version="2018-01-01", max_workers=8, max_points=1440, settle=timedelta(minutes=5), timeout=60):
+        self.base_url = (base_url or os.getenv("METRICS_ENDPOINT") or MANAGEMENT_URL).rstrip("/")
+        if token is None and self.base_url != MANAGEMENT_URL and credential is None:
+            token = "local"
+        self.token = token
+        self.bearer = BearerToken(credential)
+        self.api_version = api_version
+        self.max_workers = max_workers
+        self.max_points = max_points
+        self.settle = settle
+        self.timeout = timeout
+        self.db = sqlite3.connect(cache_path)
+        self.db.executescript(SCHEMA)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers,
+                              max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                                                respect_retry_after_header=True))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.counts = {"requests": 0, "points": 0}
+        self.lock = threading.Lock()
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.token or self.bearer.get()}", "Content-Type": "application/json"}
+
+    # Function to fetch one time range of some metrics, following next links; returns
+    # (metric, deployment, epoch, value) rows
+    def _fetch(self, resource_id, metrics, interval, aggregation, start, end):
+        url = f"{self.base_url}/{resource_id.strip('/')}/providers/microsoft.insights/metrics"
+        params = {
+            "api-version": self.api_version,
+            "metricnames": ",".join(metrics),
+            "timespan": f"{iso_time(start)}/{iso_time(end)}",
+            "interval": interval,
+            "aggregation": aggregation,
+            "$filter": "ModelDeploymentName eq '*'",
+            "top": 100,
+        }
+        rows = []
+        while url:
+            response = self.session.get(url, params=params, headers=self._headers(), timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            with self.lock:
+                self.counts["requests"] += 1
+            for value in data["value"]:
+                for timeseries in value["timeseries"]:
+                    deployment = timeseries["metadatavalues"][0]["value"] if timeseries.get("metadatavalues") else ""
+                    for point in timeseries["data"]:
+                        timestamp = to_epoch(datetime.fromisoformat(point["timeStamp"].replace("Z", "+00:00")))
+                        if start <= timestamp < end:
+                            rows.append((value["name"]["value"], deployment, timestamp, point.get(aggregation.lower())))
+            # The next link already carries the query
+            url, params = data.get("@odata.nextLink") or data.get("nextLink"), None
+        return rows
+
+    # Function to bring the cache up to date for resources x metrics over [start_time, end_time)
+    def collect(self, resource_ids, metrics, start_time, end_time, interval=None, aggregation="Total"):
+        interval = interval or choose_interval(start_time, end_time, self.max_points)
+        size = INTERVALS[interval]
+        start = to_epoch(start_time) // size * size
+        end = to_epoch(end_time)
+        settled = min(end, int(time.time() - self.settle.total_seconds())) // size * size
+
+        # Work out the missing ranges per resource; metrics with the same missing ranges share requests
+        jobs = []
+        for resource_id in resource_ids:
+            by_range = {}
+            for metric in metrics:
+                fetched = self.db.execute(
+                    "SELECT start, end FROM fetched WHERE resource_id=? AND metric=? AND interval=? AND aggregation=?",
+                    (resource_id, metric, interval, aggregation)).fetchall()
+                for gap_start, gap_end in missing_ranges(start, end, fetched):
+                    # Split a gap into requests of at most max_points points
+                    step = size * self.max_points
+                    for chunk_start in range(gap_start // size * size, gap_end, step):
+                        by_range.setdefault((chunk_start, min(gap_end, chunk_start + step)), []).append(metric)
+            jobs += [(resource_id, tuple(names), chunk_start, chunk_end)
+                     for (chunk_start, chunk_end), names in by_range.items()]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(lambda job: (job, self._fetch(job[0], job[1], interval, aggregation, job[2], job[3])),
+                                    jobs))
+
+        # Store the points and the fetched ranges (up to the settled time) in one transaction
+        with self.db:
+            for (resource_id, names, chunk_start, chunk_end), rows in results:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(resource_id, metric, interval, aggregation, deployment, timestamp, value)
+                     for metric, deployment, timestamp, value in rows])
+                self.counts["points"] += len(rows)
+                for metric in names:
+                    if min(chunk_end, settled) > chunk_start:
+                        self._add_fetched(resource_id, metric, interval, aggregation, chunk_start, min(chunk_end, settled))
+        return interval
+
+    def _add_fetched(self, resource_id, metric, interval, aggregation, start, end):
+        key = (resource_id, metric, interval, aggregation)
+        where = "resource_id=? AND metric=? AND interval=? AND aggregation=?"
+        ranges = self.db.execute(f"SELECT start, end FROM fetched WHERE {where}", key).fetchall()
+        self.db.execute(f"DELETE FROM fetched WHERE {where}", key)
+        self.db.executemany("INSERT INTO fetched VALUES (?, ?, ?, ?, ?, ?)",
+                            [key + merged for merged in merge_ranges(ranges + [(start, end)])])
+
+    # Function to return {deployment: [(timestamp, value), ...]} for a metric, fetching what the cache is missing
+    def series(self, resource_id, metric, deployments, start_time, end_time, interval=None, aggregation="Total"):
+        series = {}
+        arrays, _ = self.arrays(resource_id, metric, deployments, start_time, end_time, interval, aggregation)
+        for deployment, (timestamps, values) in arrays.items():
+            series[deployment] = [(datetime.fromtimestamp(int(t), timezone.utc), float(v)) for t, v in zip(timestamps, values)]
+        return series
+
+    # Function to return {deployment: (epoch seconds, values)} as NumPy arrays, fetching what the cache is missing,
+    # and the interval of the points
+    def arrays(self, resource_id, metric, deployments, start_time, end_time, interval=None, aggregation="Total"):
+        interval = self.collect([resource_id], [metric], start_time, end_time, interval, aggregation)
+        size = INTERVALS[interval]
+        query = ("SELECT deployment, timestamp, IFNULL(value, 0) FROM points WHERE resource_id=? AND metric=? "
+                 "AND interval=? AND aggregation=? AND timestamp>=? AND timestamp<? ORDER BY deployment, timestamp")
+        rows = np.array(self.db.execute(query, (resource_id, metric, interval, aggregation,
+                                                to_epoch(start_time) // size * size, to_epoch(end_time))).fetchall(),
+                        dtype=object).reshape(-1, 3)
+        names, starts = np.unique(rows[:, 0].astype(str), return_index=True)
+        timestamps, values = rows[:, 1].astype(np.int64), rows[:, 2].astype(np.float64)
+        bounds = list(starts) + [len(rows)]
+        return {name: (timestamps[bounds[i]:bounds[i + 1]], values[bounds[i]:bounds[i + 1]])
+                for i, name in enumerate(names) if deployments is None or name in deployments}, interval
+
+    def stats(self) -> dict:
+        return dict(self.counts, token_requests=self.bearer.requests)
+
+    def close(self):
+        self.session.close()
+        self.db.close()
@@ -0,0 +1,138 @@
+import math
+import time
+import argparse
+import numpy as np
+
+# Aggregations available when resampling
+AGGREGATIONS = ("sum", "mean", "max", "p95")
+
+
+# Function to resample a series into buckets of `bucket_seconds`, aggregating the points in each bucket
+def resample(timestamps, values, bucket_seconds, how="sum"):
+    if how not in AGGREGATIONS:
+        raise ValueError(f"how must be one of {', '.join(AGGREGATIONS)}, not {how!r}")
+    if len(timestamps) == 0:
+        return timestamps, values
+    buckets = timestamps // bucket_seconds
+    # Points are ordered by time, so each bucket is a contiguous run
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    if how == "sum":
+        result = np.add.reduceat(values, starts)
+    elif how == "mean":
+        result = np.add.reduceat(values, starts) / np.diff(np.append(starts, len(values)))
+    elif how == "max":
+        result = np.maximum.reduceat(values, starts)
+    else:
+        # Sort the values within each bucket and take the nearest-rank 95th percentile of each run
+        order = np.lexsort((values, buckets))
+        counts = np.diff(np.append(starts, len(values)))
+        result = values[order][starts + np.maximum(np.ceil(counts * 0.95).astype(np.int64) - 1, 0)]
+    return buckets[starts] * bucket_seconds, result
+
+
+# Function to downsample a series to `threshold` points with Largest-Triangle-Three-Buckets, which keeps
+# the peaks and dips that a plain average or stride would lose
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    x_float = x.astype(np.float64)
+    # Bucket edges for the points between the first and the last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # The third point of the triangle is the average of the next bucket (the last point for the last bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        average_x, average_y = x_float[next_start:next_end].mean(), y[next_start:next_end].mean()
+        # Twice the area of the triangle made by the previous selected point, each candidate and the average
+        areas = np.abs((x_float[previous] - average_x) * (y[start:end] - y[previous])
+                       - (x_float[previous] - x_float[start:end]) * (average_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return x[selected], y[selected]
+
+
+# Function to summarize a per-deployment token series: totals, tokens per minute and the busiest bucket
+def summarize(arrays, interval_seconds):
+    rows = []
+    for deployment, (timestamps, values) in sorted(arrays.items()):
+        minutes = max(1, interval_seconds // 60)
+        # With buckets coarser than a minute the peak is the busiest bucket's average per minute
+        per_minute = resample(timestamps, values, 60, "sum")[1] if interval_seconds <= 60 else values / minutes
+        active = per_minute[per_minute > 0]
+        rows.append({
+            "deployment": deployment,
+            "total_tokens": float(values.sum()),
+            "peak_tpm": float(per_minute.max()) if len(per_minute) else 0.0,
+            "mean_tpm": float(values.sum() / (len(values) * minutes)) if len(values) else 0.0,
+            # Nearest-rank, as resample(..., "p95"), so the value is a minute that actually occurred
+            "p95_tpm": float(np.sort(per_minute)[max(0, math.ceil(len(per_minute) * 0.95) - 1)]) if len(per_minute) else 0.0,
+            "active_minutes": int(len(active) * minutes),
+            "peak_time": int(timestamps[np.argmax(values)]) if len(values) else None,
+        })
+    return rows
+
+
+# Function to format summary rows as a text table
+def format_table(rows):
+    if not rows:
+        return "No data"
+    columns = [c for c in rows[0] if c != "peak_time"]
+    width = max(12, *(len(str(row["deployment"])) + 2 for row in rows))
+    lines = [f"{columns[0]:<{width}}" + "".join(f"{c:>16}" for c in columns[1:])]
+    for row in rows:
+        lines.append(f"{row['deployment']:<{width}}" + "".join(
+            f"{row[c]:>16,.0f}" if isinstance(row[c], float) else f"{row[c]:>16,}" for c in columns[1:]))
+    return "\n".join(lines)
+
+
+# Function to prepare series for plotting: resample to `bucket_seconds`, then cut to at most `max_points` points
+def prepare_plot_series(arrays, bucket_seconds=None, how="sum", max_points=1000):
+    prepared = {}
+    for deployment, (timestamps, values) in arrays.items():
+        if bucket_seconds:
+            timestamps, values = resample(timestamps, values, bucket_seconds, how)
+        prepared[deployment] = lttb(timestamps, values, max_points)
+    return prepared
+
+
+# Function to compare plotting the raw points with plotting the prepared points, for growing time ranges
+def benchmark(days_list, deployments, max_points):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    rng = np.random.default_rng(0)
+
+    def render(series):
+        start = time.perf_counter()
+        figure = plt.figure(figsize=(12, 6))
+        for name, (timestamps, values) in series.items():
+            plt.plot(timestamps.astype("datetime64[s]"), values, label=name)
+        plt.legend()
+        figure.canvas.draw()
+        plt.close(figure)
+        return time.perf_counter() - start
+
+    print(f"{'days':>6} {'points':>10} {'raw plot s':>11} {'prepare s':>10} {'prepared plot s':>16}")
+    for days in days_list:
+        timestamps = np.arange(0, days * 86400, 60, dtype=np.int64)
+        arrays = {f"deployment-{i}": (timestamps, rng.gamma(2.0, 500.0, len(timestamps))) for i in range(deployments)}
+        raw = render(arrays)
+        start = time.perf_counter()
+        prepared = prepare_plot_series(arrays, max_points=max_points)
+        summarize(arrays, 60)
+        prepare = time.perf_counter() - start
+        print(f"{days:>6} {len(timestamps) * deployments:>10,} {raw:>11.3f} {prepare:>10.3f} {render(prepared):>16.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure plotting raw and downsampled per-minute token series.")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 7, 30, 90])
+    parser.add_argument("--deployments", type=int, default=2)
+    parser.add_argument("--max-points", type=int, default=1000)
+    args = parser.parse_args()
+    benchmark(args.days, args.deployments, args.max_points)
@@ -1,11 +1,8 @@
-import requests
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
 import matplotlib.pyplot as plt
-from azure.identity import DefaultAzureCredential
-
-credential = DefaultAzureCredential()
-token = credential.get_token("https://management.azure.com/.default")
-access_token = token.token
+from metrics_collector import INTERVALS, MetricsCollector
+from metrics_processing import format_table, prepare_plot_series, summarize
 
 # Define the resource ID and the metric name
 resource_id = "your_resource_id"
@@ -13,51 +10,41 @@ metric_name = "TokenTransaction"
 model_deployment_names = ["gpt-4o", "gpt-4o-mini"]
 
 # Calculate the timespan for the last 30 minutes
-end_time = datetime.now()
-start_time = end_time - timedelta(minutes=30) # Feel free to change timedelta to (hours=1), if necessary 
-timespan = f"{start_time.isoformat()}Z/{end_time.isoformat()}Z"
-
-# Create the filter condition for multiple model deployment names
-filter_condition = " or ".join([f"ModelDeploymentName eq '{name}'" for name in model_deployment_names])
-
-# Define the API endpoint with timespan and filter condition
-url = f"https://management.azure.com{resource_id}/providers/microsoft.insights/metrics?api-version=2018-01-01&metricnames={metric_name}&timespan={timespan}&$filter={filter_condition}"
-
-# Set the headers
-headers = {
-    "Authorization": f"Bearer {access_token}",
-    "Content-Type": "application/json"
-}
-
-# Make the request
-response = requests.get(url, headers=headers)
-
-# Check the response
-if response.status_code == 200:
-    data = response.json()
-
-    # Extract time series data for each model deployment name
-    time_series_data = {}
-    for value in data['value']:
-        for timeseries in value['timeseries']:
-            model_name = timeseries['metadatavalues'][0]['value']
-            if model_name not in time_series_data:
-                time_series_data[model_name] = []
-            for data_point in timeseries['data']:
-                time_series_data[model_name].append((data_point['timeStamp'], data_point['total']))
-
-    # Plot the metrics over the timespan for each model deployment name
-    plt.figure(figsize=(12, 6))
-    for model_name, series in time_series_data.items():
-        timestamps, values = zip(*series)
-        plt.plot(timestamps, values, label=model_name)
-
-    plt.xlabel('Timestamp')
-    plt.ylabel('Processed Inference Tokens')
-    plt.title('Processed Inference Tokens Usage Over Time')
-    plt.legend()
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig('imgs/plot.png')
-else:
-    print("Failed to retrieve metrics:", response.status_code, response.text)
+end_time = datetime.now(timezone.utc)
+start_time = end_time - timedelta(minutes=30) # Feel free to change timedelta to (hours=1), if necessary
+
+# Optional granularity of the plot, e.g. timedelta(hours=1), with the aggregation of the points in it
+# (sum, mean, max or p95); long timespans are also cut to at most max_points points per deployment
+granularity = None
+aggregation = "sum"
+max_points = 1000
+
+# Get the metric for each model deployment name; points are kept in metrics_cache.db, so
+# running the script again only downloads the minutes that are not in the cache yet
+collector = MetricsCollector("metrics_cache.db")
+try:
+    time_series_data, interval = collector.arrays(resource_id, metric_name, model_deployment_names, start_time, end_time)
+except Exception as e:
+    print("Failed to retrieve metrics:", e)
+    raise SystemExit(1)
+print("Metrics requests:", collector.stats())
+
+# Print the totals and tokens per minute of each model deployment name, at the interval the points were fetched in
+print(format_table(summarize(time_series_data, INTERVALS[interval])))
+
+# Plot the metrics over the timespan for each model deployment name
+start = time.perf_counter()
+plot_data = prepare_plot_series(time_series_data, int(granularity.total_seconds()) if granularity else None,
+                                aggregation, max_points)
+plt.figure(figsize=(12, 6))
+for model_name, (timestamps, values) in plot_data.items():
+    plt.plot(timestamps.astype("datetime64[s]"), values, label=model_name)
+
+plt.xlabel('Timestamp')
+plt.ylabel('Processed Inference Tokens')
+plt.title('Processed Inference Tokens Usage Over Time')
+plt.legend()
+plt.xticks(rotation=45)
+plt.tight_layout()
+plt.savefig('imgs/plot.png')
+print(f"Plotted {sum(len(t) for t, _ in plot_data.values())} points in {time.perf_counter() - start:.2f}s")
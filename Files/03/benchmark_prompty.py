@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import prompty
+import prompty.azure
+from pathlib import Path
+from prompty_cache import PromptyCache
+
+HERE = Path(__file__).resolve().parent
+
+# The .prompty files of the labs and an example of the inputs each one expects
+PROMPTY_FILES = {
+    HERE / "start.prompty": {"question": "What are some recommended supplies for a camping trip in the mountains?"},
+    HERE / "solution" / "solution-0.prompty": {"question": "What's the difference between 'for' loops and 'while' loops?"},
+    HERE / "solution" / "solution-1.prompty": {"question": "What's the difference between 'for' loops and 'while' loops?"},
+    HERE.parent / "06" / "application.prompty": {
+        "conversation_history": {},
+        "context": "Trails above the tree line are exposed to the weather.",
+        "query": "What should I pack for a day hike?",
+    },
+}
+
+
+# Function to start the mock model server from Files/mock in this process, with no added latency; returns its endpoint
+def start_mock_server():
+    sys.path.append(str(HERE.parent / "mock"))
+    from mock_openai_server import start_server
+    return start_server(latency=0.0).url
+
+
+# Function to time a number of calls, returning the per-call latencies in milliseconds
+def time_calls(call, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def benchmark(calls, endpoint):
+    # The .prompty files read their connection settings from these variables
+    os.environ["AZURE_OPENAI_ENDPOINT"] = endpoint
+    os.environ["AZURE_OPENAI_API_KEY"] = "mock"
+    os.environ.setdefault("AZURE_OPENAI_CHAT_DEPLOYMENT", "gpt-4o")
+    os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
+    os.environ.setdefault("OPENAI_API_VERSION", "2024-10-21")
+
+    # solution-0.prompty has no key or deployment of its own, so pass them as prompty.execute allows
+    configuration = {"api_key": "mock", "azure_deployment": os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]}
+    cache = PromptyCache(configuration)
+    print(f"{'prompty':<22} {'execute ms':>11} {'cached ms':>10} {'speedup':>8}")
+    for path, inputs in PROMPTY_FILES.items():
+        # Warm up both paths so imports and the first connection are not measured
+        prompty.execute(str(path), configuration, inputs=inputs)
+        cache.execute(path, inputs=inputs)
+        before = statistics.median(time_calls(lambda: prompty.execute(str(path), configuration, inputs=inputs), calls))
+        after = statistics.median(time_calls(lambda: cache.execute(path, inputs=inputs), calls))
+        print(f"{path.name:<22} {before:>11.2f} {after:>10.2f} {before / after:>7.1f}x")
+    print(f"Cache: {cache.misses} compiled, {cache.hits} reused")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-call overhead of prompty.execute with the compiled prompty cache.")
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--endpoint", help="model endpoint to call; by default a local mock server is started")
+    args = parser.parse_args()
+
+    benchmark(args.calls, args.endpoint or start_mock_server())
@@ -0,0 +1,246 @@
+import os
+import json
+import gzip
+import time
+import queue
+import random
+import atexit
+import argparse
+import threading
+import contextlib
+import contextvars
+import importlib.metadata
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+# Frame that trace records of the current thread or asyncio task are added to
+_current_frame = contextvars.ContextVar("buffered_tracer_frame", default=None)
+
+# Placeholder for the frames of a trace that was not sampled
+_NOT_SAMPLED = {"sampled": False}
+
+# Ends the writer thread
+_STOP = object()
+
+
+# Function to cap the size of a traced value: long strings are cut and long lists shortened
+def cap_value(value, max_chars, max_items):
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else f"{value[:max_chars]}...[+{len(value) - max_chars} chars]"
+    if isinstance(value, dict):
+        return {k: cap_value(v, max_chars, max_items) for k, v in value.items()}
+    if isinstance(value, list):
+        capped = [cap_value(v, max_chars, max_items) for v in value[:max_items]]
+        if len(value) > max_items:
+            capped.append(f"...[+{len(value) - max_items} items]")
+        return capped
+    return value
+
+
+# Function to add the numeric usage fields of src to cur (as PromptyTracer does)
+def hoist_usage(src, cur):
+    for key, value in src.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cur[key] = cur.get(key, 0) + value
+    return cur
+
+
+class BufferedTracer:
+    """Prompty tracer back end that keeps trace writing off the request path.
+
+    Finished traces are put on a queue and a background thread appends them, one
+    JSON object per line, to gzip-compressed files in `output_dir`. A file is
+    closed once it reaches `max_file_bytes` and only the newest `max_files` are
+    kept. Each trace is sampled at its start with `head_sample_rate`; traces that
+    are not sampled record nothing. Sampled traces are kept with `tail_sample_rate`,
+    except failed traces and traces slower than `slow_ms`, which are always kept.
+    Strings longer than `max_value_chars` and lists longer than `max_list_items`
+    are truncated. If the queue is full, traces are dropped rather than waited on.
+
+        json_tracer = BufferedTracer(head_sample_rate=0.1)
+        Tracer.add("BufferedTracer", json_tracer.tracer)
+
+    Each line has the same layout as a PromptyTracer .tracy file.
+    """
+
+    def __init__(
+        self,
+        output_dir: Optional[str] = None,
+        head_sample_rate: float = 1.0,
+        tail_sample_rate: float = 1.0,
+        slow_ms: Optional[float] = None,
+        max_value_chars: int = 2000,
+        max_list_items: int = 100,
+        max_file_bytes: int = 50 * 1024 * 1024,
+        max_files: int = 10,
+        queue_size: int = 10000,
+        compresslevel: int = 6,
+    ):
+        self.output = Path(output_dir or Path(os.getcwd()) / ".runs").resolve()
+        self.output.mkdir(parents=True, exist_ok=True)
+        self.head_sample_rate = head_sample_rate
+        self.tail_sample_rate = tail_sample_rate
+        self.slow_ms = slow_ms
+        self.max_value_chars = max_value_chars
+        self.max_list_items = max_list_items
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.compresslevel = compresslevel
+        self.version = importlib.metadata.version("prompty")
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.counts = {"traces": 0, "head_sampled_out": 0, "tail_sampled_out": 0, "dropped": 0, "written": 0, "files": 0}
+        self.file = None
+        self.file_path = None
+        self.writer = threading.Thread(target=self._write_loop, name="BufferedTracer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    @contextlib.contextmanager
+    def tracer(self, name: str) -> Iterator[Callable[[str, Any], None]]:
+        parent = _current_frame.get()
+        if parent is _NOT_SAMPLED or (parent is None and random.random() >= self.head_sample_rate):
+            if parent is None:
+                self.counts["head_sampled_out"] += 1
+            token = _current_frame.set(_NOT_SAMPLED)
+            try:
+                yield lambda key, value: None
+            finally:
+                _current_frame.reset(token)
+            return
+
+        frame = {"name": name, "__time": {"start": datetime.now()}}
+        token = _current_frame.set(frame)
+
+        def add(key: str, value: Any) -> None:
+            value = cap_value(value, self.max_value_chars, self.max_list_items)
+            if key not in frame:
+                frame[key] = value
+            # multiple values creates list
+            elif isinstance(frame[key], list):
+                frame[key].append(value)
+            else:
+                frame[key] = [frame[key], value]
+
+        try:
+            yield add
+        finally:
+            _current_frame.reset(token)
+            self._finish(frame, parent)
+
+    def _finish(self, frame, parent):
+        start = frame["__time"]["start"]
+        end = datetime.now()
+        duration = int((end - start).total_seconds() * 1000)
+        frame["__time"] = {
+            "start": start.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "end": end.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "duration": duration,
+        }
+
+        # hoist usage from the result and the child frames, as PromptyTracer does
+        results = frame.get("result")
+        for result in results if isinstance(results, list) else [results]:
+            if isinstance(result, dict) and isinstance(result.get("usage"), dict):
+                frame["__usage"] = hoist_usage(result["usage"], frame.get("__usage", {}))
+        for child in frame.get("__frames", []):
+            if "__usage" in child:
+                frame["__usage"] = hoist_usage(child["__usage"], frame.get("__usage", {}))
+        failed = isinstance(results, dict) and "exception" in results
+        if failed or any(child.get("__failed") for child in frame.get("__frames", [])):
+            frame["__failed"] = True
+
+        if parent is not None:
+            parent.setdefault("__frames", []).append(frame)
+            return
+
+        self.counts["traces"] += 1
+        keep = (frame.get("__failed") or (self.slow_ms is not None and duration >= self.slow_ms)
+                or random.random() < self.tail_sample_rate)
+        if not keep:
+            self.counts["tail_sampled_out"] += 1
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except queue.Full:
+            self.counts["dropped"] += 1
+
+    def _open_file(self):
+        timestamp = datetime.now().strftime("%Y%m%d.%H%M%S.%f")
+        self.file_path = self.output / f"trace.{timestamp}.jsonl.gz"
+        self.file = gzip.open(self.file_path, "wb", compresslevel=self.compresslevel)
+        self.counts["files"] += 1
+        # Remove the oldest files beyond max_files
+        files = sorted(self.output.glob("trace.*.jsonl.gz"))
+        for old in files[:max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+    def _write_loop(self):
+        while True:
+            frame = self.queue.get()
+            if frame is _STOP:
+                break
+            if self.file is None:
+                self._open_file()
+            record = {"runtime": "python", "version": self.version, "trace": frame}
+            self.file.write((json.dumps(record, default=str) + "\n").encode("utf-8"))
+            self.counts["written"] += 1
+            # Rotate once the compressed file is full; otherwise write out what is buffered when the queue runs empty
+            if self.file.fileobj.tell() >= self.max_file_bytes:
+                self.file.close()
+                self.file = None
+            elif self.queue.empty():
+                self.file.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    # Write out queued traces and stop the writer thread
+    def close(self):
+        if self.writer.is_alive():
+            self.queue.put(_STOP)
+            self.writer.join()
+
+    def stats(self) -> dict:
+        return dict(self.counts, queued=self.queue.qsize())
+
+
+# Function to read back the traces written by a BufferedTracer
+def read_traces(output_dir):
+    for path in sorted(Path(output_dir).glob("trace.*.jsonl.gz")):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+# Function to compare the per-call cost of PromptyTracer and BufferedTracer on a traced function
+def benchmark(calls, input_chars):
+    import tempfile
+    from prompty.tracer import trace, Tracer, PromptyTracer
+
+    @trace
+    def run(question: str) -> str:
+        return question[::-1]
+
+    question = "x" * input_chars
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, make in (("PromptyTracer", lambda: PromptyTracer(os.path.join(tmp, "json")).tracer),
+                            ("BufferedTracer", lambda: BufferedTracer(os.path.join(tmp, "buffered")).tracer),
+                            ("BufferedTracer 10% head sampling",
+                             lambda: BufferedTracer(os.path.join(tmp, "sampled"), head_sample_rate=0.1).tracer)):
+            Tracer.clear()
+            Tracer.add(label, make())
+            start = time.perf_counter()
+            for _ in range(calls):
+                run(question)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<34} {elapsed / calls * 1e6:>9.1f} us per traced call")
+        Tracer.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the per-call cost of the prompty tracers.")
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--input-chars", type=int, default=5000, help="size of the traced input")
+    args = parser.parse_args()
+    benchmark(args.calls, args.input_chars)
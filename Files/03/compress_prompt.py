@@ -0,0 +1,294 @@
+import re
+import sys
+import json
+import argparse
+import importlib
+import itertools
+import yaml
+import tiktoken
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+from jinja2 import Template
+
+# Same role markers as the prompty chat parser: a role name alone on a line, followed by a colon
+ROLE_SEPARATOR = re.compile(r"(?im)^\s*#?\s*(assistant|function|system|user)\s*:\s*\n")
+
+# A line that starts the few-shot examples inside the system message (as in start.prompty)
+EXAMPLES_MARKER = re.compile(r"(?im)^\s*examples?\s*:\s*$")
+
+# Jinja expressions are never rewritten or dropped
+TEMPLATE_EXPRESSION = re.compile(r"(\{\{.*?\}\}|\{%.*?%\})", re.S)
+
+# Chat formatting overhead per message and per reply (as in token-count.py)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Wording that can be deleted whole without changing an instruction or breaking the sentence around it.
+# Only deletions are listed, so a filler rewrite never turns an adverbial phrase into a wrong part of speech.
+FILLER_PATTERNS = [
+    # "Your job is to answer ..." -> "Answer ...", only at the start of a sentence
+    (r"(?m)(^|(?<=[.!?]\s))(your|the assistant's) (job|task|role|goal) is to\s+", ""),
+    (r"(?m)(^|(?<=[.!?]\s))as the assistant,\s*", ""),
+    (r"\b(please|kindly|basically|actually|really)\s+", ""),
+    (r"\bin order (?=to\b)", ""),
+    (r"(?<=\band )even\s+", ""),
+    (r"[ \t]{2,}", " "),
+]
+
+# Words dropped by the telegraphic rewrite
+TELEGRAPHIC_WORDS = r"\b(a|an|the|that|which|who|some)\s+"
+
+
+@dataclass
+class Candidate:
+    name: str
+    body: str
+    tokens: float = 0.0
+    quality: float = 0.0
+    answers: List[str] = field(default_factory=list)
+    pareto: bool = False
+
+
+# Function to split a .prompty file into its front matter (dict and raw text) and body
+def read_prompty(path):
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if not text.startswith("---"):
+        return {}, "", text
+    end = text.find("\n---", 3)
+    front_matter = text[3:end]
+    body = text[end + 4:].lstrip("\n")
+    return yaml.safe_load(front_matter) or {}, front_matter, body
+
+
+# Function to split a body into [role, text] sections, like the prompty chat parser
+def split_sections(body):
+    chunks = ROLE_SEPARATOR.split(body)
+    sections = [["system", chunks[0]]] if chunks[0].strip() else []
+    for role, text in zip(chunks[1::2], chunks[2::2]):
+        sections.append([role.lower(), text])
+    return sections
+
+
+def join_sections(sections):
+    return "\n".join(f"{role}:\n{text.strip()}\n" for role, text in sections)
+
+
+# Function to render a body with inputs into chat messages
+def render_messages(body, inputs):
+    return [{"role": role, "content": text.strip()}
+            for role, text in split_sections(Template(body).render(**inputs))]
+
+
+# Function to apply text rewrites outside template expressions
+def rewrite(text, patterns):
+    parts = TEMPLATE_EXPRESSION.split(text)
+    for i in range(0, len(parts), 2):
+        for pattern, replacement in patterns:
+            parts[i] = re.sub(pattern, replacement, parts[i], flags=re.I)
+    text = "".join(parts)
+    # Capitalize sentences whose first words were removed
+    return re.sub(r"(^|[.!?]\s+)([a-z])", lambda m: m.group(1) + m.group(2).upper(), text)
+
+
+# Function to split instructions into paragraphs of sentences; headings and lines with template expressions are kept whole
+def paragraphs(text):
+    result = []
+    for block in re.split(r"\n\s*\n", text.strip()):
+        lines = [line.strip() for line in block.splitlines() if line.strip()]
+        prose, kept = [], []
+        for line in lines:
+            if line.startswith("#") or TEMPLATE_EXPRESSION.search(line):
+                kept.append(line)
+            else:
+                prose.append(line)
+        if prose:
+            result.append(re.split(r"(?<=[.!?])\s+", " ".join(prose)))
+        result.extend([line] for line in kept)
+    return result
+
+
+def join_paragraphs(paras):
+    return "\n\n".join(" ".join(sentences) for sentences in paras if sentences)
+
+
+# Function to generate compressed variants of the instructions, as (name, text) pairs
+def instruction_variants(text):
+    variants = [("original", text), ("filler", rewrite(text, FILLER_PATTERNS)),
+                ("telegraphic", rewrite(text, FILLER_PATTERNS + [(TELEGRAPHIC_WORDS, "")]))]
+    paras = paragraphs(text)
+    droppable = [(p, s) for p, sentences in enumerate(paras) for s, sentence in enumerate(sentences)
+                 if not sentence.startswith("#") and not TEMPLATE_EXPRESSION.search(sentence)]
+    # Leave each sentence out in turn
+    for p, s in droppable:
+        reduced = [[x for j, x in enumerate(sentences) if (i, j) != (p, s)] for i, sentences in enumerate(paras)]
+        variants.append((f"drop:{paras[p][s][:30]}", join_paragraphs(reduced)))
+    # Keep only the first sentence, headings and lines with template expressions
+    if len(droppable) > 1:
+        first = droppable[0]
+        minimal = [[x for j, x in enumerate(sentences) if (i, j) == first or (i, j) not in droppable]
+                   for i, sentences in enumerate(paras)]
+        variants.append(("first-sentence", join_paragraphs(minimal)))
+        variants.append(("no-headings", join_paragraphs([s for s in paras if not s[0].startswith("#")])))
+    return variants
+
+
+# Function to generate variants of the few-shot examples, as (name, text) pairs
+def example_variants(examples):
+    if not examples.strip():
+        return [("", "")]
+    variants = [("examples", examples)]
+    starts = [m.start() for m in re.finditer(r"(?im)^\s*user\s*:", examples)]
+    if len(starts) > 1:
+        variants.append(("first-example", examples[:starts[1]]))
+    variants.append(("no-examples", ""))
+    return variants
+
+
+# Function to build the candidate bodies: every instruction variant combined with every example variant
+def generate_candidates(body):
+    sections = split_sections(body)
+    system_index = next((i for i, (role, _) in enumerate(sections) if role == "system"), None)
+    last_user = max((i for i, (role, _) in enumerate(sections) if role == "user"), default=len(sections))
+    if system_index is None:
+        return [Candidate("original", body)]
+
+    system_text = sections[system_index][1]
+    marker = EXAMPLES_MARKER.search(system_text)
+    instructions, examples = (system_text[:marker.start()], system_text[marker.start():]) if marker else (system_text, "")
+    # Few-shot examples can also be user/assistant messages between the system message and the last question
+    shot_messages = sections[system_index + 1:last_user]
+
+    candidates, seen = [Candidate("original", body)], {body}
+    for (i_name, i_text), (e_name, e_text), keep_shots in itertools.product(
+            instruction_variants(instructions), example_variants(examples),
+            [True, False] if shot_messages else [True]):
+        system = i_text.strip() + ("\n\n" + e_text.strip() if e_text.strip() else "")
+        new_sections = ([[r, t] for r, t in sections[:system_index]] + [["system", system]]
+                        + ([[r, t] for r, t in shot_messages] if keep_shots else []) + sections[last_user:])
+        candidate_body = join_sections(new_sections)
+        if candidate_body in seen:
+            continue
+        seen.add(candidate_body)
+        name = "+".join(n for n in (i_name, e_name, "" if keep_shots else "no-shot-messages") if n)
+        candidates.append(Candidate(name, candidate_body))
+    return candidates
+
+
+# Function to count the tokens of chat messages, including the per-message overhead
+def count_message_tokens(encoding, messages):
+    return TOKENS_PER_REPLY + sum(TOKENS_PER_MESSAGE + len(encoding.encode(m["role"])) + len(encoding.encode(m["content"]))
+                                  for m in messages)
+
+
+# Function used as the default model stand-in: answers with the question's words and the instruction
+# words it was given, so an answer changes when instructions that shape it are removed
+def echo_model(messages):
+    question = messages[-1]["content"] if messages else ""
+    instructions = " ".join(m["content"] for m in messages[:-1])
+    words = re.findall(r"[a-z']+", instructions.lower())
+    kept = [w for w in dict.fromkeys(words) if len(w) > 3]
+    brief = any(w in words for w in ("concise", "concisely", "brief", "briefly", "succinct", "succinctly"))
+    return " ".join(re.findall(r"\w+", question.lower()) + kept[:12 if brief else 40])
+
+
+# Function to score an answer against a reference answer (token F1, as used for extractive QA)
+def token_f1(answer, reference):
+    a, r = Counter(re.findall(r"\w+", answer.lower())), Counter(re.findall(r"\w+", reference.lower()))
+    if not a or not r:
+        return float(a == r)
+    common = sum((a & r).values())
+    if common == 0:
+        return 0.0
+    precision, recall = common / sum(a.values()), common / sum(r.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+# Function to load a model stand-in given as "module:function"; the function takes chat messages and returns text
+def load_model(spec):
+    if spec is None:
+        return echo_model
+    module_name, _, function_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), function_name or "complete")
+
+
+# Function to evaluate every candidate and mark the Pareto frontier of tokens versus quality
+def evaluate(candidates: List[Candidate], eval_set: List[Dict], model: Callable, encoding):
+    references = None
+    for candidate in candidates:
+        message_sets = [render_messages(candidate.body, inputs) for inputs in eval_set]
+        candidate.tokens = sum(count_message_tokens(encoding, m) for m in message_sets) / len(message_sets)
+        candidate.answers = [model(messages) for messages in message_sets]
+        # The first candidate is the original prompt, whose answers are the reference
+        if references is None:
+            references = candidate.answers
+        candidate.quality = sum(token_f1(a, r) for a, r in zip(candidate.answers, references)) / len(references)
+
+    best_quality = -1.0
+    for candidate in sorted(candidates, key=lambda c: (c.tokens, -c.quality)):
+        if candidate.quality > best_quality:
+            candidate.pareto = True
+            best_quality = candidate.quality
+    return candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search for shorter versions of a .prompty prompt that keep answer quality.")
+    parser.add_argument("prompty", help="path to the .prompty file")
+    parser.add_argument("--eval", help="JSONL file with one set of prompt inputs per line (default: the prompty's sample)")
+    parser.add_argument("--model", help="local model stand-in as module:function (default: built-in echo model)")
+    parser.add_argument("--tokenizer", default="gpt-4o", help="model whose tokenizer is used to count tokens")
+    parser.add_argument("--min-quality", type=float, default=0.9, help="lowest acceptable quality of a compression")
+    parser.add_argument("--input-price", type=float, default=2.50, help="USD per 1M input tokens")
+    parser.add_argument("--prefill-ms", type=float, default=0.2, help="milliseconds of latency per input token")
+    parser.add_argument("--requests", type=int, default=1_000_000, help="requests to project the savings over")
+    parser.add_argument("--all", action="store_true", help="list every candidate, not only the Pareto frontier")
+    parser.add_argument("--report", help="write all candidates and scores to this JSON file")
+    parser.add_argument("--write-best", help="write the best acceptable compression to this .prompty file")
+    args = parser.parse_args()
+
+    attributes, front_matter, body = read_prompty(args.prompty)
+    if args.eval:
+        with open(args.eval, "r", encoding="utf-8") as f:
+            eval_set = [json.loads(line) for line in f if line.strip()]
+    else:
+        eval_set = [attributes.get("sample") or {}]
+
+    try:
+        encoding = tiktoken.encoding_for_model(args.tokenizer)
+    except KeyError:
+        encoding = tiktoken.get_encoding(args.tokenizer)
+    candidates = evaluate(generate_candidates(body), eval_set, load_model(args.model), encoding)
+    original = candidates[0]
+
+    print(f"{len(candidates)} candidates, {len(eval_set)} evaluation inputs, original prompt {original.tokens:.0f} tokens")
+    print(f"{'tokens':>7} {'quality':>8} {'saved':>6} {'ms/req':>7} {'USD/' + format(args.requests, ','):>14}  candidate")
+    for candidate in sorted(candidates, key=lambda c: c.tokens):
+        if not (candidate.pareto or args.all):
+            continue
+        saved = original.tokens - candidate.tokens
+        flag = "*" if candidate.pareto else " "
+        flag += " " if candidate.quality >= args.min_quality else "!"
+        print(f"{candidate.tokens:>7.0f} {candidate.quality:>8.3f} {saved:>6.0f} {saved * args.prefill_ms:>7.2f} "
+              f"{saved * args.requests * args.input_price / 1_000_000:>14.2f} {flag} {candidate.name}")
+    print("* Pareto frontier, ! below --min-quality")
+
+    acceptable = [c for c in candidates if c.pareto and c.quality >= args.min_quality]
+    best = min(acceptable, key=lambda c: c.tokens) if acceptable else original
+    saved = original.tokens - best.tokens
+    print(f"Best acceptable: {best.name} ({best.tokens:.0f} tokens, quality {best.quality:.3f}), saving "
+          f"{saved:.0f} tokens ({saved / original.tokens:.0%}), {saved * args.prefill_ms:.2f} ms per request and "
+          f"${saved * args.requests * args.input_price / 1_000_000:,.2f} per {args.requests:,} requests")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump([{"name": c.name, "tokens": c.tokens, "quality": c.quality, "pareto": c.pareto,
+                        "body": c.body, "answers": c.answers} for c in candidates], f, indent=2)
+    if args.write_best:
+        with open(args.write_best, "w", encoding="utf-8") as f:
+            f.write(f"---{front_matter}\n---\n\n{best.body}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
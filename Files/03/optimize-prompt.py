@@ -1,15 +1,28 @@
+import os
+import sys
 import json
+import time
 import prompty
 import prompty.azure
+import prompty_cache
+from buffered_tracer import BufferedTracer
 from typing import Any
 from prompty.tracer import trace, Tracer, console_tracer, PromptyTracer
 from dotenv import load_dotenv
 
+# Shared helpers in Files/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from streaming import collect_stream, streaming_enabled
+
 load_dotenv()
 
-# add json tracer:
-json_tracer = PromptyTracer()
-Tracer.add("PromptyTracer", json_tracer.tracer)
+# add json tracer (PROMPTY_TRACER=buffered in .env writes sampled, compressed traces from a background thread):
+if os.getenv("PROMPTY_TRACER", "json") == "buffered":
+    json_tracer = BufferedTracer(head_sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")))
+    Tracer.add("BufferedTracer", json_tracer.tracer)
+else:
+    json_tracer = PromptyTracer()
+    Tracer.add("PromptyTracer", json_tracer.tracer)
 
 @trace
 
@@ -17,8 +30,25 @@ def run(
       question: Any
 ) -> str:
 
-  # execute the prompty file
-  result = prompty.execute(
+  if streaming_enabled():
+    # print the answer as it arrives and record its timing in the trace
+    start = time.perf_counter()
+    stream = prompty_cache.execute(
+      "start.prompty",
+      inputs={
+        "question": question
+      },
+      parameters={"stream": True, "stream_options": {"include_usage": True}},
+      raw=True
+    )
+    result, metrics = collect_stream(stream, start)
+    with Tracer.start("stream_metrics") as stream_trace:
+      for key, value in metrics.attributes().items():
+        stream_trace(key, value)
+    return result
+
+  # execute the prompty file (loaded and compiled once, then reused until the file changes)
+  result = prompty_cache.execute(
     "start.prompty", 
     inputs={
       "question": question
@@ -34,4 +64,6 @@ if __name__ == "__main__":
             print("Exiting.")
             break
         result = run(question=user_question)
-        print(result)
+        # A streamed answer has already been printed
+        if not streaming_enabled():
+            print(result)
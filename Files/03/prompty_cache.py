@@ -0,0 +1,149 @@
+import sys
+import threading
+from pathlib import Path
+import prompty
+import prompty.azure
+from jinja2 import DictLoader, Environment
+from openai import AzureOpenAI, OpenAI
+from prompty.tracer import trace
+
+# CompiledPrompty calls private parts of prompty (InvokerFactory._get_invoker and the renderer's templates), as
+# found in the prompty version pinned in the lab instructions (0.1.50); with a version that lacks them,
+# PromptyCache runs the files with prompty.execute instead
+try:
+    from prompty.core import param_hoisting
+    from prompty.invoker import InvokerFactory
+except ImportError:
+    param_hoisting = InvokerFactory = None
+
+
+# Function to create the model client described by a prompty's configuration (as the prompty executors do)
+def create_client(configuration):
+    kwargs = {key: value for key, value in configuration.items() if key not in ("type", "azure_deployment", "name")}
+    if configuration.get("type") == "openai":
+        return OpenAI(**kwargs)
+    if "api_key" not in kwargs:
+        import azure.identity
+        credential = (azure.identity.ManagedIdentityCredential(client_id=kwargs.pop("client_id"))
+                      if "client_id" in kwargs else
+                      azure.identity.DefaultAzureCredential(exclude_shared_token_cache_credential=True))
+        kwargs["azure_ad_token_provider"] = azure.identity.get_bearer_token_provider(
+            credential, "https://cognitiveservices.azure.com/.default")
+    return AzureOpenAI(**kwargs)
+
+
+class CompiledPrompty:
+    """A .prompty file that has been loaded, compiled and connected once.
+
+    The front matter is parsed, ${env:...} references resolved, the template
+    compiled and the model client created when the object is built; execute()
+    only renders the inputs, calls the model and processes the response.
+    Raises AttributeError if prompty lacks the internals this relies on.
+    """
+
+    def __init__(self, path, configuration={}):
+        if not hasattr(InvokerFactory, "_get_invoker") or param_hoisting is None:
+            raise AttributeError("prompty does not provide InvokerFactory._get_invoker")
+        self.path = Path(path)
+        self.prompty = prompty.load(str(self.path))
+        if configuration:
+            self.prompty.model.configuration = param_hoisting(configuration, self.prompty.model.configuration)
+        self.renderer = InvokerFactory._get_invoker("renderer", self.prompty)
+        self.parser = InvokerFactory._get_invoker("parser", self.prompty)
+        self.processor = InvokerFactory._get_invoker("processor", self.prompty)
+        # The jinja2 renderer builds a new environment per call, so compile its template here instead
+        self.template = None
+        if self.prompty.template.type == "jinja2":
+            self.template = Environment(loader=DictLoader(self.renderer.templates)).get_template(self.renderer.name)
+        configuration = self.prompty.model.configuration
+        self.client = create_client(configuration)
+        self.model = configuration.get("azure_deployment") or configuration.get("name")
+        self.api = self.prompty.model.api
+        self.parameters = dict(self.prompty.model.parameters)
+
+    # Render the inputs into the messages sent to the model
+    def prepare(self, inputs={}):
+        inputs = param_hoisting(inputs, self.prompty.sample)
+        rendered = self.template.render(**inputs) if self.template is not None else self.renderer.invoke(inputs)
+        return self.parser.invoke(rendered)
+
+    @trace
+    def execute(self, inputs={}, parameters={}, raw=False):
+        content = self.prepare(inputs)
+        arguments = {**self.parameters, **parameters}
+        if self.api == "chat":
+            response = self.client.chat.completions.create(
+                model=self.model, messages=content if isinstance(content, list) else [content], **arguments)
+        elif self.api == "completion":
+            response = self.client.completions.create(model=self.model, prompt=content, **arguments)
+        else:
+            raise ValueError(f"Unsupported prompty api: {self.api}")
+        return response if raw else self.processor.invoke(response)
+
+
+class PlainPrompty:
+    """A .prompty file run with prompty.execute on every call, for prompty versions CompiledPrompty does not support."""
+
+    def __init__(self, path, configuration={}):
+        self.path = Path(path)
+        self.configuration = configuration
+
+    def execute(self, inputs={}, parameters={}, raw=False):
+        return prompty.execute(str(self.path), self.configuration, parameters, inputs, raw)
+
+
+class PromptyCache:
+    """Cache of CompiledPrompty objects keyed by file path and modification time.
+
+    Editing a .prompty file changes its mtime, so the next get() recompiles it;
+    otherwise the compiled template and model client are reused across calls and
+    threads. `configuration` overrides the model configuration of every file, like
+    the configuration argument of prompty.execute.
+
+        cache = PromptyCache()
+        result = cache.execute("start.prompty", inputs={"question": question})
+    """
+
+    def __init__(self, configuration={}):
+        self.configuration = configuration
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        path = Path(path).resolve()
+        stat = path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            try:
+                compiled = CompiledPrompty(path, self.configuration)
+            except AttributeError:
+                compiled = PlainPrompty(path, self.configuration)
+            self.entries[path] = (version, compiled)
+            return compiled
+
+    def execute(self, path, inputs={}, parameters={}, raw=False):
+        return self.get(path).execute(inputs, parameters, raw)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Shared cache used by execute()
+default_cache = PromptyCache()
+
+
+# Function to execute a .prompty file like prompty.execute, compiling it only once per version of the file.
+# Relative paths are resolved against the calling script's folder, as prompty.execute does.
+def execute(path, inputs={}, parameters={}, raw=False):
+    path = Path(path)
+    if not path.is_absolute():
+        path = Path(sys._getframe(1).f_code.co_filename).resolve().parent / path
+    return default_cache.execute(path, inputs, parameters, raw)
@@ -0,0 +1,34 @@
+import os
+import re
+from compress_prompt import FILLER_PATTERNS, generate_candidates, read_prompty, rewrite, split_sections
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# Function to list the lowercase words of a text
+def words(text):
+    return re.findall(r"[\w']+", text.lower())
+
+
+def test_filler_rewrite_of_start_prompty_reads_correctly():
+    _, _, body = read_prompty(os.path.join(HERE, "start.prompty"))
+    candidate = next(c for c in generate_candidates(body) if c.name == "filler+no-examples")
+    system = split_sections(candidate.body)[0][1].strip()
+    assert system == ("You are a helpful assistant. Answer questions and provide information to users "
+                      "in a concise and accurate manner.")
+
+
+def test_filler_rewrite_only_deletes_whole_phrases():
+    samples = [
+        "Your job is to answer questions and provide information to users in a concise and accurate manner.",
+        "Please answer briefly. Remember that your job is to help the user.",
+        "In order to help, really try to be accurate, and even cite the reviews.",
+        "As the assistant, answer {{ question }} in a friendly manner.",
+    ]
+    for text in samples:
+        compressed = rewrite(text, FILLER_PATTERNS)
+        # Every word of the rewrite appears in the original, in the same order
+        remaining = iter(words(text))
+        assert all(word in remaining for word in words(compressed)), compressed
+    assert rewrite(samples[1], FILLER_PATTERNS) == "Answer briefly. Remember that your job is to help the user."
+    assert rewrite(samples[2], FILLER_PATTERNS) == "To help, try to be accurate, and cite the reviews."
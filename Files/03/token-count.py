@@ -1,18 +1,300 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
 import tiktoken
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 
 # Choose the model you're targeting
 model = "gpt-4o"
 
-# Load the appropriate tokenizer
-encoding = tiktoken.encoding_for_model(model)
-
 # Your prompt
 original_prompt = "You are a helpful assistant. Your job is to answer questions and provide information to users in a concise and accurate manner."
 optimized_prompt = "You are a helpful assistant. Answer questions concisely and accurately."
 
-# Encode the prompt and count tokens
-original_tokens = encoding.encode(original_prompt)
-optimized_tokens = encoding.encode(optimized_prompt)
+# Chat formatting overhead per message, per message name and per reply (as documented for gpt-4/gpt-4o models)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+TOKENS_PER_REPLY = 3
+
+# Number of texts or conversations sent to a worker process at a time
+BATCH_SIZE = 512
+
+# Plain text files larger than this are counted in blocks of about this size
+TEXT_BLOCK_BYTES = 1 << 20
+
+
+# Load the appropriate tokenizer once per process and reuse it
+@lru_cache(maxsize=None)
+def get_encoding(name):
+    try:
+        return tiktoken.encoding_for_model(name)
+    except KeyError:
+        return tiktoken.get_encoding(name)
+
+
+# Function to split the body of a .prompty file into chat messages ("system:", "user:", ... markers)
+def prompty_messages(text):
+    if text.startswith("---"):
+        end = text.find("\n---", 3)
+        if end != -1:
+            text = text[end + 4:]
+    messages, role, lines = [], None, []
+    for line in text.splitlines():
+        marker = line.strip().lower()
+        if marker in ("system:", "user:", "assistant:", "example:"):
+            if role is not None or any(l.strip() for l in lines):
+                messages.append({"role": role or "system", "content": "\n".join(lines).strip()})
+            role, lines = marker[:-1], []
+        else:
+            lines.append(line)
+    if role is not None or any(l.strip() for l in lines):
+        messages.append({"role": role or "system", "content": "\n".join(lines).strip()})
+    return messages
+
+
+# Function to flatten message content (plain string or list of content parts) to text
+def content_text(content):
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+# Function to find the conversation(s) in a JSON record, if any
+def record_conversations(record):
+    if isinstance(record, list) and record and all(isinstance(m, dict) and "role" in m for m in record):
+        return [record]
+    if isinstance(record, dict):
+        if isinstance(record.get("messages"), list):
+            return [record["messages"]]
+        if isinstance(record.get("conversation"), list):
+            return [record["conversation"]]
+    return []
+
+
+# Function to collect the string values of a JSON record that is not a conversation
+def record_texts(record):
+    if isinstance(record, str):
+        yield record
+    elif isinstance(record, dict):
+        for value in record.values():
+            yield from record_texts(value)
+    elif isinstance(record, list):
+        for value in record:
+            yield from record_texts(value)
+
+
+# Function to stream (kind, item) pairs from an input file without loading large files at once
+def iter_items(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".prompty":
+        with open(path, "r", encoding="utf-8") as f:
+            yield "chat", prompty_messages(f.read())
+    elif extension == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                conversations = record_conversations(record)
+                for conversation in conversations:
+                    yield "chat", conversation
+                if not conversations:
+                    for text in record_texts(record):
+                        yield "text", text
+    elif extension == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        records = data if isinstance(data, list) and not record_conversations(data) else [data]
+        for record in records:
+            conversations = record_conversations(record)
+            for conversation in conversations:
+                yield "chat", conversation
+            if not conversations:
+                for text in record_texts(record):
+                    yield "text", text
+    else:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            while True:
+                block = f.read(TEXT_BLOCK_BYTES)
+                if not block:
+                    break
+                # Finish the block at the end of a line so no word is split
+                block += f.readline()
+                yield "text", block
+
+
+# Function to expand directories into the files they contain
+def iter_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+# Function to flatten texts and conversations into the strings whose tokens are counted (message content,
+# role and name); returns (texts, conversations, strings)
+def batch_strings(items):
+    texts, conversations = [], []
+    for kind, item in items:
+        (conversations if kind == "chat" else texts).append(item)
+    strings = list(texts)
+    for conversation in conversations:
+        for message in conversation:
+            strings.append(content_text(message.get("content")))
+            strings.append(str(message.get("role", "")))
+            if message.get("name"):
+                strings.append(str(message["name"]))
+    return texts, conversations, strings
+
+
+# Worker: count tokens of a batch of texts and conversations for every encoding
+def count_batch(items, encoding_names):
+    # Flatten every string to count into one list so each encoding needs a single encode_batch call
+    texts, conversations, strings = batch_strings(items)
+    result = {"texts": len(texts), "conversations": len(conversations),
+              "messages": sum(len(c) for c in conversations), "chars": sum(len(s) for s in strings), "tokens": {}}
+
+    for name in encoding_names:
+        counts = [len(tokens) for tokens in get_encoding(name).encode_batch(strings, disallowed_special=())]
+        total = sum(counts)
+        for conversation in conversations:
+            total += TOKENS_PER_REPLY + TOKENS_PER_MESSAGE * len(conversation)
+            total += TOKENS_PER_NAME * sum(1 for m in conversation if m.get("name"))
+        result["tokens"][name] = total
+    return result
+
+
+def merge(stats, result):
+    for key in ("texts", "conversations", "messages", "chars"):
+        stats[key] += result[key]
+    for name, tokens in result["tokens"].items():
+        stats["tokens"][name] = stats["tokens"].get(name, 0) + tokens
+
+
+def empty_stats(path):
+    return {"file": path, "texts": 0, "conversations": 0, "messages": 0, "chars": 0, "tokens": {}}
+
+
+# Function to yield (file index, batch) pairs across all input files
+def iter_batches(files):
+    for index, path in enumerate(files):
+        batch = []
+        for item in iter_items(path):
+            batch.append(item)
+            if len(batch) >= BATCH_SIZE:
+                yield index, batch
+                batch = []
+        if batch:
+            yield index, batch
+
+
+# Function to count every input file, using a process pool with a bounded number of batches in flight
+def count_files(paths, models, workers=None):
+    files = list(iter_files(paths))
+    per_file = [empty_stats(path) for path in files]
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    if workers == 1:
+        for index, batch in iter_batches(files):
+            merge(per_file[index], count_batch(batch, models))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = {}
+            for index, batch in iter_batches(files):
+                if len(in_flight) >= workers * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        merge(per_file[in_flight.pop(future)], future.result())
+                in_flight[pool.submit(count_batch, batch, models)] = index
+            for future in list(in_flight):
+                merge(per_file[in_flight.pop(future)], future.result())
+
+    elapsed = time.perf_counter() - start
+    total = empty_stats("TOTAL")
+    for stats in per_file:
+        merge(total, stats)
+    total["seconds"] = elapsed
+    total["chars_per_sec"] = total["chars"] / elapsed if elapsed > 0 else 0.0
+    total["tokens_per_sec"] = {
+        name: tokens / elapsed if elapsed > 0 else 0.0 for name, tokens in total["tokens"].items()
+    }
+    return per_file, total
+
+
+def write_json(per_file, total, out):
+    json.dump({"files": per_file, "total": total}, out, indent=2)
+    out.write("\n")
+
+
+def write_csv(per_file, total, models, out):
+    writer = csv.writer(out)
+    writer.writerow(["file", "texts", "conversations", "messages", "chars"] + [f"tokens_{m}" for m in models])
+    for stats in per_file + [total]:
+        writer.writerow([stats["file"], stats["texts"], stats["conversations"], stats["messages"], stats["chars"]]
+                        + [stats["tokens"].get(m, 0) for m in models])
+
+
+# Function to compare counting one string at a time, encode_batch, and encode_batch in a process pool,
+# all over the same strings (content, role and name of every message) that count_batch encodes
+def benchmark(paths, models, workers):
+    _, _, strings = batch_strings(item for path in iter_files(paths) for item in iter_items(path))
+    chars = sum(len(s) for s in strings)
+    print(f"Benchmark: {len(strings)} strings, {chars} characters")
+    for name in models:
+        encoding = get_encoding(name)
+        start = time.perf_counter()
+        tokens = sum(len(encoding.encode(s, disallowed_special=())) for s in strings)
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        encoding.encode_batch(strings, disallowed_special=())
+        batched = time.perf_counter() - start
+        print(f"  {name}: {tokens} tokens | encode loop {tokens / single:,.0f} tok/s"
+              f" | encode_batch {tokens / batched:,.0f} tok/s")
+    _, total = count_files(paths, models, workers)
+    for name, rate in total["tokens_per_sec"].items():
+        print(f"  {name}: process pool ({workers or os.cpu_count()} workers, all inputs) {rate:,.0f} tok/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count tokens in prompts, .prompty files, JSONL datasets and chat transcripts.")
+    parser.add_argument("paths", nargs="*", help="files or directories; with none, compares the two prompts above")
+    parser.add_argument("--models", nargs="+", default=[model], help="models or encodings to compare")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--output", help="write results to this file instead of stdout")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--benchmark", action="store_true", help="report throughput of the counting strategies")
+    args = parser.parse_args()
+
+    if not args.paths:
+        # Load the appropriate tokenizer
+        encoding = get_encoding(model)
+
+        # Encode the prompt and count tokens
+        original_tokens = encoding.encode(original_prompt)
+        optimized_tokens = encoding.encode(optimized_prompt)
 
-print(f"Original prompt tokens: {len(original_tokens)}")
-print(f"Optimized prompt tokens: {len(optimized_tokens)}")
\ No newline at end of file
+        print(f"Original prompt tokens: {len(original_tokens)}")
+        print(f"Optimized prompt tokens: {len(optimized_tokens)}")
+    elif args.benchmark:
+        benchmark(args.paths, args.models, args.workers)
+    else:
+        per_file, total = count_files(args.paths, args.models, args.workers)
+        out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+        try:
+            if args.format == "json":
+                write_json(per_file, total, out)
+            else:
+                write_csv(per_file, total, args.models, out)
+        finally:
+            if args.output:
+                out.close()
@@ -6,6 +6,7 @@ from langchain_community.vectorstores import InMemoryVectorStore
 from langchain_community.document_loaders import CSVLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain import hub
+from history import ConversationHistory
 
 load_dotenv()
 llm_name = 'gpt-4o'
@@ -36,7 +37,8 @@ prompt_template = hub.pull("rlm/rag-prompt")
 
 print("Enter 'exit' or 'quit' to close the program.")
 
-history = []
+# Keep the conversation history within a fixed token budget
+history = ConversationHistory(max_tokens=1000, model=llm_name)
 
 # Loop to handle multiple questions from the user
 while True:
@@ -48,28 +50,19 @@ while True:
 
     
 
-    # Format the conversation history as a string
-    history_text = ""
-    if history:
-        history_lines = []
-        for record in history:
-            history_lines.append(f"Q: {record['question']}\nA: {record['answer']}")
-        history_text = "\n\n".join(history_lines)
-
     # Generate the prompt with the latest question, retrieved context, and conversation history
     prompt = prompt_template.invoke({
         "question": question,
         "context": docs_content,
-        "history": history_text
+        "history": history.text
     })
+    prompt_tokens = history.record_prompt(prompt.to_string())
     answer = llm.invoke(prompt)
 
     # Print the answer
     print("\nAnswer:")
     print(answer.content) 
+    print(f"\n(Prompt tokens: {prompt_tokens}, history tokens: {history.tokens})")
 
     # Append the current exchange to the history
-    history.append({
-        "question": question,
-        "answer": answer.content
-    })
+    history.append(question, answer.content)
@@ -0,0 +1,90 @@
+import time
+import argparse
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+from langchain_core.vectorstores import InMemoryVectorStore
+from search_engine import VectorSearchEngine, STORAGE_DTYPES
+
+
+# Embeddings stand-in that returns precomputed vectors, so only search time is measured
+class MatrixEmbeddings(Embeddings):
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def embed_documents(self, texts):
+        return [self.matrix[int(t)].tolist() for t in texts]
+
+    def embed_query(self, text):
+        return self.matrix[int(text)].tolist()
+
+
+# Function to create clustered random embeddings that behave roughly like text embeddings
+def make_corpus(size, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(size // 100, 1), dim), dtype=np.float32)
+    corpus = rng.standard_normal((size, dim), dtype=np.float32)
+    corpus *= 0.5
+    corpus += centers[rng.integers(0, len(centers), size)]
+    queries = corpus[rng.integers(0, size, 100)] + 0.3 * rng.standard_normal((100, dim), dtype=np.float32)
+    return corpus, queries
+
+
+# Function to time a search callable over every query, returning per-query latencies in ms
+def time_queries(search, queries):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies), results
+
+
+def recall(results, truth, k):
+    return float(np.mean([len(set(r[:k]) & set(t[:k])) / k for r, t in zip(results, truth)]))
+
+
+def benchmark(size, dim, k, num_queries, baseline_max):
+    corpus, queries = make_corpus(size, dim)
+    queries = queries[:num_queries]
+    print(f"\n{size:,} chunks, {dim} dimensions, k={k}, {len(queries)} queries")
+    print(f"{'store':<28}{'memory MB':>12}{'p50 ms':>10}{'p95 ms':>10}{'batch ms/q':>12}{'recall@k':>10}")
+
+    exact = VectorSearchEngine(corpus)
+    truth = exact.search_batch(queries, k)[0]
+
+    if size <= baseline_max:
+        baseline = InMemoryVectorStore(MatrixEmbeddings(corpus))
+        baseline.add_documents([Document(id=str(i), page_content=str(i)) for i in range(size)])
+        latencies, results = time_queries(
+            lambda q: [int(d.id) for d in baseline.similarity_search_by_vector(q.tolist(), k)], queries
+        )
+        memory = corpus.nbytes / 2**20
+        print(f"{'InMemoryVectorStore':<28}{memory:>12.1f}{np.percentile(latencies, 50):>10.2f}"
+              f"{np.percentile(latencies, 95):>10.2f}{'-':>12}{recall(results, truth, k):>10.3f}")
+    else:
+        print(f"{'InMemoryVectorStore':<28}{'skipped (size > --baseline-max)':>54}")
+
+    for dtype in STORAGE_DTYPES:
+        engine = exact if dtype == "float32" else VectorSearchEngine(corpus, dtype)
+        latencies, results = time_queries(lambda q: engine.search(q, k)[0].tolist(), queries)
+        start = time.perf_counter()
+        engine.search_batch(queries, k)
+        batch_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"{'VectorSearchEngine ' + dtype:<28}{engine.nbytes / 2**20:>12.1f}{np.percentile(latencies, 50):>10.2f}"
+              f"{np.percentile(latencies, 95):>10.2f}{batch_ms:>12.3f}{recall(results, truth, k):>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare top-k search latency and recall against InMemoryVectorStore.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=1536, help="1536 matches text-embedding-ada-002 (1M chunks needs ~6 GB)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--baseline-max", type=int, default=100_000,
+                        help="largest corpus to run through InMemoryVectorStore (it is slow and memory hungry)")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        benchmark(size, args.dim, args.k, args.queries, args.baseline_max)
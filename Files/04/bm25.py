@@ -0,0 +1,129 @@
+import re
+import math
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+from langchain_core.documents import Document
+from vector_index import PersistentVectorStore
+
+# Common English words that carry no weight in review search
+STOP_WORDS = set("""
+a an and are as at be but by for from has have i in is it its of on or our so that the their there this to
+was we were what when where which who will with you your can me my do does how
+""".split())
+
+
+# Function to split text into lowercase search terms (apostrophes removed, so "Claridge's" -> "claridges")
+def tokenize(text):
+    text = text.lower().replace("’", "").replace("'", "")
+    return [t for t in re.findall(r"[a-z0-9]+", text) if t not in STOP_WORDS]
+
+
+class BM25Index:
+    """In-process BM25 inverted index over the chunks of a PersistentVectorStore.
+
+    The index is built once and then only extended with rows added to the store
+    since the last update(). Scores use the Okapi BM25 formula with the usual k1
+    and b parameters; an optional `rows` restricts scoring to candidate rows.
+    search() only reads the index, so several threads can search at once as long
+    as update() is not running at the same time.
+    """
+
+    def __init__(self, vector_store: PersistentVectorStore, k1: float = 1.5, b: float = 0.75):
+        self.vector_store = vector_store
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.lengths: List[int] = []
+        self.total_length = 0
+        self.update()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    # Index rows added to the vector store since the last update
+    def update(self):
+        for row, record in self.vector_store.records(len(self.lengths)):
+            terms = Counter(tokenize(record["text"]))
+            for term, count in terms.items():
+                self.postings.setdefault(term, {})[row] = count
+            length = sum(terms.values())
+            self.lengths.append(length)
+            self.total_length += length
+
+    # Return (rows, scores) of the k best matching rows, best first
+    def search(self, query: str, k: int = 10, rows: Optional[Sequence[int]] = None):
+        n = len(self.lengths)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        allowed = None if rows is None else set(int(r) for r in rows)
+        avg_length = self.total_length / n
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, tf in postings.items():
+                if allowed is not None and row not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[row] / avg_length)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return (np.array([row for row, _ in best], dtype=np.int64),
+                np.array([score for _, score in best], dtype=np.float32))
+
+
+# Function to fuse several ranked lists of rows with reciprocal rank fusion
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[int]:
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            fused[int(row)] = fused.get(int(row), 0.0) + 1.0 / (k + rank + 1)
+    return [row for row, _ in sorted(fused.items(), key=lambda item: item[1], reverse=True)]
+
+
+class HybridRetriever:
+    """Combines vector and BM25 retrieval over the same chunks with reciprocal rank fusion.
+
+    Each retriever contributes its top `candidates` rows, the lists are fused with
+    RRF, and the best `k` chunks are returned. Exact terms such as hotel names or
+    "room service" are found by BM25 even when the embedding ranks them lower, so
+    a smaller k reaches the same recall. Hotel names in the question narrow both
+    searches when a HotelIndex is given.
+
+        retriever = HybridRetriever(vector_store, hotel_index=HotelIndex(vector_store))
+        retrieved_docs = retriever.similarity_search(question, k=4)
+
+    search_rows() only reads the indexes; call update() first after rows were added
+    to the store (similarity_search does this itself).
+    """
+
+    def __init__(self, vector_store: PersistentVectorStore, bm25: Optional[BM25Index] = None,
+                 hotel_index=None, candidates: int = 20, rrf_k: int = 60):
+        self.vector_store = vector_store
+        self.bm25 = bm25 or BM25Index(vector_store)
+        self.hotel_index = hotel_index
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+
+    # Index rows added to the vector store since the last update
+    def update(self):
+        if self.hotel_index is not None:
+            self.hotel_index.update()
+        self.bm25.update()
+
+    def search_rows(self, question: str, embedding, k: int = 4) -> List[int]:
+        rows = None
+        if self.hotel_index is not None:
+            rows = self.hotel_index.candidate_rows(self.hotel_index.detect(question))
+        vector_rows, _ = self.vector_store.engine.search(embedding, self.candidates, rows)
+        lexical_rows, _ = self.bm25.search(question, self.candidates, rows)
+        return reciprocal_rank_fusion([vector_rows, lexical_rows], self.rrf_k)[:k]
+
+    def similarity_search(self, question: str, k: int = 4) -> List[Document]:
+        if len(self.vector_store) == 0:
+            return []
+        self.update()
+        embedding = self.vector_store.embeddings.embed_query(question)
+        return [self.vector_store.document(row) for row in self.search_rows(question, embedding, k)]
@@ -0,0 +1,124 @@
+import re
+import hashlib
+import tiktoken
+from dataclasses import dataclass, field
+from typing import List, Optional
+from langchain_core.documents import Document
+
+# Text placed between packed chunks, as in RAG.py's docs_content
+CHUNK_SEPARATOR = "\n\n"
+
+
+@dataclass
+class PackedContext:
+    text: str
+    documents: List[Document] = field(default_factory=list)
+    tokens: int = 0
+    original_tokens: int = 0
+    dropped_duplicates: int = 0
+    merged_overlaps: int = 0
+    dropped_for_budget: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+# Function to compute hashed word shingles of a text for near-duplicate detection
+def shingles(text, size=3):
+    tokens = re.findall(r"\w+", text.lower())
+    if len(tokens) < size:
+        tokens = tokens + [""] * (size - len(tokens))
+    return {
+        hashlib.blake2b(" ".join(tokens[i:i + size]).encode("utf-8"), digest_size=8).digest()
+        for i in range(len(tokens) - size + 1)
+    }
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+# Function to merge chunks split from the same CSV row, removing the overlapping spans between them
+def merge_overlaps(documents: List[Document]):
+    merged, positions, count = [], {}, 0
+    for doc in documents:
+        source_row = (doc.metadata.get("source"), doc.metadata.get("row"))
+        if source_row[1] is None or doc.metadata.get("start_index") is None or source_row not in positions:
+            if source_row[1] is not None:
+                positions.setdefault(source_row, len(merged))
+            merged.append(doc)
+            continue
+        # Keep the merged chunk at the rank of its most relevant part
+        base = merged[positions[source_row]]
+        if base.metadata.get("start_index") is None:
+            merged.append(doc)
+            continue
+        first, second = sorted([base, doc], key=lambda d: d.metadata["start_index"])
+        first_end = first.metadata["start_index"] + len(first.page_content)
+        if second.metadata["start_index"] > first_end:
+            # Not contiguous, so there is nothing to merge
+            merged.append(doc)
+            continue
+        overlap = first_end - second.metadata["start_index"]
+        text = first.page_content + second.page_content[overlap:]
+        metadata = dict(base.metadata, start_index=first.metadata["start_index"])
+        merged[positions[source_row]] = Document(id=base.id, page_content=text, metadata=metadata)
+        count += 1
+    return merged, count
+
+
+class ContextPacker:
+    """Packs retrieved chunks into a fixed token budget without repeated text.
+
+    Chunks split from the same review are merged so their overlapping characters
+    appear once, near-duplicate chunks (Jaccard similarity of word shingles at or
+    above `duplicate_threshold`) are dropped in favour of the more relevant one,
+    and the rest are added in relevance order until `max_tokens` is reached.
+
+        packed = packer.pack(retrieved_docs)
+        docs_content = packed.text
+        print(f"Saved {packed.saved_tokens} context tokens")
+    """
+
+    def __init__(self, max_tokens: int = 1500, duplicate_threshold: float = 0.8, model: str = "gpt-4o"):
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("o200k_base")
+        self.separator_tokens = len(self.encoding.encode(CHUNK_SEPARATOR))
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    # Pack documents that are ordered from most to least relevant
+    def pack(self, documents: List[Document], max_tokens: Optional[int] = None) -> PackedContext:
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        original_tokens = self.count_tokens(CHUNK_SEPARATOR.join(doc.page_content for doc in documents))
+        candidates, merged_overlaps = merge_overlaps(documents)
+
+        kept, kept_shingles, duplicates, over_budget, tokens = [], [], 0, 0, 0
+        for doc in candidates:
+            doc_shingles = shingles(doc.page_content)
+            if any(jaccard(doc_shingles, other) >= self.duplicate_threshold for other in kept_shingles):
+                duplicates += 1
+                continue
+            cost = self.count_tokens(doc.page_content) + (self.separator_tokens if kept else 0)
+            if tokens + cost > budget:
+                over_budget += 1
+                continue
+            kept.append(doc)
+            kept_shingles.append(doc_shingles)
+            tokens += cost
+
+        return PackedContext(
+            text=CHUNK_SEPARATOR.join(doc.page_content for doc in kept),
+            documents=kept,
+            tokens=tokens,
+            original_tokens=original_tokens,
+            dropped_duplicates=duplicates,
+            merged_overlaps=merged_overlaps,
+            dropped_for_budget=over_budget,
+        )
@@ -0,0 +1,123 @@
+import tiktoken
+from collections import deque
+from typing import Callable, List, Optional
+
+# Text placed between rendered turns
+TURN_SEPARATOR = "\n\n"
+
+# Label placed in front of the summary of dropped turns
+SUMMARY_PREFIX = "Summary of earlier conversation: "
+
+
+class ConversationHistory:
+    """Keeps the rendered Q/A history of the RAG chat loop within a token budget.
+
+    The history string is cached and extended by one turn at a time instead of
+    being rebuilt from every previous turn. When the rendered history exceeds
+    `max_tokens`, the oldest turns are dropped, or folded into a running summary
+    when a `summarize(previous_summary, dropped_text)` callable is given. The
+    latest turn is always kept; if it and the summary still exceed the budget,
+    the summary and then the turn are cut short, so `tokens <= max_tokens`.
+
+        history = ConversationHistory(max_tokens=1000, model=llm_name)
+        history.append(question, answer.content)
+        history.text  # goes into the prompt as "history"
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1000,
+        model: str = "gpt-4o",
+        summarize: Optional[Callable[[str, str], str]] = None,
+        max_summary_tokens: int = 200,
+    ):
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.max_summary_tokens = max_summary_tokens
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("o200k_base")
+        self.separator_tokens = len(self.encoding.encode(TURN_SEPARATOR))
+        self.turns = deque()
+        self.summary = ""
+        self.summary_text = ""
+        self.summary_tokens = 0
+        self.turn_tokens = 0
+        self.prompt_tokens: List[int] = []
+        self._turns_text = ""
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    # Number of tokens in the rendered history (summary, turns and separators)
+    @property
+    def tokens(self) -> int:
+        parts = len(self.turns) + (1 if self.summary_text else 0)
+        return self.summary_tokens + self.turn_tokens + max(parts - 1, 0) * self.separator_tokens
+
+    # Rendered history, in the same "Q: ...\nA: ..." format RAG.py has always used
+    @property
+    def text(self) -> str:
+        if self.summary_text and self._turns_text:
+            return self.summary_text + TURN_SEPARATOR + self._turns_text
+        return self.summary_text or self._turns_text
+
+    def __len__(self):
+        return len(self.turns)
+
+    def append(self, question: str, answer: str):
+        block = f"Q: {question}\nA: {answer}"
+        self.turns.append((block, self.count_tokens(block)))
+        self.turn_tokens += self.turns[-1][1]
+        self._turns_text = block if len(self.turns) == 1 else self._turns_text + TURN_SEPARATOR + block
+        self._enforce_budget()
+
+    # Drop (or summarize) the oldest turns until the history fits the budget; the latest turn is always kept,
+    # but the summary and then the turn itself are cut short if they alone exceed it
+    def _enforce_budget(self):
+        while self.tokens > self.max_tokens and len(self.turns) > 1:
+            dropped = []
+            while self.tokens > self.max_tokens and len(self.turns) > 1:
+                block, tokens = self.turns.popleft()
+                self.turn_tokens -= tokens
+                self._turns_text = self._turns_text[len(block) + len(TURN_SEPARATOR):]
+                dropped.append(block)
+            if self.summarize is None:
+                break
+            # A longer summary can push the history over budget again, so loop until it fits
+            self._set_summary(self.summarize(self.summary, TURN_SEPARATOR.join(dropped)), self.max_summary_tokens)
+        if self.tokens > self.max_tokens and self.summary_text:
+            # Only the latest turn is left: keep as much of the summary as fits beside it
+            room = self.max_tokens - self.turn_tokens - self.separator_tokens - self.count_tokens(SUMMARY_PREFIX)
+            self._set_summary(self.summary, room)
+            if self.tokens > self.max_tokens:
+                self._set_summary("", 0)
+        if self.tokens > self.max_tokens:
+            # The latest turn alone is over budget: keep its beginning, with the question
+            block = self.truncate(self.turns.pop()[0], self.max_tokens)
+            self.turns.append((block, self.count_tokens(block)))
+            self.turn_tokens = self.turns[-1][1]
+            self._turns_text = block
+
+    # Cut a text to its first max_tokens tokens (fewer if the cut text encodes differently)
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encoding.encode(text)
+        limit = max_tokens
+        while len(tokens) > max_tokens and limit > 0:
+            text = self.encoding.decode(tokens[:limit])
+            tokens = self.encoding.encode(text)
+            limit -= 1
+        return text if len(tokens) <= max_tokens else ""
+
+    # Store a summary of at most max_tokens tokens, or none if there is no room for it
+    def _set_summary(self, summary: str, max_tokens: int):
+        self.summary = self.truncate(summary, max_tokens) if max_tokens > 0 else ""
+        self.summary_text = SUMMARY_PREFIX + self.summary if self.summary else ""
+        self.summary_tokens = self.count_tokens(self.summary_text) if self.summary_text else 0
+
+    # Record the size of the prompt sent for the current turn
+    def record_prompt(self, prompt_text: str) -> int:
+        tokens = self.count_tokens(prompt_text)
+        self.prompt_tokens.append(tokens)
+        return tokens
@@ -0,0 +1,158 @@
+import re
+import numpy as np
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional
+from langchain_core.documents import Document
+from vector_index import PersistentVectorStore
+
+# Column of app_hotel_reviews.csv that holds the hotel name
+HOTEL_FIELD = 'Hotel Name'
+
+# Generic words that users usually leave out when naming a hotel
+GENERIC_WORDS = {"the", "hotel", "hotels", "and", "at", "of"}
+
+# Names with more distinctive words than this are only matched by their leading words
+MAX_SUBSET_WORDS = 6
+
+
+# Function to normalize a name or question for matching (case, apostrophes, hyphens, spacing)
+def normalize_name(text):
+    text = text.lower().replace("’", "'").replace("'", "")
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(text.split())
+
+
+# Function to list the spellings under which a hotel can be mentioned in a question: the name itself and
+# every subset of its distinctive words, in order, that starts with the first one ("the Ritz" and
+# "Ritz London" for "The Ritz London", but not "London" alone)
+def name_aliases(name):
+    base = normalize_name(name)
+    words = [word for word in base.split() if word not in GENERIC_WORDS]
+    aliases = {base}
+    if words:
+        first, rest = words[0], words[1:]
+        if len(words) > MAX_SUBSET_WORDS:
+            aliases.update(" ".join(words[:n]) for n in range(1, len(words) + 1))
+        else:
+            for n in range(len(rest) + 1):
+                aliases.update(" ".join((first,) + subset) for subset in combinations(rest, n))
+    return {alias for alias in aliases if alias}
+
+
+# Function to read the hotel name of a chunk from its metadata or its "Hotel Name: ..." line
+def hotel_of(doc_text, metadata):
+    if metadata.get(HOTEL_FIELD):
+        return metadata[HOTEL_FIELD]
+    match = re.search(rf"^{HOTEL_FIELD}: (.+)$", doc_text, re.MULTILINE)
+    return match.group(1).strip() if match else None
+
+
+class HotelIndex:
+    """Inverted index from hotel name to the rows of a PersistentVectorStore.
+
+    Chunks are assigned to a hotel from their 'Hotel Name' metadata or, for chunks
+    split from the same CSV row, from whichever chunk of the row names it; chunks
+    are matched to their CSV row by its source and row number, so they may be
+    stored in any order. Hotel names mentioned in a question are detected with one
+    compiled pattern over the aliases of each name (see name_aliases), and only
+    those hotels' rows are scored, so retrieval cost depends on the size of the
+    hotel rather than the whole corpus.
+
+        hotels = HotelIndex(vector_store)
+        retrieved_docs = hotels.similarity_search(question, k=10)
+    """
+
+    def __init__(self, vector_store: PersistentVectorStore, aliases: Optional[Dict[str, Iterable[str]]] = None):
+        self.vector_store = vector_store
+        self.extra_aliases = aliases or {}
+        self.postings: Dict[str, List[int]] = {}
+        self.row_hotels: Dict[tuple, str] = {}
+        self.unassigned: Dict[tuple, List[int]] = {}
+        self.header_rows = set()
+        self.alias_to_hotels: Dict[str, List[str]] = {}
+        self.pattern = None
+        self.indexed_rows = 0
+        self.update()
+
+    # Index rows added to the vector store since the last update
+    def update(self):
+        store = self.vector_store
+        new_hotels = False
+        for row, record in store.records(self.indexed_rows):
+            metadata = record["metadata"]
+            source_row = (metadata.get("source"), metadata.get("row")) if metadata.get("row") is not None else None
+            hotel = hotel_of(record["text"], metadata)
+            # CSVLoader turns the header row into "Hotel Name: Hotel Name"
+            if hotel == HOTEL_FIELD:
+                if source_row is not None:
+                    self.header_rows.add(source_row)
+                    self.unassigned.pop(source_row, None)
+                continue
+            if source_row in self.header_rows:
+                continue
+            rows = [row]
+            if source_row is not None:
+                if hotel is None:
+                    hotel = self.row_hotels.get(source_row)
+                else:
+                    self.row_hotels[source_row] = hotel
+                    # Chunks of this CSV row stored before the one naming its hotel
+                    rows += self.unassigned.pop(source_row, [])
+                if hotel is None:
+                    self.unassigned.setdefault(source_row, []).append(row)
+                    continue
+            if hotel is None:
+                continue
+            if hotel not in self.postings:
+                self.postings[hotel] = []
+                new_hotels = True
+            self.postings[hotel].extend(rows)
+        self.indexed_rows = len(store)
+        if new_hotels or self.pattern is None:
+            self._compile()
+
+    # Compile a single pattern that matches any alias, longest aliases first; an alias shared by
+    # several hotels (e.g. "ritz" for two Ritz hotels) selects all of them
+    def _compile(self):
+        self.alias_to_hotels = {}
+        for hotel in self.postings:
+            for alias in name_aliases(hotel) | {normalize_name(a) for a in self.extra_aliases.get(hotel, ())}:
+                self.alias_to_hotels.setdefault(alias, []).append(hotel)
+        if not self.alias_to_hotels:
+            self.pattern = None
+            return
+        alternatives = sorted(self.alias_to_hotels, key=len, reverse=True)
+        self.pattern = re.compile(r"\b(" + "|".join(re.escape(a) for a in alternatives) + r")\b")
+
+    @property
+    def hotels(self) -> List[str]:
+        return list(self.postings)
+
+    # Return the hotels mentioned in a question, in order of first mention
+    def detect(self, question: str) -> List[str]:
+        if self.pattern is None:
+            return []
+        found = []
+        for match in self.pattern.finditer(normalize_name(question)):
+            for hotel in self.alias_to_hotels[match.group(1)]:
+                if hotel not in found:
+                    found.append(hotel)
+        return found
+
+    # Return the candidate rows for the given hotels, or None when no hotel narrows the search. Chunks
+    # whose hotel is not known yet are always candidates, e.g. when the chunk naming their CSV row's
+    # hotel was stored only once for several rows because its text was identical.
+    def candidate_rows(self, hotels: Iterable[str]) -> Optional[np.ndarray]:
+        rows = [self.postings[h] for h in hotels if h in self.postings]
+        if not rows:
+            return None
+        rows += list(self.unassigned.values())
+        return np.unique(np.concatenate([np.asarray(r, dtype=np.int64) for r in rows]))
+
+    # Retrieve the chunks most similar to the question, restricted to the hotels it mentions
+    def similarity_search(self, question: str, k: int = 4) -> List[Document]:
+        self.update()
+        rows = self.candidate_rows(self.detect(question))
+        return self.vector_store.similarity_search_by_vector(
+            self.vector_store.embeddings.embed_query(question), k, rows=rows
+        )
@@ -0,0 +1,185 @@
+import time
+import random
+import asyncio
+import argparse
+import tiktoken
+from typing import Iterable, List
+from langchain_core.documents import Document
+from vector_index import PersistentVectorStore, chunk_key
+
+
+# Function to tell whether an exception raised by the embeddings client is a throttling error
+def is_rate_limited(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+# Function to read the server's retry-after hint (in seconds) from a throttling error, if any
+def retry_after_seconds(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for name in ("retry-after-ms", "retry-after"):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if name == "retry-after-ms" else seconds
+    return None
+
+
+# Function to group chunks into batches bounded by token count and number of inputs
+def token_batches(documents: Iterable[Document], encoding, max_batch_tokens, max_batch_size):
+    batch, batch_tokens = [], 0
+    for doc in documents:
+        tokens = len(encoding.encode_ordinary(doc.page_content))
+        if batch and (batch_tokens + tokens > max_batch_tokens or len(batch) >= max_batch_size):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(doc)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+class EmbeddingIngestor:
+    """Embeds chunks into a PersistentVectorStore with batching, concurrency and retries.
+
+    Chunks are grouped into batches of at most `max_batch_tokens` tokens, up to
+    `concurrency` embedding requests are kept in flight, and throttled requests
+    (HTTP 429) are retried with exponential backoff that honours retry-after.
+    Every finished batch is written to the index straight away, so the index is
+    the checkpoint: re-running after a crash skips everything already embedded.
+
+    Create the embeddings client with max_retries=0 so that retries are handled here.
+    """
+
+    def __init__(
+        self,
+        vector_store: PersistentVectorStore,
+        max_batch_tokens: int = 8000,
+        max_batch_size: int = 256,
+        concurrency: int = 4,
+        max_retries: int = 8,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        report_every: float = 5.0,
+        encoding_name: str = "cl100k_base",
+    ):
+        self.vector_store = vector_store
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.report_every = report_every
+        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.stats = {"seen": 0, "skipped": 0, "embedded": 0, "batches": 0, "retries": 0}
+        self.queued = set()
+
+    # Drop chunks that are already in the index or already queued in this run
+    def _pending(self, documents):
+        for doc in documents:
+            self.stats["seen"] += 1
+            key = chunk_key(doc.page_content, self.vector_store.deployment)
+            if key in self.vector_store.key_to_row or key in self.queued:
+                self.stats["skipped"] += 1
+                continue
+            self.queued.add(key)
+            yield doc
+
+    # Call the embeddings endpoint, backing off on throttling errors
+    async def _embed(self, texts: List[str]):
+        attempt = 0
+        while True:
+            try:
+                return await self.vector_store.embeddings.aembed_documents(texts)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                attempt += 1
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+
+    async def _run_batch(self, batch: List[Document]):
+        texts = [doc.page_content for doc in batch]
+        vectors = await self._embed(texts)
+        keys = self.vector_store.add_embeddings(texts, vectors, [doc.metadata for doc in batch])
+        # Stored chunks are now found through the index, so only in-flight keys stay queued
+        self.queued.difference_update(keys)
+        self.stats["embedded"] += len(batch)
+        self.stats["batches"] += 1
+
+    def _report(self, started, final=False):
+        elapsed = time.perf_counter() - started
+        rate = self.stats["embedded"] / elapsed if elapsed > 0 else 0.0
+        self.stats["elapsed"] = elapsed
+        self.stats["chunks_per_sec"] = rate
+        label = "Done" if final else "Progress"
+        print(
+            f"{label}: {self.stats['embedded']} embedded, {self.stats['skipped']} already indexed, "
+            f"{self.stats['retries']} retries, {rate:.1f} chunks/sec"
+        )
+
+    async def ingest(self, documents: Iterable[Document]) -> dict:
+        started = time.perf_counter()
+        last_report = started
+        in_flight = set()
+        try:
+            for batch in token_batches(self._pending(documents), self.encoding, self.max_batch_tokens, self.max_batch_size):
+                if len(in_flight) >= self.concurrency:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                in_flight.add(asyncio.create_task(self._run_batch(batch)))
+
+                if self.report_every and time.perf_counter() - last_report >= self.report_every:
+                    self._report(started)
+                    last_report = time.perf_counter()
+            if in_flight:
+                for result in await asyncio.gather(*in_flight, return_exceptions=True):
+                    if isinstance(result, Exception):
+                        raise result
+        finally:
+            for task in in_flight:
+                task.cancel()
+        self._report(started, final=True)
+        return self.stats
+
+
+# Function to embed documents into the index from synchronous code
+def ingest_documents(vector_store: PersistentVectorStore, documents: Iterable[Document], **kwargs) -> dict:
+    return asyncio.run(EmbeddingIngestor(vector_store, **kwargs).ingest(documents))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from langchain_openai import AzureOpenAIEmbeddings
+    from stream_loader import CsvChunkStream
+
+    parser = argparse.ArgumentParser(description="Embed a hotel review export into a persistent vector index.")
+    parser.add_argument("--csv", default="./app_hotel_reviews.csv")
+    parser.add_argument("--index", default="./index")
+    parser.add_argument("--embeddings", default="text-embedding-ada-002")
+    parser.add_argument("--batch-tokens", type=int, default=8000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    load_dotenv()
+    embeddings = AzureOpenAIEmbeddings(azure_deployment=args.embeddings, max_retries=0)
+    vector_store = PersistentVectorStore(embeddings, args.index, args.embeddings)
+
+    # Stream chunks straight from the CSV; the index keeps only a key and file offset per stored chunk in memory
+    ingest_documents(
+        vector_store,
+        CsvChunkStream(args.csv),
+        max_batch_tokens=args.batch_tokens,
+        max_batch_size=args.batch_size,
+        concurrency=args.concurrency,
+    )
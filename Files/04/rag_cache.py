@@ -0,0 +1,163 @@
+import os
+import json
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+from langchain_core.embeddings import Embeddings
+from search_engine import normalize_rows
+
+
+# Function to build a key that identifies the retrieved context (and, optionally, the conversation
+# history) that a question was answered with
+def context_key(documents: Iterable, history: str = "") -> str:
+    ids = sorted(getattr(doc, "id", None) or hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+                 for doc in documents)
+    return hashlib.sha256("\n".join(ids + [history]).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache(Embeddings):
+    """Level one: exact-match LRU cache of query embeddings around an Embeddings client.
+
+    Wrap the client used by the vector store so repeated questions are not sent to
+    the embedding deployment again. Document embeddings pass through uncached.
+
+        embeddings = EmbeddingCache(AzureOpenAIEmbeddings(azure_deployment=embeddings_name))
+    """
+
+    def __init__(self, embeddings: Embeddings, max_entries: int = 10000, path: Optional[str] = None):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def _get(self, text):
+        vector = self.entries.get(text)
+        if vector is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(text)
+        self.hits += 1
+        return vector
+
+    def _put(self, text, vector):
+        self.entries[text] = vector
+        self.entries.move_to_end(text)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._put(text, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = self._get(text)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self._put(text, vector)
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        texts = list(self.entries)
+        vectors = np.array([self.entries[t] for t in texts], dtype=np.float32)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, texts=np.array(texts, dtype=str), vectors=vectors)
+
+    def load(self, path: Optional[str] = None):
+        with np.load(path or self.path) as data:
+            for text, vector in zip(data["texts"], data["vectors"]):
+                self._put(str(text), vector.tolist())
+
+
+class SemanticAnswerCache:
+    """Level two: returns a stored answer for a semantically equivalent question.
+
+    An answer is reused when a new question's embedding has a cosine similarity of
+    at least `threshold` with a cached question whose retrieved context (see
+    context_key) is identical, so the reused answer was grounded in the same
+    reviews. Entries are evicted least recently used beyond `max_entries`.
+
+        key = context_key(retrieved_docs)
+        answer = answer_cache.get(question_embedding, key)
+        if answer is None:
+            answer = llm.invoke(prompt).content
+            answer_cache.put(question, question_embedding, key, answer)
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1000, path: Optional[str] = None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.by_context = {}
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, question_embedding, context: str) -> Optional[str]:
+        ids = self.by_context.get(context)
+        if ids:
+            ids = list(ids)
+            vectors = np.stack([self.entries[i]["vector"] for i in ids])
+            scores = vectors @ normalize_rows(np.asarray(question_embedding)[None, :])[0]
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                self.entries.move_to_end(ids[best])
+                self.hits += 1
+                return self.entries[ids[best]]["answer"]
+        self.misses += 1
+        return None
+
+    def put(self, question: str, question_embedding, context: str, answer: str):
+        entry_id = self.next_id
+        self.next_id += 1
+        vector = normalize_rows(np.asarray(question_embedding)[None, :])[0]
+        self.entries[entry_id] = {"question": question, "vector": vector, "context": context, "answer": answer}
+        self.by_context.setdefault(context, set()).add(entry_id)
+        while len(self.entries) > self.max_entries:
+            old_id, old = self.entries.popitem(last=False)
+            self.by_context[old["context"]].discard(old_id)
+            if not self.by_context[old["context"]]:
+                del self.by_context[old["context"]]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+    def save(self, path: Optional[str] = None):
+        records = [
+            {"question": e["question"], "vector": e["vector"].tolist(), "context": e["context"], "answer": e["answer"]}
+            for e in self.entries.values()
+        ]
+        with open(path or self.path, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+
+    def load(self, path: Optional[str] = None):
+        with open(path or self.path, "r", encoding="utf-8") as f:
+            for record in json.load(f):
+                self.put(record["question"], record["vector"], record["context"], record["answer"])
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import aiohttp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from streaming import percentile
+
+# Questions in the style the lab suggests asking RAG.py
+QUESTIONS = [
+    "Where can I stay in London?",
+    "How is the room service at The Savoy?",
+    "Is breakfast good at The Langham?",
+    "What do guests say about the staff at Claridge's?",
+    "Which hotel has the best view?",
+    "Are the rooms at the Shangri-La quiet?",
+    "Is The Ritz London worth the price?",
+    "Which hotel would you recommend for a family?",
+]
+
+
+# Function to run one conversation of several turns against the service
+async def run_session(http, url, turns, latencies, errors, rng):
+    session_id = str(uuid.uuid4())
+    for _ in range(turns):
+        start = time.perf_counter()
+        try:
+            async with http.post(f"{url}/chat", json={"session_id": session_id, "question": rng.choice(QUESTIONS)}) as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+        except aiohttp.ClientError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def load_test(url, sessions, turns, concurrency, seed):
+    latencies, errors = [], []
+    rng = random.Random(seed)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def limited(http):
+        async with slots:
+            await run_session(http, url, turns, latencies, errors, rng)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        await http.post(f"{url}/stats/reset")
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(http) for _ in range(sessions)))
+        elapsed = time.perf_counter() - start
+        async with http.get(f"{url}/stats") as response:
+            server_stats = await response.json()
+
+    print(f"Sessions: {sessions} x {turns} turns, concurrency {concurrency}")
+    print(f"Completed: {len(latencies)} requests, {len(errors)} errors in {elapsed:.2f}s")
+    print(f"Throughput: {len(latencies) / elapsed:.2f} requests/sec")
+    print(f"Client latency ms: p50 {percentile(latencies, 50):.1f}, "
+          f"p95 {percentile(latencies, 95):.1f}, p99 {percentile(latencies, 99):.1f}")
+    print(f"Server latency ms: p50 {server_stats['p50_ms']:.1f}, "
+          f"p95 {server_stats['p95_ms']:.1f}, p99 {server_stats['p99_ms']:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the RAG service with concurrent conversations.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(load_test(args.url, args.sessions, args.turns, args.concurrency, args.seed))
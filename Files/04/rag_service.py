@@ -0,0 +1,258 @@
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+from typing import Dict, Optional
+from aiohttp import web
+from vector_index import PersistentVectorStore
+from hotel_filter import HotelIndex
+from bm25 import HybridRetriever
+from context_packing import ContextPacker
+from history import ConversationHistory
+from rag_cache import EmbeddingCache, SemanticAnswerCache, context_key
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from streaming import percentile
+
+# Same instructions as the rlm/rag-prompt template that RAG.py pulls from the hub, plus the session's history
+RAG_PROMPT = """You are an assistant for question-answering tasks. Use the following pieces of retrieved context to answer the question. If you don't know the answer, just say that you don't know. Use three sentences maximum and keep the answer concise.
+Use the conversation so far to understand follow-up questions.
+Conversation: {history}
+Question: {question}
+Context: {context}
+Answer:"""
+
+
+class RAGService:
+    """Serves the retrieve-then-generate flow of RAG.py to many sessions at once.
+
+    All sessions share one vector index (and hotel pre-filter); each session has its
+    own token-budgeted history. With `hybrid`, vector and BM25 results are fused
+    (see HybridRetriever); with `context_tokens`, retrieved chunks are de-duplicated
+    and packed into that budget (see ContextPacker). With an `answer_cache`, a question
+    close enough to an earlier one with the same retrieved context and history is
+    answered from the cache without calling the model (see SemanticAnswerCache);
+    wrap the store's embeddings in an EmbeddingCache to also skip repeated query
+    embeddings. Embedding and chat calls are awaited, and at most `max_in_flight`
+    model requests run at the same time.
+    Latencies of completed requests are kept for throughput and percentile reporting.
+    """
+
+    def __init__(
+        self,
+        vector_store: PersistentVectorStore,
+        llm,
+        prompt_template,
+        k: int = 10,
+        max_in_flight: int = 16,
+        history_tokens: int = 1000,
+        model: str = "gpt-4o",
+        hybrid: bool = False,
+        context_tokens: Optional[int] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+    ):
+        self.vector_store = vector_store
+        self.hotel_index = HotelIndex(vector_store)
+        self.retriever = HybridRetriever(vector_store, hotel_index=self.hotel_index) if hybrid else None
+        self.packer = ContextPacker(max_tokens=context_tokens, model=model) if context_tokens else None
+        self.saved_context_tokens = 0
+        self.answer_cache = answer_cache
+        self.llm = llm
+        self.prompt_template = prompt_template
+        self.k = k
+        self.history_tokens = history_tokens
+        self.model = model
+        self.model_slots = asyncio.Semaphore(max_in_flight)
+        self.index_state = asyncio.Condition()
+        self.indexed_rows = -1
+        self.searches = 0
+        self.sessions: Dict[str, ConversationHistory] = {}
+        self.session_locks: Dict[str, asyncio.Lock] = {}
+        self.latencies = []
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def _session(self, session_id):
+        if session_id not in self.sessions:
+            self.sessions[session_id] = ConversationHistory(max_tokens=self.history_tokens, model=self.model)
+            self.session_locks[session_id] = asyncio.Lock()
+        return self.sessions[session_id], self.session_locks[session_id]
+
+    def _retrieve(self, question, embedding):
+        if self.retriever is not None:
+            return [self.vector_store.document(row) for row in self.retriever.search_rows(question, embedding, self.k)]
+        rows = self.hotel_index.candidate_rows(self.hotel_index.detect(question))
+        return self.vector_store.similarity_search_by_vector(embedding, self.k, rows=rows)
+
+    # Run a search in a worker thread. The indexes are brought up to date here, on the event loop,
+    # and only while no search is running, so the worker threads only ever read them.
+    async def _search(self, question, embedding):
+        async with self.index_state:
+            if self.indexed_rows != len(self.vector_store):
+                await self.index_state.wait_for(lambda: self.searches == 0)
+                self.hotel_index.update()
+                if self.retriever is not None:
+                    self.retriever.bm25.update()
+                self.vector_store.refresh_engine()
+                self.indexed_rows = len(self.vector_store)
+            self.searches += 1
+        try:
+            return await asyncio.to_thread(self._retrieve, question, embedding)
+        finally:
+            async with self.index_state:
+                self.searches -= 1
+                self.index_state.notify_all()
+
+    # Retrieve context for the question and generate an answer within the session
+    async def answer(self, session_id: str, question: str) -> dict:
+        start = time.perf_counter()
+        history, lock = self._session(session_id)
+        # Turns of one session run in order so each sees the previous answer in its history
+        async with lock:
+            try:
+                async with self.model_slots:
+                    embedding = await self.vector_store.embeddings.aembed_query(question)
+                retrieved_docs = await self._search(question, embedding)
+                saved_tokens = 0
+                if self.packer is not None:
+                    packed = self.packer.pack(retrieved_docs)
+                    docs_content = packed.text
+                    saved_tokens = packed.saved_tokens
+                    self.saved_context_tokens += saved_tokens
+                else:
+                    docs_content = "\n\n".join(doc.page_content for doc in retrieved_docs)
+
+                # An answer can be reused only if it was given with the same context and history
+                answer, cache_key, prompt_tokens = None, None, 0
+                if self.answer_cache is not None:
+                    cache_key = context_key(retrieved_docs, history.text)
+                    answer = self.answer_cache.get(embedding, cache_key)
+                cached = answer is not None
+                if not cached:
+                    prompt = self.prompt_template.invoke({
+                        "question": question,
+                        "context": docs_content,
+                        "history": history.text
+                    })
+                    prompt_tokens = history.record_prompt(prompt.to_string())
+                    async with self.model_slots:
+                        response = await self.llm.ainvoke(prompt)
+                    answer = response.content
+                    if cache_key is not None:
+                        self.answer_cache.put(question, embedding, cache_key, answer)
+                history.append(question, answer)
+            except Exception:
+                self.errors += 1
+                raise
+        latency = time.perf_counter() - start
+        self.latencies.append(latency)
+        return {
+            "session_id": session_id,
+            "answer": answer,
+            "cached": cached,
+            "prompt_tokens": prompt_tokens,
+            "context_tokens_saved": saved_tokens,
+            "latency_ms": latency * 1000,
+        }
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        latencies_ms = [latency * 1000 for latency in self.latencies]
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "sessions": len(self.sessions),
+            "context_tokens_saved": self.saved_context_tokens,
+            "throughput_rps": len(self.latencies) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(latencies_ms, 50),
+            "p95_ms": percentile(latencies_ms, 95),
+            "p99_ms": percentile(latencies_ms, 99),
+            "embedding_cache": self.vector_store.embeddings.stats()
+            if isinstance(self.vector_store.embeddings, EmbeddingCache) else None,
+            "answer_cache": self.answer_cache.stats() if self.answer_cache is not None else None,
+        }
+
+    def reset_stats(self):
+        self.latencies = []
+        self.errors = 0
+        self.started = time.perf_counter()
+
+
+# Function to create the HTTP application: POST /chat, GET /stats, POST /stats/reset
+def create_app(service: RAGService) -> web.Application:
+    async def chat(request):
+        body = await request.json()
+        question = body.get("question")
+        if not question:
+            return web.json_response({"error": "'question' is required"}, status=400)
+        session_id = body.get("session_id") or str(uuid.uuid4())
+        try:
+            return web.json_response(await service.answer(session_id, question))
+        except Exception as e:
+            return web.json_response({"error": str(e)}, status=502)
+
+    async def stats(request):
+        return web.json_response(service.stats())
+
+    async def reset(request):
+        service.reset_stats()
+        return web.json_response(service.stats())
+
+    app = web.Application()
+    app.add_routes([web.post("/chat", chat), web.get("/stats", stats), web.post("/stats/reset", reset)])
+    return app
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+    from stream_loader import CsvChunkStream
+    from ingest import EmbeddingIngestor
+
+    parser = argparse.ArgumentParser(description="Serve the RAG application over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--csv", default="./app_hotel_reviews.csv")
+    parser.add_argument("--index", default="./index")
+    parser.add_argument("--llm", default="gpt-4o")
+    parser.add_argument("--embeddings", default="text-embedding-ada-002")
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--hybrid", action="store_true", help="fuse BM25 and vector results")
+    parser.add_argument("--context-tokens", type=int, default=None, help="pack retrieved chunks into this budget")
+    parser.add_argument("--answer-cache-threshold", type=float, default=0.95,
+                        help="cosine similarity at which a cached answer is reused (0 disables the answer cache)")
+    args = parser.parse_args()
+
+    # Point AZURE_OPENAI_ENDPOINT at a local mock server in .env to load test offline
+    load_dotenv()
+    llm = AzureChatOpenAI(azure_deployment=args.llm)
+    # Query embeddings and answers are cached next to the index and kept across restarts
+    os.makedirs(args.index, exist_ok=True)
+    embeddings = EmbeddingCache(AzureOpenAIEmbeddings(azure_deployment=args.embeddings),
+                                path=os.path.join(args.index, "query_embeddings.npz"))
+    answer_cache = None
+    if args.answer_cache_threshold > 0:
+        answer_cache = SemanticAnswerCache(args.answer_cache_threshold, path=os.path.join(args.index, "answers.json"))
+    vector_store = PersistentVectorStore(embeddings, args.index, args.embeddings)
+    prompt_template = ChatPromptTemplate.from_messages([("human", RAG_PROMPT)])
+    service = RAGService(vector_store, llm, prompt_template, k=args.k, max_in_flight=args.max_in_flight,
+                         model=args.llm, hybrid=args.hybrid, context_tokens=args.context_tokens,
+                         answer_cache=answer_cache)
+
+    # Index new reviews on the server's event loop, which the async clients are bound to
+    async def index_reviews(app):
+        await EmbeddingIngestor(vector_store).ingest(CsvChunkStream(args.csv))
+
+    async def save_caches(app):
+        embeddings.save()
+        if answer_cache is not None:
+            answer_cache.save()
+
+    app = create_app(service)
+    app.on_startup.append(index_reviews)
+    app.on_cleanup.append(save_caches)
+    web.run_app(app, host=args.host, port=args.port)
@@ -0,0 +1,119 @@
+import numpy as np
+
+# Storage types supported by the search engine
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+# Number of rows scored at a time for quantized storage, to bound temporary memory
+BLOCK_ROWS = 4096
+
+
+# Function to scale each row of a matrix to unit length
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+# Function to pick the k best scores of each row, best first
+def top_k(scores, k):
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.zeros(scores.shape[:-1] + (0,), dtype=np.int64)
+    if k < scores.shape[-1]:
+        idx = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        idx = np.broadcast_to(np.arange(scores.shape[-1]), scores.shape).copy()
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(idx, order, axis=-1)
+
+
+class VectorSearchEngine:
+    """Exact cosine top-k search over one contiguous matrix of normalized embeddings.
+
+    A query is scored with a single matrix-vector product and the best rows are
+    selected with argpartition. Embeddings can be stored as float32, float16 (half
+    the memory) or int8 with a per-row scale (a quarter of the memory); quantized
+    rows are dequantized block by block while scoring.
+    """
+
+    def __init__(self, vectors=None, dtype="float32", normalized=False):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"dtype must be one of {STORAGE_DTYPES}, got '{dtype}'")
+        self.dtype = dtype
+        self.matrix = None
+        self.scales = None
+        if vectors is not None:
+            self.add(vectors, normalized=normalized)
+
+    def __len__(self):
+        return 0 if self.matrix is None else self.matrix.shape[0]
+
+    @property
+    def nbytes(self):
+        size = 0 if self.matrix is None else self.matrix.nbytes
+        return size + (0 if self.scales is None else self.scales.nbytes)
+
+    # Convert normalized float32 rows to the storage type
+    def _encode(self, rows):
+        if self.dtype == "float32":
+            return np.ascontiguousarray(rows, dtype=np.float32), None
+        if self.dtype == "float16":
+            return rows.astype(np.float16), None
+        max_abs = np.abs(rows).max(axis=1)
+        scales = np.where(max_abs == 0, 1.0, max_abs / 127.0).astype(np.float32)
+        return np.round(rows / scales[:, None]).astype(np.int8), scales
+
+    # Append embeddings to the matrix; rows already of unit length can skip normalization
+    def add(self, vectors, normalized=False):
+        rows = np.asarray(vectors, dtype=np.float32) if normalized else normalize_rows(vectors)
+        if rows.ndim != 2:
+            raise ValueError("vectors must be a 2-D array")
+        if self.dtype == "float32" and normalized and self.matrix is None and isinstance(vectors, np.ndarray):
+            # Keep memory-mapped float32 rows as they are instead of copying them into RAM
+            self.matrix = vectors
+            return
+        # Encode block by block so memory-mapped input is never fully copied as float32
+        parts = [self._encode(rows[start:start + BLOCK_ROWS]) for start in range(0, max(len(rows), 1), BLOCK_ROWS)]
+        encoded = np.concatenate([part[0] for part in parts])
+        scales = np.concatenate([part[1] for part in parts]) if self.dtype == "int8" else None
+        if self.matrix is None:
+            self.matrix, self.scales = encoded, scales
+        else:
+            self.matrix = np.concatenate([self.matrix, encoded])
+            if scales is not None:
+                self.scales = np.concatenate([self.scales, scales])
+
+    # Compute cosine scores of normalized queries (shape [q, dim]) against every row, or only the given rows
+    def _scores(self, queries, rows=None):
+        matrix, scales = self.matrix, self.scales
+        if rows is not None:
+            matrix = matrix[rows]
+            scales = None if scales is None else scales[rows]
+        if self.dtype == "float32":
+            return queries @ matrix.T
+        scores = np.empty((queries.shape[0], matrix.shape[0]), dtype=np.float32)
+        for start in range(0, matrix.shape[0], BLOCK_ROWS):
+            block = matrix[start:start + BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + BLOCK_ROWS] = queries @ block.T
+        if scales is not None:
+            scores *= scales
+        return scores
+
+    # Return (row indices, scores) of the k rows most similar to one query
+    def search(self, query, k=10, rows=None):
+        indices, scores = self.search_batch(np.asarray(query, dtype=np.float32)[None, :], k, rows)
+        return indices[0], scores[0]
+
+    # Return (row indices, scores) arrays of shape [q, k] for several queries at once.
+    # Passing `rows` restricts scoring to those candidate rows (e.g. from a metadata pre-filter).
+    def search_batch(self, queries, k=10, rows=None):
+        if len(self) == 0 or (rows is not None and len(rows) == 0):
+            empty = np.zeros((len(queries), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+        queries = normalize_rows(queries)
+        scores = self._scores(queries, rows)
+        idx = top_k(scores, k)
+        best = np.take_along_axis(scores, idx, axis=-1)
+        if rows is not None:
+            idx = np.asarray(rows)[idx]
+        return idx, best
@@ -0,0 +1,110 @@
+import csv
+import sys
+import time
+import argparse
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Columns of app_hotel_reviews.csv, in the order used by RAG.py
+FIELDNAMES = ['Hotel Name', 'User Review']
+
+
+# Function to create the same splitter that RAG.py uses
+def default_splitter():
+    return RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=20, add_start_index=True)
+
+
+# Function to group any iterable into lists of at most `size` items
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class CsvChunkStream:
+    """Reads a CSV export row by row and yields split chunks without loading the file.
+
+    Each row becomes a Document formatted like CSVLoader's ("Hotel Name: ...\\nUser
+    Review: ..." with source/row metadata, plus a copy of `metadata_columns` for
+    metadata filtering) and is split on its own, so only the current row and its
+    chunks are held in memory. A header row matching the field names is skipped.
+    Progress (rows/sec) is printed every `report_every` seconds.
+
+        stream = CsvChunkStream('./app_hotel_reviews.csv')
+        for batch in batched(stream, 256):
+            vector_store.add_documents(documents=batch)
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        fieldnames: Sequence[str] = FIELDNAMES,
+        metadata_columns: Sequence[str] = ('Hotel Name',),
+        text_splitter: Optional[RecursiveCharacterTextSplitter] = None,
+        delimiter: str = ',',
+        encoding: str = 'utf-8',
+        report_every: float = 5.0,
+    ):
+        self.file_path = file_path
+        self.fieldnames = list(fieldnames)
+        self.metadata_columns = list(metadata_columns)
+        self.text_splitter = text_splitter or default_splitter()
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.report_every = report_every
+        self.rows = 0
+        self.chunks = 0
+        self.started = None
+
+    def rows_per_sec(self):
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def report(self, final=False):
+        label = "Loaded" if final else "Loading"
+        print(f"{label}: {self.rows} rows, {self.chunks} chunks, {self.rows_per_sec():.0f} rows/sec")
+
+    # Yield one Document per data row, formatted the way CSVLoader formats it
+    def documents(self) -> Iterator[Document]:
+        # Review exports can contain very long fields
+        csv.field_size_limit(sys.maxsize)
+        with open(self.file_path, newline='', encoding=self.encoding) as f:
+            reader = csv.DictReader(f, fieldnames=self.fieldnames, delimiter=self.delimiter)
+            for row_number, row in enumerate(reader):
+                values = [row.get(name) for name in self.fieldnames]
+                if [(v or '').strip() for v in values] == self.fieldnames:
+                    continue
+                content = "\n".join(f"{name}: {(row.get(name) or '').strip()}" for name in self.fieldnames)
+                metadata = {"source": self.file_path, "row": row_number}
+                metadata.update({name: (row.get(name) or '').strip() for name in self.metadata_columns})
+                yield Document(page_content=content, metadata=metadata)
+
+    def __iter__(self) -> Iterator[Document]:
+        self.rows = 0
+        self.chunks = 0
+        self.started = time.perf_counter()
+        last_report = self.started
+        for doc in self.documents():
+            self.rows += 1
+            for chunk in self.text_splitter.split_documents([doc]):
+                self.chunks += 1
+                yield chunk
+            if self.report_every and time.perf_counter() - last_report >= self.report_every:
+                self.report()
+                last_report = time.perf_counter()
+        self.report(final=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a review export through the chunker and report rows/sec.")
+    parser.add_argument("csv", nargs="?", default="./app_hotel_reviews.csv")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    batches = sum(1 for _ in batched(CsvChunkStream(args.csv), args.batch_size))
+    print(f"Produced {batches} batches of up to {args.batch_size} chunks.")
@@ -0,0 +1,40 @@
+import tiktoken
+import pytest
+from history import SUMMARY_PREFIX, ConversationHistory
+
+
+class CharacterEncoding:
+    """One token per character, so the tests need no downloaded tiktoken encoding."""
+
+    def encode(self, text):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(map(chr, tokens))
+
+
+@pytest.fixture(autouse=True)
+def character_encoding(monkeypatch):
+    monkeypatch.setattr(tiktoken, "encoding_for_model", lambda model: CharacterEncoding())
+
+
+def test_summarized_history_stays_within_budget():
+    history = ConversationHistory(max_tokens=200, summarize=lambda previous, dropped: previous + " " + dropped,
+                                  max_summary_tokens=100)
+    for i in range(5):
+        history.append(f"Question {i} about the hotel?", "A long answer. " * 4)
+        assert history.tokens <= history.max_tokens
+        assert len(history.text) <= history.max_tokens
+    # The summary is cut short to fit beside the latest turn
+    assert len(history.turns) == 1 and 0 < len(history.summary) < history.max_summary_tokens
+    assert history.text.startswith(SUMMARY_PREFIX)
+    assert history.text.endswith(history.turns[-1][0])
+
+
+def test_latest_turn_over_budget_is_cut_short():
+    for summarize in (None, lambda previous, dropped: dropped):
+        history = ConversationHistory(max_tokens=50, summarize=summarize)
+        history.append("First question?", "Short answer.")
+        history.append("Which hotel has the best view?", "The Savoy. " * 20)
+        assert history.tokens <= 50 and len(history.text) <= 50
+        assert history.text.startswith("Q: Which hotel has the best view?")
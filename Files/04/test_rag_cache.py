@@ -0,0 +1,86 @@
+import asyncio
+import tiktoken
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from vector_index import PersistentVectorStore
+from rag_cache import EmbeddingCache, SemanticAnswerCache
+from rag_service import RAG_PROMPT, RAGService
+
+REVIEWS = [
+    "Hotel Name: The Savoy\nUser Review: The room service was slow.",
+    "Hotel Name: The Langham\nUser Review: Lovely afternoon tea.",
+]
+
+
+class CharacterEncoding:
+    """One token per character, so the tests need no downloaded tiktoken encoding."""
+
+    def encode(self, text):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(map(chr, tokens))
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.queries = 0
+
+    def embed_documents(self, texts):
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    def embed_query(self, text):
+        self.queries += 1
+        return [1.0, float(len(text) % 3), 0.5]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        return AIMessage(content=f"Answer {self.calls}")
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(tiktoken, "encoding_for_model", lambda model: CharacterEncoding())
+    client = CountingEmbeddings()
+    vector_store = PersistentVectorStore(EmbeddingCache(client), str(tmp_path), "test")
+    vector_store.add_texts(REVIEWS)
+    llm = CountingLLM()
+    prompt_template = ChatPromptTemplate.from_messages([("human", RAG_PROMPT)])
+    return RAGService(vector_store, llm, prompt_template, k=2, answer_cache=SemanticAnswerCache()), client, llm
+
+
+def test_repeated_question_hits_both_caches(service):
+    rag, client, llm = service
+
+    async def ask():
+        return [await rag.answer(session, "How is the room service at The Savoy?") for session in ("a", "b")]
+
+    first, second = asyncio.run(ask())
+    assert not first["cached"] and second["cached"]
+    assert second["answer"] == first["answer"]
+    assert client.queries == 1 and llm.calls == 1
+    stats = rag.stats()
+    assert stats["embedding_cache"]["hits"] == 1
+    assert stats["answer_cache"]["hits"] == 1
+
+
+def test_answer_cache_misses_when_history_differs(service):
+    rag, client, llm = service
+
+    async def ask():
+        await rag.answer("a", "Is the tea good at The Langham?")
+        return await rag.answer("a", "Is the tea good at The Langham?")
+
+    assert not asyncio.run(ask())["cached"]
+    assert llm.calls == 2
+    assert rag.stats()["embedding_cache"]["hits"] == 1
@@ -0,0 +1,316 @@
+import os
+import json
+import mmap
+import hashlib
+import numpy as np
+from array import array
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from search_engine import VectorSearchEngine, normalize_rows
+
+# Files that make up an index directory
+MANIFEST_FILE = "index.json"
+VECTORS_FILE = "vectors.f32"
+CHUNKS_FILE = "chunks.jsonl"
+
+# Version of the index format written to the manifest: 1 stored raw embeddings, 2 stores them normalized
+FORMAT_VERSION = 2
+
+# Number of rows renormalized at a time when an older index is upgraded
+MIGRATE_ROWS = 4096
+
+
+# Function to compute the content key of a chunk for a given embedding deployment
+def chunk_key(text, deployment):
+    return hashlib.sha256(f"{deployment}\n{text}".encode("utf-8")).hexdigest()
+
+
+class PersistentVectorStore(VectorStore):
+    """On-disk vector store that can replace the InMemoryVectorStore used in RAG.py.
+
+    Normalized embeddings are kept in a memory-mapped float32 matrix next to a JSONL
+    file with the text and metadata of each chunk. The JSONL file is memory-mapped
+    too and a chunk is only parsed when it is read, so the store itself holds just
+    the key and file offset of each chunk in memory. Every chunk is keyed by a hash of
+    its text and the embedding deployment name, so restarting the application only
+    embeds chunks that are not already in the index. Searches go through a
+    VectorSearchEngine, optionally holding a float16 or int8 copy of the matrix.
+    The manifest records the format version; an index from before vectors were
+    normalized is normalized in place the first time it is opened.
+
+        vector_store = PersistentVectorStore(embeddings, "./index", embeddings_name)
+        vector_store.add_documents(documents=all_splits)
+    """
+
+    def __init__(self, embedding: Embeddings, index_dir: str, deployment: str, storage: str = "float32"):
+        self.embedding = embedding
+        self.index_dir = index_dir
+        self.deployment = deployment
+        self.storage = storage
+        self._engine = None
+        self.dim = None
+        self.key_to_row = {}
+        self.offsets = array("q")
+        self.chunks_size = 0
+        self.chunks = None
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        os.makedirs(index_dir, exist_ok=True)
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # Load the manifest, chunk metadata and memory-mapped vectors from disk
+    def _load(self):
+        manifest_path = os.path.join(self.index_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        version = manifest.get("version", 1)
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Index in {self.index_dir} has format version {version}; this code reads up to {FORMAT_VERSION}")
+        if manifest["deployment"] != self.deployment:
+            raise ValueError(
+                f"Index in {self.index_dir} was built with '{manifest['deployment']}', not '{self.deployment}'"
+            )
+        self.dim = manifest["dim"]
+        self.chunks_size = manifest["chunks_size"]
+
+        # Only the rows covered by the manifest are trusted; a crash may leave a partial tail
+        with open(os.path.join(self.index_dir, CHUNKS_FILE), "rb") as f:
+            offset = 0
+            while offset < self.chunks_size:
+                line = f.readline()
+                self.key_to_row[json.loads(line)["id"]] = len(self.offsets)
+                self.offsets.append(offset)
+                offset += len(line)
+        if version < 2 and len(self):
+            self._normalize_stored_vectors()
+            self._write_manifest()
+        self._map_files()
+
+    # Upgrade an index written before vectors were normalized, rewriting the rows in place
+    def _normalize_stored_vectors(self):
+        vectors = np.memmap(
+            os.path.join(self.index_dir, VECTORS_FILE),
+            dtype=np.float32,
+            mode="r+",
+            shape=(len(self), self.dim),
+        )
+        for start in range(0, len(self), MIGRATE_ROWS):
+            vectors[start:start + MIGRATE_ROWS] = normalize_rows(vectors[start:start + MIGRATE_ROWS])
+        vectors.flush()
+        del vectors
+
+    # Map the vectors and chunks files without reading them into memory
+    def _map_files(self):
+        self._engine = None
+        self._unmap_files()
+        if not len(self):
+            return
+        self.vectors = np.memmap(
+            os.path.join(self.index_dir, VECTORS_FILE),
+            dtype=np.float32,
+            mode="r",
+            shape=(len(self), self.dim),
+        )
+        with open(os.path.join(self.index_dir, CHUNKS_FILE), "rb") as f:
+            self.chunks = mmap.mmap(f.fileno(), self.chunks_size, access=mmap.ACCESS_READ)
+
+    # Release the maps, e.g. before the files are grown or replaced underneath them
+    def _unmap_files(self):
+        self.vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+        if self.chunks is not None:
+            self.chunks.close()
+            self.chunks = None
+
+    # Append new rows to the files and rewrite the manifest last so a partial write is ignored
+    def _append(self, keys, texts, metadatas, vectors):
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+        self._unmap_files()
+        with open(os.path.join(self.index_dir, VECTORS_FILE), "ab") as f:
+            f.truncate(len(self) * self.dim * 4)
+            f.write(normalize_rows(vectors).tobytes())
+        with open(os.path.join(self.index_dir, CHUNKS_FILE), "ab") as f:
+            f.truncate(self.chunks_size)
+            for key, text, metadata in zip(keys, texts, metadatas):
+                self.key_to_row[key] = len(self.offsets)
+                self.offsets.append(f.tell())
+                f.write((json.dumps({"id": key, "text": text, "metadata": metadata}) + "\n").encode("utf-8"))
+            self.chunks_size = f.tell()
+
+        self._write_manifest()
+        self._map_files()
+
+    def _write_manifest(self):
+        manifest = {
+            "version": FORMAT_VERSION,
+            "deployment": self.deployment,
+            "dim": self.dim,
+            "count": len(self),
+            "chunks_size": self.chunks_size,
+        }
+        tmp_path = os.path.join(self.index_dir, MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(self.index_dir, MANIFEST_FILE))
+
+    # Return the keys of the given texts that still need to be embedded
+    def missing_keys(self, texts: Iterable[str]) -> List[str]:
+        return [key for key in (chunk_key(t, self.deployment) for t in texts) if key not in self.key_to_row]
+
+    # Store chunks whose embeddings were computed elsewhere (e.g. by a batch ingestion job)
+    def add_embeddings(
+        self,
+        texts: List[str],
+        vectors: Any,
+        metadatas: Optional[List[dict]] = None,
+    ) -> List[str]:
+        metadatas = metadatas or [{} for _ in texts]
+        keys = [chunk_key(t, self.deployment) for t in texts]
+        new_rows = []
+        seen = set()
+        for i, key in enumerate(keys):
+            if key not in self.key_to_row and key not in seen:
+                seen.add(key)
+                new_rows.append(i)
+        if new_rows:
+            vectors = np.asarray(vectors, dtype=np.float32)
+            self._append(
+                [keys[i] for i in new_rows],
+                [texts[i] for i in new_rows],
+                [metadatas[i] for i in new_rows],
+                vectors[new_rows],
+            )
+        return keys
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        keys = [chunk_key(t, self.deployment) for t in texts]
+
+        # Only embed chunks that are not already stored (and each distinct chunk once)
+        pending = {}
+        for i, key in enumerate(keys):
+            if key not in self.key_to_row and key not in pending:
+                pending[key] = i
+        if pending:
+            rows = list(pending.values())
+            vectors = self.embedding.embed_documents([texts[i] for i in rows])
+            self.add_embeddings([texts[i] for i in rows], vectors, [metadatas[i] for i in rows])
+        return keys
+
+    # Rewrite the index keeping only the given chunk ids (e.g. after reviews were edited or removed)
+    def compact(self, keep_ids: Iterable[str]) -> int:
+        kept = {self.key_to_row[key]: key for key in set(keep_ids) if key in self.key_to_row}
+        removed = len(self) - len(kept)
+        if removed == 0:
+            return 0
+
+        # Copy the kept rows into new files one at a time, then swap them in
+        vectors_path = os.path.join(self.index_dir, VECTORS_FILE)
+        chunks_path = os.path.join(self.index_dir, CHUNKS_FILE)
+        key_to_row, offsets = {}, array("q")
+        with open(vectors_path + ".tmp", "wb") as vectors_file, open(chunks_path + ".tmp", "wb") as chunks_file:
+            for row in sorted(kept):
+                key_to_row[kept[row]] = len(offsets)
+                offsets.append(chunks_file.tell())
+                chunks_file.write(self._line(row))
+                vectors_file.write(np.asarray(self.vectors[row], dtype=np.float32).tobytes())
+            chunks_size = chunks_file.tell()
+        self._unmap_files()
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(chunks_path + ".tmp", chunks_path)
+        self.key_to_row, self.offsets, self.chunks_size = key_to_row, offsets, chunks_size
+        self._write_manifest()
+        self._map_files()
+        return removed
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        return [self.document(self.key_to_row[i]) for i in ids if i in self.key_to_row]
+
+    # Return the JSON line of a row from the mapped chunks file
+    def _line(self, row: int) -> bytes:
+        end = self.offsets[row + 1] if row + 1 < len(self.offsets) else self.chunks_size
+        return self.chunks[self.offsets[row]:end]
+
+    # Read the stored record ({"id", "text", "metadata"}) of a row
+    def record(self, row: int) -> dict:
+        return json.loads(self._line(row))
+
+    # Iterate over (row, record) pairs from a given row on, e.g. the rows added since an index was last updated
+    def records(self, start: int = 0) -> Iterator[Tuple[int, dict]]:
+        for row in range(start, len(self)):
+            yield row, self.record(row)
+
+    # Build the Document stored at a given row of the index
+    def document(self, row: int) -> Document:
+        record = self.record(row)
+        return Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
+
+    # Build the search engine on first use so that ingestion does not pay for it per batch
+    @property
+    def engine(self) -> VectorSearchEngine:
+        if self._engine is None:
+            self._engine = VectorSearchEngine(self.vectors if len(self) else None, self.storage, normalized=True)
+        return self._engine
+
+    # Build the search engine for the rows added since the last search now, instead of in the first search that
+    # needs it, e.g. on the event loop before searches run in worker threads
+    def refresh_engine(self) -> VectorSearchEngine:
+        return self.engine
+
+    # `rows` optionally limits the search to candidate rows from a metadata pre-filter
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, rows: Optional[Sequence[int]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        if not len(self):
+            return []
+        rows, scores = self.engine.search(embedding, k, rows)
+        return [(self.document(int(row)), float(score)) for row, score in zip(rows, scores)]
+
+    # Search several queries with one matrix product
+    def similarity_search_batch(self, queries: List[str], k: int = 4) -> List[List[Document]]:
+        if not len(self):
+            return [[] for _ in queries]
+        rows, _ = self.engine.search_batch(self.embedding.embed_documents(queries), k)
+        return [[self.document(int(row)) for row in query_rows] for query_rows in rows]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        index_dir: str = "./index",
+        deployment: str = "",
+        **kwargs: Any,
+    ) -> "PersistentVectorStore":
+        store = cls(embedding, index_dir, deployment)
+        store.add_texts(texts, metadatas=metadatas)
+        return store
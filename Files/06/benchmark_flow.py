@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+# The mock model server in Files/mock
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mock"))
+from mock_openai_server import start_server
+
+PROMPTY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "application.prompty")
+CONTEXT = "Isaac Asimov was an American writer and professor of biochemistry at Boston University."
+
+
+# Function to build the inputs of one simulated turn, with the conversation so far
+def turn_inputs(turn):
+    history = []
+    for i in range(turn):
+        history.append({"role": "user", "content": f"Question {i} about Isaac Asimov?"})
+        history.append({"role": "assistant", "content": f"Answer {i} about his books."})
+    history.append({"role": "user", "content": f"Question {turn} about Isaac Asimov?"})
+    return {"query": history[-1]["content"], "context": CONTEXT, "conversation_history": history}
+
+
+def benchmark(turns, concurrency):
+    from promptflow.client import load_flow
+    from flow_registry import FlowRegistry
+
+    def report(label, elapsed, calls):
+        print(f"{label:<44} {elapsed / calls * 1000:>8.2f} ms per turn")
+
+    # Before: the lab's callback loads the flow, and the flow builds a client, for every turn
+    start = time.perf_counter()
+    for turn in range(turns):
+        load_flow(source=PROMPTY_PATH)(**turn_inputs(turn % 5))
+    report("load_flow in every callback", time.perf_counter() - start, turns)
+
+    registry = FlowRegistry()
+    start = time.perf_counter()
+    for turn in range(turns):
+        registry.get(PROMPTY_PATH)(**turn_inputs(turn % 5))
+    report("FlowRegistry, sync call", time.perf_counter() - start, turns)
+
+    async def concurrent_turns():
+        async def callback(turn):
+            return await registry.get(PROMPTY_PATH).acall(**turn_inputs(turn % 5))
+        slots = asyncio.Semaphore(concurrency)
+
+        async def limited(turn):
+            async with slots:
+                return await callback(turn)
+        await asyncio.gather(*(limited(turn) for turn in range(turns)))
+        await registry.aclose()
+
+    start = time.perf_counter()
+    asyncio.run(concurrent_turns())
+    report(f"FlowRegistry, async calls ({concurrency} at a time)", time.perf_counter() - start, turns)
+    print(f"Flows loaded by the registry: {registry.loads}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the per-turn cost of the simulator callback with the mock model.")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the mock model takes per response")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency)
+    # Point application.prompty at the mock server
+    os.environ.update(AZURE_OPENAI_ENDPOINT=server.url, AZURE_OPENAI_API_KEY="mock", AZURE_OPENAI_DEPLOYMENT="gpt-4o")
+    benchmark(args.turns, args.concurrency)
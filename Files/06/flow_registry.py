@@ -0,0 +1,177 @@
+import os
+import asyncio
+import threading
+import weakref
+from promptflow.client import load_flow
+
+# CachedFlow calls private helpers of promptflow.core, as found in the promptflow version pinned in the lab
+# instructions (1.18); with a version that lacks them, FlowRegistry calls the flows as load_flow returns them
+try:
+    from promptflow.core import _prompty_utils
+except ImportError:
+    _prompty_utils = None
+PROMPTY_HELPERS = (
+    "convert_model_configuration_to_connection",
+    "convert_prompt_template",
+    "format_llm_response",
+    "get_open_ai_client_by_connection",
+    "handle_openai_error",
+    "handle_openai_error_async",
+    "prepare_open_ai_request_params",
+    "send_request_to_llm",
+)
+PROMPTY_ATTRIBUTES = ("_model", "_template", "_data", "_outputs", "_resolve_inputs")
+
+
+class CachedFlow:
+    """A loaded prompty flow whose connection and OpenAI clients are reused by every call.
+
+    Calling a flow returned by load_flow converts its model configuration into a
+    connection and builds a new OpenAI client (and HTTP connection pool) for every
+    message. A CachedFlow makes the connection and the client once; `acall` uses
+    one async client per event loop, so concurrent callbacks share its connections
+    without blocking the loop. Calls take the same keyword inputs as the flow.
+    Raises AttributeError if promptflow lacks the internals this relies on.
+    """
+
+    def __init__(self, flow):
+        # load_flow wraps the promptflow.core Prompty that does the work
+        self.flow = getattr(flow, "_core_prompty", flow)
+        missing = [name for name in PROMPTY_HELPERS if not hasattr(_prompty_utils, name)]
+        missing += [name for name in PROMPTY_ATTRIBUTES if not hasattr(self.flow, name)]
+        if missing:
+            raise AttributeError(f"promptflow does not provide {', '.join(missing)}")
+        self.connection = _prompty_utils.convert_model_configuration_to_connection(self.flow._model.configuration)
+        self.client = _prompty_utils.get_open_ai_client_by_connection(self.connection)
+        self.async_clients = weakref.WeakKeyDictionary()
+        # Retry the requests as the flow itself does
+        self._send = _prompty_utils.handle_openai_error()(self._send)
+        self._asend = _prompty_utils.handle_openai_error_async()(self._asend)
+
+    # Function to render the prompt and request parameters for the given inputs
+    def _params(self, kwargs):
+        inputs = self.flow._resolve_inputs(kwargs)
+        template = _prompty_utils.convert_prompt_template(self.flow._template, inputs, self.flow._model.api)
+        return _prompty_utils.prepare_open_ai_request_params(self.flow._model, template, self.connection)
+
+    def _format(self, response, params):
+        return _prompty_utils.format_llm_response(
+            response=response,
+            api=self.flow._model.api,
+            response_format=params.get("response_format", {}),
+            is_first_choice=self.flow._data.get("model", {}).get("response", None) != "all",
+            streaming=params.get("stream", False),
+            outputs=self.flow._outputs,
+        )
+
+    def _send(self, timeout, kwargs):
+        params = self._params(kwargs)
+        return self._format(_prompty_utils.send_request_to_llm(self.client, self.flow._model.api, params, timeout), params)
+
+    async def _asend(self, client, timeout, kwargs):
+        params = self._params(kwargs)
+        return self._format(await _prompty_utils.send_request_to_llm(client, self.flow._model.api, params, timeout), params)
+
+    def __call__(self, timeout=None, **kwargs):
+        return self._send(timeout, kwargs)
+
+    async def acall(self, timeout=None, **kwargs):
+        loop = asyncio.get_running_loop()
+        client = self.async_clients.get(loop)
+        if client is None:
+            client = self.async_clients[loop] = _prompty_utils.get_open_ai_client_by_connection(self.connection, is_async=True)
+        return await self._asend(client, timeout, kwargs)
+
+    # Close the async client of the running event loop; a later acall opens a new one
+    async def aclose(self):
+        client = self.async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    def close(self):
+        self.client.close()
+
+
+class PlainFlow:
+    """A loaded flow called as load_flow returns it, for promptflow versions CachedFlow does not support."""
+
+    def __init__(self, flow):
+        self.flow = flow
+
+    def __call__(self, timeout=None, **kwargs):
+        return self.flow(**kwargs)
+
+    # The flow blocks while it waits for the model, so run it in a thread
+    async def acall(self, timeout=None, **kwargs):
+        return await asyncio.to_thread(self.flow, **kwargs)
+
+    async def aclose(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FlowRegistry:
+    """Loads each prompty file once per process and hands out the same CachedFlow.
+
+    A file is loaded again only when its modification time or size changes, so an
+    edit to application.prompty is picked up by a running process. Lookups of a
+    loaded flow take no lock; loading is done under a lock, so concurrent callbacks
+    (threads or asyncio tasks) asking for a new file load it only once. Close the
+    async clients with `aclose` before the event loop that used them ends.
+
+        flow = flows.get(prompty_path)
+        response = await flow.acall(query=query, context=context, conversation_history=messages_list)
+        await flows.aclose()
+    """
+
+    def __init__(self, loader=load_flow):
+        self.loader = loader
+        self.flows = {}
+        # Flows replaced after their file changed, whose clients aclose() still has to close
+        self.retired = []
+        self.lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        entry = self.flows.get(path)
+        if entry is None or entry[0] != version:
+            with self.lock:
+                entry = self.flows.get(path)
+                if entry is None or entry[0] != version:
+                    if entry is not None:
+                        self.retired.append(entry[1])
+                    entry = self.flows[path] = (version, self._wrap(self.loader(source=path)))
+                    self.loads += 1
+        return entry[1]
+
+    def _wrap(self, flow):
+        try:
+            return CachedFlow(flow)
+        except AttributeError:
+            return PlainFlow(flow)
+
+    # Close the async clients the flows opened on the running event loop, and the replaced flows
+    async def aclose(self):
+        for _, flow in list(self.flows.values()):
+            await flow.aclose()
+        with self.lock:
+            retired, self.retired = self.retired, []
+        for flow in retired:
+            await flow.aclose()
+            flow.close()
+
+    def clear(self):
+        with self.lock:
+            for flow in [flow for _, flow in self.flows.values()] + self.retired:
+                flow.close()
+            self.flows.clear()
+            self.retired = []
+
+
+# Shared registry for the simulator callbacks
+flows = FlowRegistry()
@@ -3,7 +3,7 @@ import json
 import asyncio
 import wikipedia
 from dotenv import load_dotenv
-from promptflow.client import load_flow
+from flow_registry import flows
 from typing import List, Dict, Any, Optional
 from azure.ai.evaluation.simulator import Simulator
 from azure.ai.evaluation import GroundednessEvaluator, evaluate
@@ -0,0 +1,200 @@
+import os
+import json
+import math
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from flow_registry import flows
+
+
+class Checkpoint:
+    """The shards of a run that are complete, kept as JSON lines next to the output.
+
+    The first line holds the run settings, so a restart with other settings is
+    refused instead of mixing two runs. Each further line records a finished shard
+    and the size of the output file after its conversations were written; output
+    beyond the last recorded size belongs to an unfinished shard and is cut off
+    when the run resumes. A new checkpoint is only written by start().
+    """
+
+    def __init__(self, path, settings):
+        self.path = path
+        self.settings = settings
+        self.done = {}
+        self.offset = 0
+        self.exists = os.path.exists(path)
+        if self.exists:
+            with open(path, "r", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            if records and records[0].get("settings") != settings:
+                raise ValueError(f"{path} belongs to a run with settings {records[0].get('settings')}; "
+                                 f"delete it (and the output) to start a new run")
+            for record in records[1:]:
+                self.done[record["shard"]] = record
+                self.offset = max(self.offset, record["offset"])
+
+    # Write the settings line of a new checkpoint
+    def start(self):
+        if not self.exists:
+            self._append({"settings": self.settings})
+            self.exists = True
+
+    def _append(self, record):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record(self, shard, conversations, offset):
+        record = {"shard": shard, "conversations": conversations, "offset": offset, "time": time.time()}
+        self.done[shard] = record
+        self.offset = offset
+        self._append(record)
+
+
+# Function to run shards of a simulation with at most `concurrency` at a time, appending the JSON lines of
+# each shard to the output as soon as it finishes. `simulate(shard)` returns one entry per conversation: the
+# JSON lines of its query/response pairs, as a string.
+# An existing output without a checkpoint is only replaced with overwrite=True.
+async def run_shards(simulate, shards, output_path, checkpoint, concurrency=8, retries=2, retry_delay=5.0,
+                     overwrite=False):
+    size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+    if size and not checkpoint.exists and not overwrite:
+        raise ValueError(f"{output_path} already exists and has no checkpoint {checkpoint.path}; "
+                         f"choose another --output or pass --overwrite to replace it")
+    checkpoint.start()
+    # Cut off output written after the last checkpoint, e.g. by a shard that was being written when the run stopped
+    if size < checkpoint.offset:
+        raise ValueError(f"{output_path} is shorter than {checkpoint.path} expects; delete both to start a new run")
+    if size > checkpoint.offset:
+        with open(output_path, "r+b") as f:
+            f.truncate(checkpoint.offset)
+
+    todo = [shard for shard in shards if shard not in checkpoint.done]
+    skipped = len(shards) - len(todo)
+    stats = {"shards": 0, "conversations": 0, "failed": [], "skipped": skipped}
+    slots = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    start = time.perf_counter()
+    if skipped:
+        print(f"Resuming: {skipped} of {len(shards)} shards already done")
+
+    with open(output_path, "ab") as output:
+        async def run_one(shard):
+            async with slots:
+                for attempt in range(retries + 1):
+                    try:
+                        entries = await simulate(shard)
+                        break
+                    except Exception as e:
+                        if attempt == retries:
+                            stats["failed"].append({"shard": shard, "error": repr(e)})
+                            print(f"Shard {shard} failed after {retries + 1} attempts: {e!r}")
+                            return
+                        await asyncio.sleep(retry_delay * 2 ** attempt)
+            # Count the conversations that produced output; a conversation of several turns writes several lines
+            entries = [entry for entry in entries if entry.strip()]
+            text = "".join(entry if entry.endswith("\n") else entry + "\n" for entry in entries)
+            conversations = len(entries)
+            async with write_lock:
+                output.write(text.encode("utf-8"))
+                output.flush()
+                os.fsync(output.fileno())
+                checkpoint.record(shard, conversations, output.tell())
+                stats["shards"] += 1
+                stats["conversations"] += conversations
+                elapsed = time.perf_counter() - start
+                print(f"[{skipped + stats['shards']}/{len(shards)}] {stats['conversations']} conversations, "
+                      f"{stats['conversations'] / elapsed * 60:.1f} per minute", flush=True)
+
+        await asyncio.gather(*(run_one(shard) for shard in todo))
+
+    stats["elapsed"] = time.perf_counter() - start
+    stats["conversations_per_minute"] = stats["conversations"] / stats["elapsed"] * 60 if stats["elapsed"] else 0.0
+    return stats
+
+
+# Function to build the simulator callback of the lab, answering with application.prompty
+def make_callback(text, prompty_path):
+    async def callback(
+        messages: List[Dict],
+        stream: bool = False,
+        session_state: Any = None,  # noqa: ANN401
+        context: Optional[Dict[str, Any]] = None,
+    ) -> dict:
+        messages_list = messages["messages"]
+        # Get the last message
+        latest_message = messages_list[-1]
+        query = latest_message["content"]
+        context = text
+        response = await flows.get(prompty_path).acall(query=query, context=context, conversation_history=messages_list)
+        # Format the response to follow the OpenAI chat protocol
+        messages["messages"].append({"content": response, "role": "assistant", "context": context})
+        return {"messages": messages["messages"], "stream": stream, "session_state": session_state, "context": context}
+    return callback
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate many synthetic conversations with the simulator, resumably.")
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--queries-per-shard", type=int, default=5, help="queries generated by one simulator call")
+    parser.add_argument("--concurrency", type=int, default=8, help="simulator calls running at once")
+    parser.add_argument("--max-conversation-turns", type=int, default=1)
+    parser.add_argument("--api-call-delay", type=float, default=0.0, help="seconds the simulator waits between calls")
+    parser.add_argument("--seed", type=int, default=0, help="shard n uses randomization seed seed + n")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--wiki-search-term", default="Isaac Asimov")
+    parser.add_argument("--output", default="simulation_output.jsonl")
+    parser.add_argument("--checkpoint", help="defaults to the output path + .checkpoint")
+    parser.add_argument("--overwrite", action="store_true", help="replace an output that has no checkpoint")
+    args = parser.parse_args()
+
+    import wikipedia
+    from azure.ai.evaluation.simulator import Simulator
+
+    load_dotenv()
+    # Prepare the text to send to the simulator, as generate_synth_data.py does
+    wiki_title = wikipedia.search(args.wiki_search_term)[0]
+    text = wikipedia.page(wiki_title).summary[:5000]
+
+    model_config = {
+        "azure_endpoint": os.getenv("AZURE_OPENAI_ENDPOINT"),
+        "api_key": os.getenv("AZURE_OPENAI_API_KEY"),
+        "azure_deployment": os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+    }
+    simulator = Simulator(model_config=model_config)
+    callback = make_callback(text, os.path.join(os.getcwd(), "application.prompty"))
+    shard_count = math.ceil(args.num_queries / args.queries_per_shard)
+
+    async def simulate(shard):
+        outputs = await simulator(
+            target=callback,
+            text=text,
+            num_queries=min(args.queries_per_shard, args.num_queries - shard * args.queries_per_shard),
+            max_conversation_turns=args.max_conversation_turns,
+            api_call_delay_sec=args.api_call_delay,
+            randomization_seed=args.seed + shard,
+        )
+        # One entry per conversation, with a line per query/response pair
+        return [output.to_eval_qr_json_lines() for output in outputs]
+
+    settings = {key: getattr(args, key) for key in
+                ("num_queries", "queries_per_shard", "max_conversation_turns", "seed", "wiki_search_term")}
+    checkpoint = Checkpoint(args.checkpoint or args.output + ".checkpoint", settings)
+
+    async def main():
+        try:
+            return await run_shards(simulate, list(range(shard_count)), args.output, checkpoint,
+                                    args.concurrency, args.retries, overwrite=args.overwrite)
+        finally:
+            # Close the connections the flow opened for the callbacks
+            await flows.aclose()
+
+    stats = asyncio.run(main())
+    print(f"\n{stats['conversations']} conversations in {stats['elapsed']:.1f}s "
+          f"({stats['conversations_per_minute']:.1f} per minute), {stats['skipped']} shards skipped, "
+          f"{len(stats['failed'])} failed")
+    if stats["failed"]:
+        print("Run the same command again to retry the failed shards.")
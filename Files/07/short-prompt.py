@@ -1,13 +1,15 @@
 import os
+import sys
 import uuid
 from dotenv import load_dotenv
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
-from azure.ai.projects.models import ConnectionType
-from azure.monitor.opentelemetry import configure_azure_monitor
 from opentelemetry import trace
 from opentelemetry.trace import Status, StatusCode
-from opentelemetry.instrumentation.openai_v2 import OpenAIInstrumentor
+
+# Shared helpers in Files/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from streaming import stream_chat, streaming_enabled
+from usage import tracker
+from chat_client import get_chat_client
 
 # Load environment variables from a .env file
 load_dotenv()
@@ -23,22 +25,9 @@ SESSION_ID = str(uuid.uuid4())
 # Configure the tracer to include session ID in all spans
 os.environ['OTEL_INSTRUMENTATION_GENAI_CAPTURE_MESSAGE_CONTENT'] = 'true'
 
-# Initialize the project
-project_client = AIProjectClient(            
-    credential=DefaultAzureCredential(
-        exclude_environment_credential=True,
-        exclude_managed_identity_credential=True
-    ),
-    endpoint=project_endpoint,
-)
-
-# Setup OpenTelemetry observability with Azure Monitor
-application_insights_connection_string = project_client.telemetry.get_application_insights_connection_string()
-configure_azure_monitor(connection_string=application_insights_connection_string)
-OpenAIInstrumentor().instrument()
-
-# Set up the chat completion client
-chat_client = project_client.get_openai_client(api_version="2024-10-21")
+# Set up the chat client; set OPENAI_BASE_URL in .env to call another OpenAI-compatible
+# endpoint instead of the project's deployment, such as the local mock server in Files/mock
+chat_client = get_chat_client(project_endpoint, telemetry=True)
 
 # Define the message to send to the model
 messages=[
@@ -59,13 +48,22 @@ with tracer.start_as_current_span("generate_completion") as span:
     try:
         span.set_attribute("session.id", SESSION_ID)
 
-        response = chat_client.chat.completions.create(
-          model=model_deployment,
-          messages=messages
-        )
-
         print("\nAI's response:")
-        print(response.choices[0].message.content)
+        if streaming_enabled():
+            # Print the response as it arrives and record its timing on the span
+            content, metrics = stream_chat(chat_client, model=model_deployment, messages=messages)
+            span.set_attributes(metrics.attributes())
+            usage = metrics.usage
+        else:
+            response = chat_client.chat.completions.create(
+              model=model_deployment,
+              messages=messages
+            )
+            print(response.choices[0].message.content)
+            usage = response.usage
+
+        # Record prompt, completion and cached tokens and their cost from the usage the service reports
+        tracker.record(model_deployment, "generate_completion", usage, span)
 
     except Exception as e:
         span.set_status(Status(StatusCode.ERROR, str(e)))
@@ -1,13 +1,16 @@
 import os
+import sys
 import uuid
 import json
 import time
 from dotenv import load_dotenv
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
-from azure.monitor.opentelemetry import configure_azure_monitor
 from opentelemetry import trace
-from opentelemetry.instrumentation.openai_v2 import OpenAIInstrumentor
+
+# Shared helpers in Files/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from streaming import stream_chat, streaming_enabled
+from usage import tracker
+from chat_client import get_chat_client
 
 # Load environment and set session ID
 load_dotenv()
@@ -17,21 +20,9 @@ tracer = trace.get_tracer(__name__)
 SESSION_ID = str(uuid.uuid4())
 os.environ['OTEL_INSTRUMENTATION_GENAI_CAPTURE_MESSAGE_CONTENT'] = 'true'
 
-# Initialize AI Project
-project_client = AIProjectClient(            
-    credential=DefaultAzureCredential(
-        exclude_environment_credential=True,
-        exclude_managed_identity_credential=True
-    ),
-    endpoint=project_endpoint,
-)
-# Configure telemetry and instrument tracing
-ai_conn_str = project_client.telemetry.get_application_insights_connection_string()
-configure_azure_monitor(connection_string=ai_conn_str)
-OpenAIInstrumentor().instrument()
-
-# Prepare chat client
-chat_client = project_client.get_openai_client(api_version="2024-10-21")
+# Set up the chat client; set OPENAI_BASE_URL in .env to call another OpenAI-compatible
+# endpoint instead of the project's deployment, such as the local mock server in Files/mock
+chat_client = get_chat_client(project_endpoint, telemetry=True)
 
 # Mock product list
 mock_product_catalog = [
@@ -57,24 +48,34 @@ def call_model(system_prompt, user_prompt, span_name):
         span.set_attribute("prompt.user", user_prompt)
         start_time = time.time()
 
-        response = chat_client.chat.completions.create(
-            model=model_deployment,
-            messages=[
-                { 
-                    "role": "system", 
-                    "content": system_prompt 
-                },
-                { 
-                    "role": "user", 
-                    "content": user_prompt
-                }
-            ]
-        )
+        messages = [
+            { 
+                "role": "system", 
+                "content": system_prompt 
+            },
+            { 
+                "role": "user", 
+                "content": user_prompt
+            }
+        ]
+
+        if streaming_enabled():
+            # Stream the response to record time to first token and generation speed on the span
+            output, metrics = stream_chat(chat_client, echo=False, model=model_deployment, messages=messages)
+            span.set_attributes(metrics.attributes())
+            usage = metrics.usage
+        else:
+            response = chat_client.chat.completions.create(
+                model=model_deployment,
+                messages=messages
+            )
+            output = response.choices[0].message.content
+            usage = response.usage
 
         duration = time.time() - start_time
-        output = response.choices[0].message.content
         span.set_attribute("response.time", duration)
-        span.set_attribute("response.tokens", len(output.split()))
+        # Record prompt, completion and cached tokens and their cost from the usage the service reports
+        tracker.record(model_deployment, span_name, usage, span)
         return output
 
 # Function to recommend a hike based on user preferences
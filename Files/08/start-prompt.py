@@ -1,13 +1,16 @@
 import os
+import sys
 import uuid
 import json
 import time
 from dotenv import load_dotenv
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
-from azure.monitor.opentelemetry import configure_azure_monitor
 from opentelemetry import trace
-from opentelemetry.instrumentation.openai_v2 import OpenAIInstrumentor
+
+# Shared helpers in Files/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from chat_client import get_chat_client
+from streaming import stream_chat, streaming_enabled
+from usage import tracker
 
 # Load environment and set session ID
 load_dotenv()
@@ -17,21 +20,9 @@ tracer = trace.get_tracer(__name__)
 SESSION_ID = str(uuid.uuid4())
 os.environ['OTEL_INSTRUMENTATION_GENAI_CAPTURE_MESSAGE_CONTENT'] = 'true'
 
-# Initialize AI Project
-project_client = AIProjectClient(            
-    credential=DefaultAzureCredential(
-        exclude_environment_credential=True,
-        exclude_managed_identity_credential=True
-    ),
-    endpoint=project_endpoint,
-)
-# Configure telemetry and instrument tracing
-ai_conn_str = project_client.telemetry.get_application_insights_connection_string()
-configure_azure_monitor(connection_string=ai_conn_str)
-OpenAIInstrumentor().instrument()
-
-# Prepare chat client
-chat_client = project_client.get_openai_client(api_version="2024-10-21")
+# Set up the chat client; set OPENAI_BASE_URL in .env to call another OpenAI-compatible
+# endpoint instead of the project's deployment, such as the local mock server in Files/mock
+chat_client = get_chat_client(project_endpoint, telemetry=True)
 
 # Mock product list
 mock_product_catalog = [
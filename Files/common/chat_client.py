@@ -0,0 +1,35 @@
+import os
+import openai
+
+
+# Function to set up the chat client of the lab scripts. With OPENAI_BASE_URL set in .env it calls that
+# OpenAI-compatible endpoint (such as the local mock server in Files/mock); otherwise it calls the project's
+# deployment, and with telemetry=True also sends OpenTelemetry traces to the project's Application Insights.
+def get_chat_client(project_endpoint=None, telemetry=False, api_version="2024-10-21"):
+    if os.getenv("OPENAI_BASE_URL"):
+        return openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY", "mock"))
+
+    # The Azure packages are only needed when calling the project
+    from azure.identity import DefaultAzureCredential
+    from azure.ai.projects import AIProjectClient
+
+    # Initialize the project
+    project_client = AIProjectClient(
+        credential=DefaultAzureCredential(
+            exclude_environment_credential=True,
+            exclude_managed_identity_credential=True
+        ),
+        endpoint=project_endpoint or os.getenv("PROJECT_ENDPOINT"),
+    )
+
+    if telemetry:
+        from azure.monitor.opentelemetry import configure_azure_monitor
+        from opentelemetry.instrumentation.openai_v2 import OpenAIInstrumentor
+
+        # Setup OpenTelemetry observability with Azure Monitor
+        application_insights_connection_string = project_client.telemetry.get_application_insights_connection_string()
+        configure_azure_monitor(connection_string=application_insights_connection_string)
+        OpenAIInstrumentor().instrument()
+
+    # Set up the chat completion client
+    return project_client.get_openai_client(api_version=api_version)
@@ -0,0 +1,44 @@
+import math
+import struct
+
+# Image token accounting of the vision models: a base cost plus a cost per 512px tile
+BASE_TOKENS = 85
+TILE_TOKENS = 170
+TILE_SIZE = 512
+
+
+# Function to compute the size the service scales an image to at high detail:
+# fit within 2048x2048, then scale the shortest side down to 768
+def high_detail_size(width, height):
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+# Function to estimate the tokens an image of the given size costs at a detail level
+def estimate_image_tokens(width, height, detail="auto"):
+    if detail == "low":
+        return BASE_TOKENS
+    width, height = high_detail_size(width, height)
+    return BASE_TOKENS + TILE_TOKENS * math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+
+
+# Function to read the width and height of a PNG or JPEG image without decoding it, or None if unknown
+def read_image_size(data):
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            length = struct.unpack(">H", data[i + 2:i + 4])[0]
+            # Start-of-frame markers carry the image size
+            if marker in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+                height, width = struct.unpack(">HH", data[i + 5:i + 9])
+                return width, height
+            i += 2 + length
+    return None
@@ -0,0 +1,351 @@
+import os
+import sys
+import csv
+import json
+import time
+import random
+import base64
+import asyncio
+import argparse
+import aiohttp
+from dataclasses import dataclass
+from typing import List, Optional
+
+from streaming import percentile
+
+# Chat requests shaped like the lab scripts
+TRAVEL_SYSTEM = "You are an AI assistant that acts as a travel guide."
+CAMPING_QUESTION = "What are some recommended supplies for a camping trip in the mountains?"
+BACKPACKING_TEXT = (
+    "Backpacking is a form of low-cost, independent travel that often involves carrying all necessary belongings "
+    "in a backpack. It encompasses both urban travel, where individuals explore cities and cultures, and wilderness "
+    "hiking, which involves trekking through natural landscapes with camping gear. This guide delves into the various "
+    "aspects of backpacking, including its history, types, equipment, skills required, and cultural significance. "
+    "The concept of backpacking dates back thousands of years. Early humans traveled with their possessions on their "
+    "backs out of necessity. The modern popularity of backpacking can be traced to the hippie trail of the 1960s and "
+    "1970s, which followed sections of the old Silk Road. Since then, backpacking has evolved into a mainstream form "
+    "of tourism, attracting individuals seeking authentic experiences and personal growth."
+)
+IMAGE_PROMPT = "Create Python code for image, and use plt to save the new picture under imgs/ and name it gpt-4o.jpg."
+IMAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "02", "imgs", "demo.png")
+
+
+# Function to build the messages of a workload: the Files/07 travel guide prompts or the Files/02 image prompt
+def workload_messages(name):
+    if name == "travel":
+        return [{"role": "system", "content": TRAVEL_SYSTEM}, {"role": "user", "content": CAMPING_QUESTION}]
+    if name == "travel-short":
+        return [{"role": "system", "content": TRAVEL_SYSTEM + " Respond with 1 sentence."},
+                {"role": "user", "content": CAMPING_QUESTION}]
+    if name == "backpacking":
+        return [{"role": "system", "content": TRAVEL_SYSTEM}, {"role": "user", "content": BACKPACKING_TEXT}]
+    if name == "image":
+        with open(IMAGE_PATH, "rb") as f:
+            data_url = "data:image/png;base64," + base64.b64encode(f.read()).decode("ascii")
+        return [{"role": "user", "content": [{"type": "text", "text": IMAGE_PROMPT},
+                                             {"type": "image_url", "image_url": {"url": data_url}}]}]
+    raise ValueError(f"Unknown workload {name}")
+
+
+WORKLOADS = ("travel", "travel-short", "backpacking", "image")
+
+
+@dataclass
+class RequestResult:
+    # Times are seconds since the start of the run; latency is measured from when the request was due
+    scheduled: float
+    latency: float
+    ttft: Optional[float]
+    status: int
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    attempts: int = 1
+    throttled: int = 0
+    retry_wait: float = 0.0
+    error: Optional[str] = None
+
+
+class Target:
+    """A chat completions endpoint: OpenAI style (`base_url`/chat/completions with the model in the body)
+    or, with an `api_version`, Azure OpenAI style (/openai/deployments/<model>/chat/completions)."""
+
+    def __init__(self, base_url, model, api_key="mock", api_version=None):
+        base_url = base_url.rstrip("/")
+        if api_version:
+            self.url = f"{base_url}/openai/deployments/{model}/chat/completions?api-version={api_version}"
+            self.headers = {"api-key": api_key}
+        else:
+            self.url = f"{base_url}/chat/completions"
+            self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.model = model
+
+
+# Function to read the wait a 429 response asks for, preferring the millisecond header
+def retry_after_seconds(headers, default=1.0):
+    if headers.get("retry-after-ms"):
+        return float(headers["retry-after-ms"]) / 1000
+    try:
+        return float(headers.get("Retry-After", default))
+    except ValueError:
+        return default
+
+
+# Function to send one chat completion, retrying 429s after their Retry-After up to max_retries times
+async def send_request(http, target, messages, max_tokens, stream, max_retries, run_start, scheduled):
+    body = {"model": target.model, "messages": messages, "max_tokens": max_tokens}
+    if stream:
+        body.update(stream=True, stream_options={"include_usage": True})
+    result = RequestResult(scheduled=scheduled, latency=0.0, ttft=None, status=0, attempts=0)
+    due = run_start + scheduled
+    while True:
+        result.attempts += 1
+        try:
+            async with http.post(target.url, json=body, headers=target.headers) as response:
+                result.status = response.status
+                if response.status == 429:
+                    result.throttled += 1
+                    if result.attempts > max_retries:
+                        await response.read()
+                        break
+                    wait = retry_after_seconds(response.headers)
+                    await response.read()
+                    result.retry_wait += wait
+                    await asyncio.sleep(wait)
+                    continue
+                if response.status != 200:
+                    result.error = (await response.text())[:200]
+                    break
+                if stream:
+                    chunks = 0
+                    async for line in response.content:
+                        if not line.startswith(b"data: ") or line.strip() == b"data: [DONE]":
+                            continue
+                        chunk = json.loads(line[6:])
+                        if chunk.get("usage"):
+                            result.prompt_tokens = chunk["usage"]["prompt_tokens"]
+                            result.completion_tokens = chunk["usage"]["completion_tokens"]
+                        if chunk.get("choices") and chunk["choices"][0]["delta"].get("content"):
+                            chunks += 1
+                            if result.ttft is None:
+                                result.ttft = time.perf_counter() - due
+                    result.completion_tokens = result.completion_tokens or chunks
+                else:
+                    usage = (await response.json()).get("usage") or {}
+                    result.prompt_tokens = usage.get("prompt_tokens", 0)
+                    result.completion_tokens = usage.get("completion_tokens", 0)
+                break
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            result.status, result.error = -1, type(e).__name__
+            break
+    result.latency = time.perf_counter() - due
+    return result
+
+
+# Function to run a closed loop: `concurrency` workers that each send their next request when the last one is done
+async def closed_loop(http, target, workloads, concurrency, duration, max_tokens, stream, max_retries, rng):
+    results = []
+    run_start = time.perf_counter()
+
+    async def worker():
+        while time.perf_counter() - run_start < duration:
+            messages = rng.choice(workloads)
+            results.append(await send_request(http, target, messages, max_tokens, stream, max_retries,
+                                              run_start, time.perf_counter() - run_start))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - run_start
+
+
+# Function to run an open loop: requests arrive at `qps` (Poisson or evenly spaced) whether or not earlier
+# ones are done, and latency counts from the arrival time, so queueing delay is not hidden
+async def open_loop(http, target, workloads, qps, duration, max_tokens, stream, max_retries, rng,
+                    arrivals="poisson", max_in_flight=1000):
+    results, tasks, sent = [], [], []
+    run_start = time.perf_counter()
+    scheduled = 0.0
+    while scheduled < duration:
+        delay = run_start + scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks = [t for t in tasks if not t.done()]
+        if len(tasks) >= max_in_flight:
+            # Count arrivals the client could not send as failures instead of queueing them without limit
+            results.append(RequestResult(scheduled=scheduled, latency=0.0, ttft=None, status=-1, attempts=0,
+                                         error="client in-flight limit"))
+        else:
+            task = asyncio.ensure_future(send_request(http, target, rng.choice(workloads), max_tokens, stream,
+                                                      max_retries, run_start, scheduled))
+            tasks.append(task)
+            sent.append((scheduled, task))
+        scheduled += rng.expovariate(qps) if arrivals == "poisson" else 1.0 / qps
+    # Every request sent is counted; one that raised is recorded as a failed request
+    outcomes = await asyncio.gather(*(task for _, task in sent), return_exceptions=True)
+    for (scheduled, _), outcome in zip(sent, outcomes):
+        if isinstance(outcome, BaseException):
+            outcome = RequestResult(scheduled=scheduled, latency=0.0, ttft=None, status=-1,
+                                    error=f"{type(outcome).__name__}: {outcome}")
+        results.append(outcome)
+    return results, time.perf_counter() - run_start
+
+
+# Function to summarize the results of one load level
+def summarize_level(results: List[RequestResult], elapsed, mode, level):
+    ok = [r for r in results if r.status == 200]
+    latencies = [r.latency * 1000 for r in ok]
+    ttfts = [r.ttft * 1000 for r in ok if r.ttft is not None]
+    # Tokens per second of each request once its first token arrived (or over the whole request without streaming)
+    rates = [r.completion_tokens / (r.latency - (r.ttft or 0.0)) for r in ok if r.latency - (r.ttft or 0.0) > 0]
+    attempts = sum(r.attempts for r in results)
+    throttled = sum(r.throttled for r in results)
+    waits = [r.retry_wait for r in results if r.throttled]
+    return {
+        "mode": mode,
+        "level": level,
+        "requests": len(results),
+        "succeeded": len(ok),
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "output_tokens_per_sec": sum(r.completion_tokens for r in ok) / elapsed if elapsed else 0.0,
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p95_ms": percentile(latencies, 95),
+        "latency_p99_ms": percentile(latencies, 99),
+        "ttft_p50_ms": percentile(ttfts, 50),
+        "ttft_p95_ms": percentile(ttfts, 95),
+        "tokens_per_sec_p50": percentile(rates, 50),
+        "throttled_rate": throttled / attempts if attempts else 0.0,
+        "retries": sum(max(0, r.attempts - 1) for r in results),
+        "retry_wait_mean_s": sum(waits) / len(waits) if waits else 0.0,
+        "failed_after_retries": sum(1 for r in results if r.status == 429),
+        "errors": sum(1 for r in results if r.status not in (200, 429)),
+    }
+
+
+# Function to find the load level where the deployment saturates: the first level whose throughput grows less
+# than 10% of the added load, whose p95 latency is over twice the lightest level's, or that gets throttled
+def find_saturation(rows):
+    for previous, row in zip(rows, rows[1:]):
+        load_growth = row["level"] / previous["level"] - 1
+        throughput_growth = row["throughput_rps"] / previous["throughput_rps"] - 1 if previous["throughput_rps"] else 0
+        if (throughput_growth < 0.1 * load_growth or row["latency_p95_ms"] > 2 * rows[0]["latency_p95_ms"]
+                or row["throttled_rate"] > 0.01):
+            return row
+    return None
+
+
+async def sweep(target, workloads, mode, levels, duration, max_tokens, stream, max_retries, seed, arrivals, pause):
+    rng = random.Random(seed)
+    rows = []
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=300)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+        for level in levels:
+            if mode == "closed":
+                results, elapsed = await closed_loop(http, target, workloads, int(level), duration, max_tokens,
+                                                     stream, max_retries, rng)
+            else:
+                results, elapsed = await open_loop(http, target, workloads, level, duration, max_tokens, stream,
+                                                   max_retries, rng, arrivals)
+            row = summarize_level(results, elapsed, mode, level)
+            rows.append(row)
+            print(format_row(row), flush=True)
+            # Let rate limit windows reset between levels
+            await asyncio.sleep(pause)
+    return rows
+
+
+HEADER = (f"{'level':>7} {'ok':>6} {'req/s':>7} {'tok/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'ttft p50':>9} {'tok/s/req':>9} {'429 rate':>8} {'retries':>7} {'wait s':>6} {'failed':>6}")
+
+
+def format_row(row):
+    return (f"{row['level']:>7g} {row['succeeded']:>6} {row['throughput_rps']:>7.1f} {row['output_tokens_per_sec']:>8.0f} "
+            f"{row['latency_p50_ms']:>8.0f} {row['latency_p95_ms']:>8.0f} {row['latency_p99_ms']:>8.0f} "
+            f"{row['ttft_p50_ms']:>9.0f} {row['tokens_per_sec_p50']:>9.1f} {row['throttled_rate']:>8.1%} "
+            f"{row['retries']:>7} {row['retry_wait_mean_s']:>6.2f} {row['failed_after_retries'] + row['errors']:>6}")
+
+
+# Function to draw the throughput-versus-latency curve, marking the saturation level
+def plot_curve(rows, saturation, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(8, 5))
+    throughput = [row["throughput_rps"] for row in rows]
+    for key, label in (("latency_p50_ms", "p50"), ("latency_p95_ms", "p95"), ("latency_p99_ms", "p99")):
+        plt.plot(throughput, [row[key] for row in rows], marker="o", label=label)
+    for row in rows:
+        plt.annotate(f"{row['level']:g}", (row["throughput_rps"], row["latency_p95_ms"]), fontsize=8)
+    if saturation:
+        plt.axvline(saturation["throughput_rps"], color="red", linestyle="--", label="saturation")
+    plt.xlabel("Throughput (successful requests/sec)")
+    plt.ylabel("Latency (ms)")
+    plt.title(f"Throughput vs latency ({rows[0]['mode']} loop; points labelled with the load level)")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(path)
+
+
+def write_rows(rows, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drive a chat deployment at increasing load and find where it saturates.")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed",
+                        help="closed: fixed concurrency; open: fixed arrival rate (QPS)")
+    parser.add_argument("--levels", type=float, nargs="+", default=[1, 2, 4, 8, 16, 32],
+                        help="concurrency (closed) or requests per second (open) of each step")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--workload", choices=WORKLOADS, nargs="+", default=["travel"])
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--no-stream", action="store_true", help="wait for complete responses (no TTFT)")
+    parser.add_argument("--max-retries", type=int, default=3, help="retries of a 429 after its Retry-After")
+    parser.add_argument("--arrivals", choices=["poisson", "constant"], default="poisson")
+    parser.add_argument("--pause", type=float, default=1.0, help="seconds between levels")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL") or os.getenv("AZURE_OPENAI_ENDPOINT"))
+    parser.add_argument("--api-key", default=os.getenv("OPENAI_API_KEY") or os.getenv("AZURE_OPENAI_API_KEY") or "mock")
+    parser.add_argument("--api-version", help="call the Azure OpenAI deployment URL with this API version")
+    parser.add_argument("--model", default=os.getenv("MODEL_DEPLOYMENT", "gpt-4o"))
+    parser.add_argument("--mock", action="store_true", help="start the local mock server and load it instead")
+    parser.add_argument("--mock-latency", type=float, default=0.2)
+    parser.add_argument("--mock-tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--mock-max-concurrency", type=int, default=8)
+    parser.add_argument("--mock-rpm-limit", type=int, default=0)
+    parser.add_argument("--output", help="write the rows to a .json or .csv file")
+    parser.add_argument("--plot", help="save the throughput-versus-latency curve to this image file")
+    args = parser.parse_args()
+
+    if args.mock:
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mock"))
+        from mock_openai_server import start_server
+        server = start_server(latency=args.mock_latency, tokens_per_sec=args.mock_tokens_per_sec,
+                              max_concurrency=args.mock_max_concurrency, rpm_limit=args.mock_rpm_limit, seed=args.seed)
+        args.base_url, args.api_version = server.url + "/v1", None
+    if not args.base_url:
+        parser.error("set --base-url (or OPENAI_BASE_URL / AZURE_OPENAI_ENDPOINT), or use --mock")
+
+    target = Target(args.base_url, args.model, args.api_key, args.api_version)
+    workloads = [workload_messages(name) for name in args.workload]
+    print(f"{args.mode} loop against {args.base_url} ({args.model}), {args.duration:g}s per level, "
+          f"workloads {', '.join(args.workload)}")
+    print(HEADER)
+    rows = asyncio.run(sweep(target, workloads, args.mode, args.levels, args.duration, args.max_tokens,
+                             not args.no_stream, args.max_retries, args.seed, args.arrivals, args.pause))
+    saturation = find_saturation(rows)
+    if saturation:
+        print(f"\nSaturates at level {saturation['level']:g}: "
+              f"{saturation['throughput_rps']:.1f} req/s with p95 latency {saturation['latency_p95_ms']:.0f} ms")
+    else:
+        print("\nNo saturation within the tested levels")
+    if args.output:
+        write_rows(rows, args.output)
+    if args.plot:
+        plot_curve(rows, saturation, args.plot)
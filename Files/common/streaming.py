@@ -0,0 +1,93 @@
+import os
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, List, Optional
+
+
+# Function to check whether responses should be streamed (STREAM_RESPONSES=true in .env; off by default, so the
+# scripts print complete responses as in the lab instructions)
+def streaming_enabled():
+    return os.getenv("STREAM_RESPONSES", "false").strip().lower() in ("1", "true", "yes", "on")
+
+
+# Function to compute a percentile of a list of numbers (nearest-rank)
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+@dataclass
+class StreamMetrics:
+    time_to_first_token: float = 0.0
+    total_time: float = 0.0
+    chunks: int = 0
+    completion_tokens: int = 0
+    prompt_tokens: int = 0
+    inter_token_latencies: List[float] = field(default_factory=list)
+    # The usage reported in the last chunk of the stream, if any
+    usage: Any = None
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.completion_tokens / self.total_time if self.total_time > 0 else 0.0
+
+    # Generation speed once the first token has arrived
+    @property
+    def generation_tokens_per_sec(self) -> float:
+        generating = self.total_time - self.time_to_first_token
+        return (self.completion_tokens - 1) / generating if generating > 0 and self.completion_tokens > 1 else 0.0
+
+    # Attributes to record on a trace span
+    def attributes(self, prefix="response.") -> dict:
+        return {
+            f"{prefix}time_to_first_token": self.time_to_first_token,
+            f"{prefix}time": self.total_time,
+            f"{prefix}inter_token_latency.mean": (sum(self.inter_token_latencies) / len(self.inter_token_latencies)
+                                                  if self.inter_token_latencies else 0.0),
+            f"{prefix}inter_token_latency.p95": percentile(self.inter_token_latencies, 95),
+            f"{prefix}tokens": self.completion_tokens,
+            f"{prefix}tokens_per_sec": self.tokens_per_sec,
+            f"{prefix}generation_tokens_per_sec": self.generation_tokens_per_sec,
+        }
+
+
+# Function to read a stream of chat completion chunks, optionally printing the text as it arrives.
+# Returns the full text and its timing; `start` is when the request was sent.
+def collect_stream(chunks: Iterable, start: float, echo: bool = True):
+    metrics = StreamMetrics()
+    pieces, last = [], None
+    for chunk in chunks:
+        if chunk.usage is not None:
+            metrics.usage = chunk.usage
+            metrics.completion_tokens = chunk.usage.completion_tokens
+            metrics.prompt_tokens = chunk.usage.prompt_tokens
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        now = time.perf_counter()
+        if last is None:
+            metrics.time_to_first_token = now - start
+        else:
+            metrics.inter_token_latencies.append(now - last)
+        last = now
+        pieces.append(chunk.choices[0].delta.content)
+        metrics.chunks += 1
+        if echo:
+            print(chunk.choices[0].delta.content, end="", flush=True)
+    if echo:
+        print()
+    metrics.total_time = time.perf_counter() - start
+    # Without a usage chunk, count one token per content chunk (the service sends about one token per chunk)
+    if not metrics.completion_tokens:
+        metrics.completion_tokens = metrics.chunks
+    return "".join(pieces), metrics
+
+
+# Function to stream a chat completion; takes the arguments of chat.completions.create
+def stream_chat(chat_client, echo: bool = True, stream_options: Optional[dict] = None, **kwargs):
+    start = time.perf_counter()
+    stream = chat_client.chat.completions.create(
+        stream=True, stream_options=stream_options or {"include_usage": True}, **kwargs)
+    return collect_stream(stream, start, echo)
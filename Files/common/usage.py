@@ -0,0 +1,211 @@
+import os
+import csv
+import json
+import time
+import atexit
+import bisect
+import threading
+from typing import Dict, Optional, Tuple
+
+# USD per 1M tokens: (input, cached input, output). Override with a JSON file named in USAGE_PRICES,
+# e.g. {"gpt-4o": [2.5, 1.25, 10.0]}. Deployments are matched to the longest model name they start with.
+DEFAULT_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-35-turbo": (0.50, 0.50, 1.50),
+}
+
+# Upper bounds of the token histogram buckets (powers of two)
+BUCKET_BOUNDS = [2 ** i for i in range(21)]
+
+
+# Function to load the price table, from the JSON file in USAGE_PRICES if it is set
+def load_prices(path=None):
+    path = path or os.getenv("USAGE_PRICES")
+    if not path:
+        return dict(DEFAULT_PRICES)
+    with open(path, "r", encoding="utf-8") as f:
+        return {model: tuple(prices) for model, prices in json.load(f).items()}
+
+
+# Function to read prompt, completion and cached token counts from a response.usage object or dict
+def usage_counts(usage) -> Tuple[int, int, int]:
+    if usage is None:
+        return 0, 0, 0
+    if not isinstance(usage, dict):
+        usage = usage.model_dump()
+    details = usage.get("prompt_tokens_details") or {}
+    return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0, details.get("cached_tokens") or 0
+
+
+class Histogram:
+    """Counts of values in power-of-two buckets, with count, sum, min and max."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    # Upper bound of the bucket holding the given percentile
+    def percentile(self, pct):
+        if self.count == 0:
+            return 0
+        rank, seen = pct / 100 * self.count, 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKET_BOUNDS[i], self.max) if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count, "sum": self.total, "min": self.min, "max": self.max,
+            "mean": self.total / self.count if self.count else 0,
+            "p50": self.percentile(50), "p95": self.percentile(95), "p99": self.percentile(99),
+            "buckets": {f"<={BUCKET_BOUNDS[i]}" if i < len(BUCKET_BOUNDS) else f">{BUCKET_BOUNDS[-1]}": count
+                        for i, count in enumerate(self.counts) if count},
+        }
+
+
+class UsageStats:
+    """Token usage and cost of the completions of one deployment and span name."""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cost = 0.0
+        self.prompt_histogram = Histogram()
+        self.completion_histogram = Histogram()
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "cost_usd": round(self.cost, 6),
+            "prompt_tokens_histogram": self.prompt_histogram.to_dict(),
+            "completion_tokens_histogram": self.completion_histogram.to_dict(),
+        }
+
+
+class UsageTracker:
+    """Aggregates response.usage of chat completions per deployment and span name.
+
+    Each completion adds its prompt, completion and cached tokens to the totals and
+    histograms of its (deployment, span name) pair, and its cost from the price
+    table. Tokens are also summed per deployment and minute, so the peak tokens per
+    minute can be compared with a deployment's TPM quota.
+
+        usage = tracker.record(model_deployment, "generate_completion", response.usage, span)
+        tracker.export("usage.json")
+    """
+
+    def __init__(self, prices: Optional[Dict[str, tuple]] = None):
+        self.prices = load_prices() if prices is None else prices
+        self.stats: Dict[Tuple[str, str], UsageStats] = {}
+        self.minutes: Dict[str, Dict[int, int]] = {}
+        self.lock = threading.Lock()
+
+    # Prices of a deployment: the entry of the longest model name that the deployment name starts with
+    def price(self, deployment):
+        matches = [model for model in self.prices if deployment.lower().startswith(model.lower())]
+        return self.prices[max(matches, key=len)] if matches else (0.0, 0.0, 0.0)
+
+    def cost(self, deployment, prompt_tokens, completion_tokens, cached_tokens):
+        input_price, cached_price, output_price = self.price(deployment)
+        return ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+                + completion_tokens * output_price) / 1_000_000
+
+    # Record the usage of one completion; with a span, the counts and cost are also set as span attributes
+    def record(self, deployment, span_name, usage, span=None) -> dict:
+        prompt_tokens, completion_tokens, cached_tokens = usage_counts(usage)
+        cost = self.cost(deployment, prompt_tokens, completion_tokens, cached_tokens)
+        with self.lock:
+            stats = self.stats.setdefault((deployment, span_name), UsageStats())
+            stats.requests += 1
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cached_tokens += cached_tokens
+            stats.cost += cost
+            stats.prompt_histogram.add(prompt_tokens)
+            stats.completion_histogram.add(completion_tokens)
+            minute = int(time.time() // 60)
+            per_minute = self.minutes.setdefault(deployment, {})
+            per_minute[minute] = per_minute.get(minute, 0) + prompt_tokens + completion_tokens
+        if span is not None:
+            span.set_attribute("gen_ai.usage.input_tokens", prompt_tokens)
+            span.set_attribute("gen_ai.usage.output_tokens", completion_tokens)
+            span.set_attribute("response.tokens", completion_tokens)
+            span.set_attribute("response.prompt_tokens", prompt_tokens)
+            span.set_attribute("response.cached_tokens", cached_tokens)
+            span.set_attribute("response.cost_usd", cost)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "cached_tokens": cached_tokens, "cost_usd": cost}
+
+    def totals(self) -> dict:
+        with self.lock:
+            by_span = [dict(deployment=d, span=s, **stats.to_dict()) for (d, s), stats in sorted(self.stats.items())]
+            deployments = {}
+            for row in by_span:
+                total = deployments.setdefault(row["deployment"], {
+                    "requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "cost_usd": 0.0})
+                for key in total:
+                    total[key] += row[key]
+            for deployment, total in deployments.items():
+                per_minute = self.minutes.get(deployment, {})
+                total["peak_tokens_per_minute"] = max(per_minute.values(), default=0)
+                total["average_tokens_per_minute"] = sum(per_minute.values()) / len(per_minute) if per_minute else 0
+        return {"deployments": deployments, "spans": by_span}
+
+    # Write the totals as JSON, or one row per deployment and span as CSV (chosen by the file extension)
+    def export(self, path):
+        totals = self.totals()
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            if path.lower().endswith(".csv"):
+                columns = ["deployment", "span", "requests", "prompt_tokens", "completion_tokens",
+                           "cached_tokens", "total_tokens", "cost_usd"]
+                writer = csv.writer(f)
+                writer.writerow(columns + ["prompt_tokens_p95", "completion_tokens_p95"])
+                for row in totals["spans"]:
+                    writer.writerow([row[c] for c in columns] + [row["prompt_tokens_histogram"]["p95"],
+                                                                 row["completion_tokens_histogram"]["p95"]])
+            else:
+                json.dump(totals, f, indent=2)
+
+    def summary(self) -> str:
+        lines = [f"{'deployment':<20} {'span':<28} {'requests':>8} {'prompt':>9} {'completion':>10} "
+                 f"{'cached':>8} {'cost USD':>10}"]
+        for row in self.totals()["spans"]:
+            lines.append(f"{row['deployment']:<20} {row['span']:<28} {row['requests']:>8} {row['prompt_tokens']:>9} "
+                         f"{row['completion_tokens']:>10} {row['cached_tokens']:>8} {row['cost_usd']:>10.4f}")
+        return "\n".join(lines)
+
+
+# Shared tracker for a script's completions
+tracker = UsageTracker()
+
+
+# Export the shared tracker's totals when the script ends, if USAGE_EXPORT names a .json or .csv file
+def _export_at_exit():
+    path = os.getenv("USAGE_EXPORT")
+    if path and tracker.stats:
+        tracker.export(path)
+
+
+atexit.register(_export_at_exit)
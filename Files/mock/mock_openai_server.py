@@ -0,0 +1,547 @@
+import os
+import re
+import sys
+import json
+import time
+import math
+import base64
+import random
+import struct
+import hashlib
+import argparse
+import contextlib
+import collections
+import threading
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Shared helpers in Files/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from image_tokens import BASE_TOKENS, estimate_image_tokens, read_image_size
+
+# Default size of the embeddings returned (matches text-embedding-ada-002)
+EMBEDDING_DIM = 1536
+
+# Words used to build deterministic completions
+VOCABULARY = (
+    "the hotel room staff service location breakfast view clean friendly quiet comfortable "
+    "recommend stay london guests spacious modern classic elegant excellent helpful trail "
+    "gear weather boots water map tent layers summit forest lake path"
+).split()
+
+# Shapes of the latency added before a response (see sample_latency)
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+# Tokens charged for an image whose size can't be read (a 1024x1024 image at high detail)
+IMAGE_DEFAULT_TOKENS = 765
+
+
+# Azure Monitor metrics served for the chat completions, with the usage field each one counts
+METRICS = {
+    "TokenTransaction": "total_tokens",
+    "ProcessedPromptTokens": "prompt_tokens",
+    "GeneratedTokens": "completion_tokens",
+    "ModelRequests": None,
+}
+
+# Seconds per unit of an ISO 8601 duration such as PT1M, PT6H or P1D
+DURATION_UNITS = {"S": 1, "M": 60, "H": 3600, "D": 86400}
+
+
+# Function to split text into the words used for embeddings and approximate token counts
+def words(text):
+    return re.findall(r"\w+|[^\w\s]", text.lower())
+
+
+# Function to approximate the number of tokens in a text (about 3/4 of a word per token)
+def approx_tokens(text):
+    return max(1, math.ceil(len(words(text)) * 4 / 3)) if text else 0
+
+
+# Function to create a normalized bag-of-words embedding, so similar texts get similar vectors
+def embed(text, dim=EMBEDDING_DIM):
+    vector = [0.0] * dim
+    for word in words(text):
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] % 2 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+# Function to flatten the text parts of a chat message list
+def message_text(messages):
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(part.get("text", "") for part in content if part.get("type") == "text")
+    return "\n".join(parts)
+
+
+# Function to list the image parts of a chat message list
+def message_images(messages):
+    return [part for message in messages if isinstance(message.get("content"), list)
+            for part in message["content"] if part.get("type") == "image_url"]
+
+
+# Function to count the prompt tokens of an image part, using the tile rules of the vision models
+def image_tokens(part):
+    image_url = part.get("image_url") or {}
+    if image_url.get("detail") == "low":
+        return BASE_TOKENS
+    url = image_url.get("url", "")
+    size = None
+    if url.startswith("data:") and ";base64," in url:
+        size = read_image_size(base64.b64decode(url.split(";base64,", 1)[1][:65536] + "=="))
+    if not size:
+        return IMAGE_DEFAULT_TOKENS
+    return estimate_image_tokens(*size, "high")
+
+
+# Function to create a deterministic reply to a prompt
+def completion_text(prompt, max_tokens, seed=0):
+    if seed:
+        prompt = f"{seed}\n{prompt}"
+    seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "little")
+    length = min(max_tokens, 20 + seed % 40)
+    reply = []
+    for i in range(length):
+        seed = (seed * 6364136223846793005 + 1442695040888963407) % 2**64
+        reply.append(VOCABULARY[seed % len(VOCABULARY)])
+    return " ".join(reply).capitalize() + "."
+
+
+# Function to create a deterministic JSON reply with the camelCase fields named in a prompt,
+# e.g. "Include: trailType, typicalWeather, and recommendedGear (list of 3 items)"
+def json_completion_text(prompt, seed=0):
+    reply = {}
+    for match in re.finditer(r"\b[a-z]+(?:[A-Z][a-z0-9]*)+\b", prompt):
+        key = match.group(0)
+        if key in reply:
+            continue
+        value = completion_text(f"{prompt}\n{key}", 3, seed).rstrip(".")
+        following = prompt[match.end():match.end() + 20].lower()
+        reply[key] = value.split() if "list" in following or "[" in following else value
+    return json.dumps(reply or {"answer": completion_text(prompt, 20, seed)})
+
+
+# Function to draw a latency in seconds from one of LATENCY_DISTRIBUTIONS
+def sample_latency(rng, distribution, mean, jitter):
+    if mean <= 0:
+        return 0.0
+    if distribution == "uniform":
+        return max(0.0, rng.uniform(mean - jitter, mean + jitter))
+    if distribution == "normal":
+        return max(0.0, rng.gauss(mean, jitter))
+    if distribution == "lognormal":
+        # `mean` is the median and `jitter` the sigma of the underlying normal
+        return rng.lognormvariate(math.log(mean), jitter)
+    if distribution == "exponential":
+        return rng.expovariate(1.0 / mean)
+    return mean
+
+
+# Function to convert an ISO 8601 duration (PT1M, PT1H, P1D) into seconds
+def duration_seconds(duration):
+    match = re.fullmatch(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?", duration.upper())
+    if not match or not any(match.groups()):
+        raise ValueError(f"Unsupported duration {duration}")
+    return sum(int(n) * DURATION_UNITS[unit] for n, unit in zip(match.groups(), "DHMS") if n)
+
+
+# Function to read an ISO 8601 time as seconds since the epoch (UTC unless it has an offset)
+def epoch_seconds(text):
+    value = datetime.fromisoformat(text.strip().replace("Z", "+00:00"))
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Handles OpenAI and Azure OpenAI style chat completion and embedding requests.
+
+    Chat completions can be streamed (with a final usage chunk when
+    stream_options.include_usage is set), count image inputs in the usage, and
+    answer JSON-mode requests (response_format) with JSON. Replies depend only on the request and the
+    server seed. The tokens and requests served are also available per
+    deployment and minute in the format of the Azure Monitor metrics API. Latency, generation speed and 429/500 errors follow the server
+    settings, as do the capacity limits (requests at once and per minute); each
+    request draws the random ones from a generator seeded by the server seed
+    and the request's sequence number, so a run can be replayed.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Send headers and body without waiting for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.count(status)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path.endswith("/health"):
+            self._send_json(200, {"status": "ok"})
+        elif path.endswith("/stats"):
+            self._send_json(200, self.server.stats())
+        elif path.lower().endswith("/providers/microsoft.insights/metrics"):
+            self.metrics(path, parse_qs(self.path.partition("?")[2]))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {path}", "type": "not_found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send_json(400, {"error": {"code": "BadRequest", "type": "invalid_request_error",
+                                            "message": f"The request body is not valid JSON: {e}"}})
+            return
+        if not isinstance(body, dict):
+            self._send_json(400, {"error": {"code": "BadRequest", "type": "invalid_request_error",
+                                            "message": "The request body must be a JSON object."}})
+            return
+        path = self.path.split("?")[0]
+        deployment = re.search(r"/deployments/([^/]+)/", path)
+        model = body.get("model") or (deployment.group(1) if deployment else "mock")
+        server = self.server
+        rng = random.Random(f"{server.seed}:{server.next_request()}")
+        request_id = f"mock-{server.seed}-{rng.getrandbits(48):012x}"
+
+        # Injected errors: 429s return at once, like a throttled endpoint; 500s after the usual latency
+        roll = rng.random()
+        if roll < server.error_429:
+            self._send_json(429, {"error": {"code": "429", "message": "Rate limit exceeded (injected by the mock server)."}},
+                            {"Retry-After": f"{server.retry_after:g}", "retry-after-ms": str(int(server.retry_after * 1000)),
+                             "x-request-id": request_id})
+            return
+        # Requests over the per-minute limit are throttled, counted per second as Azure OpenAI does
+        wait = server.throttle()
+        if wait is not None:
+            self._send_json(429, {"error": {"code": "429", "message": "Requests to this deployment have exceeded the "
+                                            "rate limit of the mock server. Please retry after the time in Retry-After."}},
+                            {"Retry-After": str(math.ceil(wait)), "retry-after-ms": str(int(wait * 1000)),
+                             "x-request-id": request_id})
+            return
+        # Over max_concurrency, requests wait for a free slot, so their latency grows with the load
+        with server.slots:
+            time.sleep(sample_latency(rng, server.latency_dist, server.latency, server.jitter))
+            if roll < server.error_429 + server.error_500:
+                self._send_json(500, {"error": {"code": "500", "type": "server_error",
+                                                "message": "The server had an error (injected by the mock server)."}},
+                                {"x-request-id": request_id})
+                return
+
+            if path.endswith("/chat/completions"):
+                self.chat_completion(model, body, request_id)
+            elif path.endswith("/embeddings"):
+                self._send_json(200, self.embeddings(model, body), {"x-request-id": request_id})
+            else:
+                self._send_json(404, {"error": {"message": f"Unknown path {path}", "type": "not_found"}})
+
+    def chat_completion(self, model, body, request_id):
+        messages = body.get("messages", [])
+        prompt = message_text(messages)
+        images = message_images(messages)
+        # Images change the reply, so two different pictures with the same question get different answers
+        image_key = "".join(part.get("image_url", {}).get("url", "") for part in images)
+        reply_key = prompt + (hashlib.sha256(image_key.encode("utf-8")).hexdigest() if images else "")
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens") or 800
+        json_mode = (body.get("response_format") or {}).get("type") in ("json_object", "json_schema")
+        content = json_completion_text(prompt, self.server.seed) if json_mode \
+            else completion_text(reply_key, max_tokens, self.server.seed)
+        prompt_tokens = approx_tokens(prompt) + sum(image_tokens(part) for part in images) + 3 * len(messages)
+        completion_tokens = approx_tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        self.server.record_usage(model, usage)
+        response_id = "chatcmpl-" + hashlib.sha1(reply_key.encode("utf-8")).hexdigest()[:24]
+        created = int(time.time())
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            self.stream_chat_completion(response_id, created, model, content, usage if include_usage else None, request_id)
+            return
+
+        if self.server.tokens_per_sec > 0:
+            time.sleep(completion_tokens / self.server.tokens_per_sec)
+        self._send_json(200, {
+            "id": response_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }, {"x-request-id": request_id})
+
+    # Send a reply as server-sent events, one word per chunk, at the configured tokens per second
+    def stream_chat_completion(self, response_id, created, model, content, usage, request_id):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("x-request-id", request_id)
+        self.end_headers()
+
+        def send_event(data):
+            payload = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta, finish_reason=None):
+            return json.dumps({
+                "id": response_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            })
+
+        pieces = re.findall(r"\S+\s*", content)
+        delay = approx_tokens(content) / len(pieces) / self.server.tokens_per_sec \
+            if self.server.tokens_per_sec > 0 and pieces else 0.0
+        send_event(chunk({"role": "assistant", "content": ""}))
+        for piece in pieces:
+            time.sleep(delay)
+            send_event(chunk({"content": piece}))
+        send_event(chunk({}, "stop"))
+        if usage is not None:
+            send_event(json.dumps({"id": response_id, "object": "chat.completion.chunk", "created": created,
+                                   "model": model, "choices": [], "usage": usage}))
+        send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+        self.server.count(200)
+
+    # Answer an Azure Monitor metrics query with the tokens and requests served, split by ModelDeploymentName
+    def metrics(self, path, params):
+        server = self.server
+        try:
+            start, end = (epoch_seconds(t) for t in params["timespan"][0].split("/"))
+            interval = duration_seconds(params.get("interval", ["PT1M"])[0])
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"code": "BadRequest", "message": f"Invalid timespan or interval: {e}"})
+            return
+        names = params.get("metricnames", ["TokenTransaction"])[0].split(",")
+        aggregations = [a.strip().lower() for a in params.get("aggregation", ["Total"])[0].split(",")]
+        deployments = re.findall(r"ModelDeploymentName eq '([^']+)'", params.get("$filter", [""])[0])
+        if not deployments or "*" in deployments:
+            deployments = server.metrics_deployments()
+        # Split the deployments into pages when a page size is set, to exercise the client's paging
+        skip = int(params.get("$skiptoken", ["0"])[0])
+        page = deployments[skip:skip + server.metrics_page_size] if server.metrics_page_size else deployments
+        first = int(start // interval * interval)
+        buckets = range(first, int(end), interval)
+        value = []
+        for name in names:
+            if name not in METRICS:
+                self._send_json(400, {"code": "BadRequest", "message": f"Failed to find metric configuration for {name}"})
+                return
+            timeseries = []
+            for deployment in page:
+                data = []
+                for bucket in buckets:
+                    minutes = [server.metric_value(deployment, name, minute)
+                               for minute in range(bucket // 60, (bucket + interval) // 60)]
+                    point = {"timeStamp": datetime.fromtimestamp(bucket, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+                    for aggregation in aggregations:
+                        point[aggregation] = {"total": sum(minutes), "count": len(minutes), "maximum": max(minutes),
+                                              "minimum": min(minutes), "average": sum(minutes) / len(minutes)}[aggregation]
+                    data.append(point)
+                timeseries.append({"metadatavalues": [{"name": {"value": "modeldeploymentname",
+                                                                "localizedValue": "ModelDeploymentName"},
+                                                       "value": deployment}],
+                                   "data": data})
+            value.append({"id": f"{path.rsplit('/providers/microsoft.insights', 1)[0]}/providers/Microsoft.Insights/metrics/{name}",
+                          "type": "Microsoft.Insights/metrics", "name": {"value": name, "localizedValue": name},
+                          "unit": "Count", "timeseries": timeseries})
+        body = {"cost": 0, "timespan": params["timespan"][0], "interval": params.get("interval", ["PT1M"])[0],
+                "value": value, "namespace": "Microsoft.CognitiveServices/accounts", "resourceregion": "local"}
+        if server.metrics_page_size and skip + server.metrics_page_size < len(deployments):
+            query = "&".join(f"{k}={v[0]}" for k, v in params.items() if k != "$skiptoken")
+            body["@odata.nextLink"] = f"{server.url}{path}?{query}&$skiptoken={skip + server.metrics_page_size}"
+        self._send_json(200, body)
+
+    def embeddings(self, model, body):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        # Token id inputs (as sent by LangChain) are embedded from their ids
+        texts = [t if isinstance(t, str) else " ".join(map(str, t)) for t in inputs]
+        dim = body.get("dimensions") or self.server.embedding_dim
+        vectors = [embed(t, dim) for t in texts]
+        # The openai client asks for base64 float32 data unless a format is given
+        if body.get("encoding_format") == "base64":
+            vectors = [base64.b64encode(struct.pack(f"<{len(v)}f", *v)).decode("ascii") for v in vectors]
+        data = [{"object": "embedding", "index": i, "embedding": v} for i, v in enumerate(vectors)]
+        tokens = sum(approx_tokens(t) for t in texts)
+        return {
+            "object": "list",
+            "data": data,
+            "model": model,
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, latency_dist="fixed", jitter=0.0, tokens_per_sec=0.0,
+                 error_429=0.0, error_500=0.0, retry_after=1.0, seed=0, embedding_dim=EMBEDDING_DIM, verbose=False,
+                 metrics_baseline=0.0, metrics_page_size=0, max_concurrency=0, rpm_limit=0):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {LATENCY_DISTRIBUTIONS}")
+        super().__init__(address, MockHandler)
+        self.latency = latency
+        self.latency_dist = latency_dist
+        self.jitter = jitter
+        self.tokens_per_sec = tokens_per_sec
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.retry_after = retry_after
+        self.seed = seed
+        self.embedding_dim = embedding_dim
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.statuses = {}
+        # Tokens and requests served per (deployment, metric, minute since the epoch)
+        self.usage_by_minute = {}
+        # Mean tokens per minute reported for the default deployments on top of the served ones
+        self.metrics_baseline = metrics_baseline
+        self.metrics_page_size = metrics_page_size
+        # Capacity: requests handled at once (0: no limit) and requests per minute before 429s (0: no limit)
+        self.slots = threading.Semaphore(max_concurrency) if max_concurrency else contextlib.nullcontext()
+        self.rpm_limit = rpm_limit
+        self.window = 0
+        self.window_requests = 0
+        # Times of the requests accepted in the last minute
+        self.accepted = collections.deque()
+
+    def next_request(self):
+        with self.lock:
+            self.requests += 1
+            return self.requests
+
+    def count(self, status):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    # Seconds until the next request is allowed when the rate limit is reached, otherwise None. At most
+    # rpm_limit requests are accepted in any 60 seconds and, for limits of 60 and more, rpm_limit // 60 per second
+    def throttle(self):
+        if not self.rpm_limit:
+            return None
+        now = time.time()
+        with self.lock:
+            while self.accepted and self.accepted[0] <= now - 60:
+                self.accepted.popleft()
+            if len(self.accepted) >= self.rpm_limit:
+                return self.accepted[0] + 60 - now
+            if int(now) != self.window:
+                self.window, self.window_requests = int(now), 0
+            if self.rpm_limit >= 60 and self.window_requests >= self.rpm_limit // 60:
+                return self.window + 1 - now
+            self.window_requests += 1
+            self.accepted.append(now)
+        return None
+
+    def record_usage(self, deployment, usage):
+        minute = int(time.time() // 60)
+        with self.lock:
+            for name, field in METRICS.items():
+                key = (deployment, name, minute)
+                self.usage_by_minute[key] = self.usage_by_minute.get(key, 0) + (usage[field] if field else 1)
+
+    # Deployments with metrics: those served, and with a baseline also the lab's two deployments
+    def metrics_deployments(self):
+        with self.lock:
+            served = {deployment for deployment, _, _ in self.usage_by_minute}
+        return sorted(served | ({"gpt-4o", "gpt-4o-mini"} if self.metrics_baseline else set()))
+
+    # Value of a metric for one deployment and minute: the served usage plus a repeatable baseline
+    def metric_value(self, deployment, name, minute):
+        with self.lock:
+            value = self.usage_by_minute.get((deployment, name, minute), 0)
+        if self.metrics_baseline and minute * 60 <= time.time():
+            rng = random.Random(f"{self.seed}:{deployment}:{name}:{minute}")
+            value += int(self.metrics_baseline * rng.uniform(0.5, 1.5) / (1 if METRICS[name] else 500))
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "statuses": {str(k): v for k, v in sorted(self.statuses.items())}}
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+
+# Function to create a mock server; call serve_forever() on the result
+def create_server(host="127.0.0.1", port=8000, latency=0.0, embedding_dim=EMBEDDING_DIM, verbose=False, **settings):
+    return MockServer((host, port), latency=latency, embedding_dim=embedding_dim, verbose=verbose, **settings)
+
+
+# Function to run a mock server on a background thread, e.g. in a benchmark or CI job; port 0 picks a free port
+def start_server(host="127.0.0.1", port=0, **settings):
+    server = create_server(host, port, **settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for Azure OpenAI chat completions and embeddings, and their Azure Monitor metrics.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every response (mean or median)")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="spread of the latency: half-width (uniform), std dev (normal) or sigma (lognormal)")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="generation speed; 0 returns the reply at once")
+    parser.add_argument("--error-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--error-500", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="seconds sent in the Retry-After header of a 429")
+    parser.add_argument("--seed", type=int, default=0, help="changes the replies and the injected latencies and errors")
+    parser.add_argument("--embedding-dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--max-concurrency", type=int, default=0,
+                        help="requests handled at once; more wait in a queue (0: no limit)")
+    parser.add_argument("--rpm-limit", type=int, default=0,
+                        help="requests per minute, over a sliding minute and per second, before answering 429 (0: no limit)")
+    parser.add_argument("--metrics-baseline", type=float, default=0.0,
+                        help="tokens per minute reported in the metrics of gpt-4o and gpt-4o-mini besides the served ones")
+    parser.add_argument("--metrics-page-size", type=int, default=0,
+                        help="deployments per page of a metrics response (0: one page)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.latency, args.embedding_dim, args.verbose,
+                           latency_dist=args.latency_dist, jitter=args.jitter, tokens_per_sec=args.tokens_per_sec,
+                           error_429=args.error_429, error_500=args.error_500, retry_after=args.retry_after,
+                           seed=args.seed, metrics_baseline=args.metrics_baseline,
+                           metrics_page_size=args.metrics_page_size, max_concurrency=args.max_concurrency,
+                           rpm_limit=args.rpm_limit)
+    print(f"Mock model server listening on {server.url}")
+    # To use it, set OPENAI_BASE_URL=http://127.0.0.1:8000/v1 (Files/02, 07, 08) or
+    # AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8000 (Files/03, 04, 06) in the lab's .env file,
+    # and METRICS_ENDPOINT=http://127.0.0.1:8000 for Files/02/plot.py
+    server.serve_forever()